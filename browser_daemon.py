@@ -0,0 +1,377 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import WebDriverException
+import threading
+import argparse
+import socket
+import uuid
+import json
+import time
+import requests
+from browser_pool import BROWSER_PROFILES, build_chrome_options
+from product_parsers import MOMO_BASE_URL, PCHOME_BASE_URL
+
+DAEMON_PORT = 9230
+IDLE_TIMEOUT = 600  # 閒置超過 10 分鐘的瀏覽器會被關閉
+LEASE_TIMEOUT = 3600  # 借出超過 1 小時仍未歸還（例如腳本當掉）視為已歸還
+MAX_INSTANCES = 8
+
+# 每次歸還時清除這些網站的 cookie 與儲存資料，下一個連線拿到的瀏覽器不會帶有上一次的狀態
+RESET_ORIGINS = [MOMO_BASE_URL, PCHOME_BASE_URL, "https://ecshweb.pchome.com.tw"]
+
+
+def _free_port():
+    """取得一個目前沒有被使用的本機連接埠"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BrowserInstance:
+    """常駐服務中的一個 Chrome，同一時間只借給一個連線"""
+
+    def __init__(self, profile, driver, debugger_address):
+        self.profile = profile
+        self.driver = driver
+        self.debugger_address = debugger_address
+        self.lease = None
+        self.leased_at = None
+        self.idle_since = time.time()
+
+
+class BrowserDaemon:
+    """
+    常駐的瀏覽器服務：保持已啟動的 Chrome，透過 remote debugging 位址借給其他行程
+
+    爬蟲以 POST /attach 借用一個指定設定檔的 Chrome，取得 debugger_address 後由
+    chromedriver 直接連上（不需要重新啟動瀏覽器），用完以 POST /release 歸還。
+    歸還時會關閉多餘分頁並清除 cookie、快取與網站資料，閒置超過 idle_timeout 的瀏覽器會被關閉。
+    """
+
+    def __init__(self, host="127.0.0.1", port=DAEMON_PORT, idle_timeout=IDLE_TIMEOUT,
+                 lease_timeout=LEASE_TIMEOUT, max_instances=MAX_INSTANCES, warm=None, headless=False):
+        """
+        Args:
+            host (str): 監聽的位址
+            port (int): 監聽的連接埠
+            idle_timeout (float): 閒置瀏覽器保留的秒數
+            lease_timeout (float): 借出的瀏覽器最久可使用的秒數
+            max_instances (int): 同時存在的瀏覽器數量上限
+            warm (dict): 啟動時預先開啟的瀏覽器 設定檔 -> 數量，這些數量不會因閒置而關閉
+            headless (bool): 是否所有設定檔都以無頭模式啟動
+        """
+        self.idle_timeout = idle_timeout
+        self.lease_timeout = lease_timeout
+        self.max_instances = max_instances
+        self.warm = warm or {}
+        self.headless = headless
+        self.instances = []
+        self.stats = {"launched": 0, "attached": 0, "reaped": 0, "rejected": 0}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status, payload):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/status":
+                    self._reply(200, daemon.status())
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self._reply(400, {"error": "invalid json"})
+                    return
+                if self.path == "/attach":
+                    try:
+                        self._reply(200, daemon.attach(request.get("profile", "probe")))
+                    except (KeyError, RuntimeError, WebDriverException) as e:
+                        self._reply(503, {"error": str(e)})
+                elif self.path == "/release":
+                    released = daemon.release(request.get("lease"))
+                    self._reply(200 if released else 404, {"released": released})
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def address(self):
+        host, port = self.httpd.server_address[:2]
+        return f"{host}:{port}"
+
+    def _launch(self, profile):
+        """以設定檔啟動一個 Chrome，並開放 remote debugging 連接埠"""
+        port = _free_port()
+        options = build_chrome_options(profile, headless=True if self.headless else None)
+        options.add_argument(f"--remote-debugging-port={port}")
+        driver = webdriver.Chrome(options=options)
+        with self._lock:
+            self.stats["launched"] += 1
+        print(f"已啟動 {profile} 瀏覽器（remote debugging 127.0.0.1:{port}）")
+        return BrowserInstance(profile, driver, f"127.0.0.1:{port}")
+
+    def _is_healthy(self, instance):
+        try:
+            instance.driver.window_handles
+            return True
+        except WebDriverException:
+            return False
+
+    def _quit(self, instance):
+        try:
+            instance.driver.quit()
+        except Exception:
+            pass
+
+    def _reset(self, instance):
+        """清除上一個連線留下的分頁、cookie、快取與網站資料"""
+        driver = instance.driver
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.get("about:blank")
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+        for origin in RESET_ORIGINS:
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+
+    def attach(self, profile):
+        """
+        借出一個指定設定檔的 Chrome，沒有閒置的瀏覽器時新啟動一個
+
+        Returns:
+            dict: {"lease", "debugger_address", "profile"}
+
+        Raises:
+            KeyError: 沒有這個設定檔
+            RuntimeError: 瀏覽器數量已達上限
+        """
+        if profile not in BROWSER_PROFILES:
+            raise KeyError(f"未知的設定檔: {profile}")
+        while True:
+            with self._lock:
+                instance = next((item for item in self.instances
+                                 if item.profile == profile and item.lease is None), None)
+                if instance is not None:
+                    instance.lease = uuid.uuid4().hex
+                    instance.leased_at = time.time()
+            if instance is None or self._is_healthy(instance):
+                break
+            with self._lock:
+                self.instances.remove(instance)
+            self._quit(instance)
+
+        if instance is None:
+            with self._lock:
+                if len(self.instances) >= self.max_instances:
+                    self.stats["rejected"] += 1
+                    raise RuntimeError(f"瀏覽器數量已達上限 {self.max_instances}")
+            instance = self._launch(profile)
+            with self._lock:
+                instance.lease = uuid.uuid4().hex
+                instance.leased_at = time.time()
+                self.instances.append(instance)
+
+        with self._lock:
+            self.stats["attached"] += 1
+        return {"lease": instance.lease, "debugger_address": instance.debugger_address, "profile": profile}
+
+    def release(self, lease):
+        """
+        歸還借出的 Chrome，清除狀態後放回閒置清單；清除失敗的瀏覽器直接關閉
+
+        Returns:
+            bool: 是否找到這個借用
+        """
+        with self._lock:
+            instance = next((item for item in self.instances if lease and item.lease == lease), None)
+        if instance is None:
+            return False
+        try:
+            self._reset(instance)
+        except WebDriverException as e:
+            print(f"重設 {instance.profile} 瀏覽器失敗，改為關閉: {e}")
+            with self._lock:
+                self.instances.remove(instance)
+            self._quit(instance)
+            return True
+        with self._lock:
+            instance.lease = None
+            instance.leased_at = None
+            instance.idle_since = time.time()
+        return True
+
+    def reap(self):
+        """關閉閒置過久的瀏覽器（保留 warm 指定的數量），並收回借用逾時的瀏覽器"""
+        now = time.time()
+        expired, idle = [], []
+        with self._lock:
+            kept = {}
+            for instance in self.instances:
+                if instance.lease is not None:
+                    if now - instance.leased_at > self.lease_timeout:
+                        expired.append(instance.lease)
+                    continue
+                kept[instance.profile] = kept.get(instance.profile, 0) + 1
+                if now - instance.idle_since > self.idle_timeout and kept[instance.profile] > self.warm.get(instance.profile, 0):
+                    idle.append(instance)
+                    kept[instance.profile] -= 1
+            for instance in idle:
+                self.instances.remove(instance)
+                self.stats["reaped"] += 1
+
+        for lease in expired:
+            print("收回借用逾時的瀏覽器")
+            self.release(lease)
+        for instance in idle:
+            print(f"關閉閒置的 {instance.profile} 瀏覽器")
+            self._quit(instance)
+
+    def status(self):
+        with self._lock:
+            return {
+                "stats": dict(self.stats),
+                "instances": [{
+                    "profile": instance.profile,
+                    "debugger_address": instance.debugger_address,
+                    "leased": instance.lease is not None,
+                    "idle_seconds": None if instance.lease else round(time.time() - instance.idle_since, 1)
+                } for instance in self.instances]
+            }
+
+    def _reap_loop(self, interval):
+        while not self._stopped.wait(interval):
+            self.reap()
+
+    def serve_forever(self, reap_interval=30):
+        """預先開啟 warm 指定的瀏覽器後開始服務，直到 stop 或 Ctrl+C"""
+        for profile, count in self.warm.items():
+            for _ in range(count):
+                instance = self._launch(profile)
+                with self._lock:
+                    self.instances.append(instance)
+        threading.Thread(target=self._reap_loop, args=(reap_interval,), daemon=True).start()
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.close_all()
+
+    def stop(self):
+        self._stopped.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def close_all(self):
+        self._stopped.set()
+        with self._lock:
+            instances, self.instances = self.instances, []
+        for instance in instances:
+            self._quit(instance)
+
+
+def attach_driver(profile, address):
+    """
+    向常駐瀏覽器服務借用一個 Chrome 並以 chromedriver 連上
+
+    Args:
+        profile (str): BROWSER_PROFILES 中的設定檔名稱
+        address (str): 服務的位址，例如 127.0.0.1:9230
+
+    Returns:
+        WebDriver | None: 已連上的 WebDriver，服務無法使用時回傳 None（呼叫端改為自行啟動 Chrome）
+    """
+    try:
+        response = requests.post(f"http://{address}/attach", json={"profile": profile}, timeout=60)
+        response.raise_for_status()
+        lease = response.json()
+    except (requests.RequestException, ValueError) as e:
+        print(f"無法連線到常駐瀏覽器服務 {address}，改為自行啟動 Chrome: {e}")
+        return None
+
+    options = Options()
+    options.debugger_address = lease["debugger_address"]
+    if BROWSER_PROFILES[profile].get("network_log"):
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    try:
+        driver = webdriver.Chrome(options=options)
+    except WebDriverException as e:
+        print(f"無法連上常駐瀏覽器 {lease['debugger_address']}，改為自行啟動 Chrome: {e}")
+        _release_lease(address, lease["lease"])
+        return None
+    driver._daemon_lease = (address, lease["lease"])
+    return driver
+
+
+def _release_lease(address, lease):
+    try:
+        requests.post(f"http://{address}/release", json={"lease": lease}, timeout=30)
+    except requests.RequestException as e:
+        print(f"歸還常駐瀏覽器失敗: {e}")
+
+
+def detach_driver(driver):
+    """
+    中斷與常駐瀏覽器的連線並歸還（瀏覽器本身繼續執行）
+
+    Returns:
+        bool: 這個 WebDriver 是否借自常駐瀏覽器服務
+    """
+    lease = getattr(driver, "_daemon_lease", None)
+    if lease is None:
+        return False
+    try:
+        # 以 debugger_address 連上的 chromedriver 結束時只中斷連線，不會關閉瀏覽器
+        driver.quit()
+    except Exception:
+        pass
+    _release_lease(*lease)
+    return True
+
+
+def _parse_warm(value):
+    """解析 --warm，例如 "probe:1,momo:2" -> {"probe": 1, "momo": 2}"""
+    warm = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        profile, _, count = item.partition(":")
+        warm[profile] = int(count or 1)
+    return warm
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="常駐的瀏覽器服務，讓爬蟲與商品數量檢查不必每次重新啟動 Chrome")
+    parser.add_argument("--port", type=int, default=DAEMON_PORT, help=f"監聽的連接埠（預設 {DAEMON_PORT}）")
+    parser.add_argument("--warm", default="probe:1", help="預先開啟的瀏覽器，例如 probe:1,momo:2（預設 probe:1）")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT,
+                        help=f"閒置瀏覽器保留的秒數（預設 {IDLE_TIMEOUT}）")
+    parser.add_argument("--max-instances", type=int, default=MAX_INSTANCES,
+                        help=f"瀏覽器數量上限（預設 {MAX_INSTANCES}）")
+    parser.add_argument("--headless", action="store_true", help="所有設定檔都以無頭模式啟動")
+    args = parser.parse_args()
+
+    daemon = BrowserDaemon(port=args.port, idle_timeout=args.idle_timeout, max_instances=args.max_instances,
+                           warm=_parse_warm(args.warm), headless=args.headless)
+    print("常駐瀏覽器服務已啟動，讓爬蟲改用這個服務請設定環境變數：")
+    print(f"  SCRAPER_BROWSER_DAEMON={daemon.address}")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        daemon.stop()
@@ -0,0 +1,282 @@
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import WebDriverException
+from contextlib import contextmanager
+import threading
+import atexit
+import os
+from resource_blocking import apply_resource_blocking
+
+# 設定為常駐瀏覽器服務的位址（例如 127.0.0.1:9230）時，改為向服務借用已啟動的 Chrome（見 browser_daemon.py）
+BROWSER_DAEMON = os.environ.get("SCRAPER_BROWSER_DAEMON", "")
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# 各平台的 Chrome 設定檔
+BROWSER_PROFILES = {
+    # momo 商品爬蟲
+    "momo": {
+        "headless": False,
+        "arguments": [
+            '--no-sandbox',
+            '--disable-dev-shm-usage',
+            '--disable-gpu',
+            '--disable-software-rasterizer',
+            '--disable-extensions',
+            '--disable-plugins',
+            '--disable-background-timer-throttling',
+            '--disable-backgrounding-occluded-windows',
+            '--disable-renderer-backgrounding',
+            '--disable-web-security',
+            '--disable-features=VizDisplayCompositor',
+            '--disable-ipc-flooding-protection',
+            '--window-size=1920,1080',
+            f'--user-agent={USER_AGENT}'
+        ],
+        # 禁用圖片載入以提高速度
+        "prefs": {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2
+        },
+        "exclude_switches": [],
+        "page_load_timeout": 30,
+        # 以 DevTools 封鎖圖片、字型、追蹤與第三方腳本（見 resource_blocking.BLOCKING_PROFILES）
+        "block_resources": "momo",
+        # 記錄 performance 日誌，供每頁統計流量與封鎖的請求數
+        "network_log": True
+    },
+    # PChome 商品爬蟲（只需要圖片的 src 屬性，圖片本身由 DevTools 封鎖不下載）
+    "pchome": {
+        "headless": False,
+        "arguments": [
+            '--no-sandbox',
+            '--disable-dev-shm-usage',
+            '--disable-gpu',
+            '--window-size=1920,1080',
+            f'--user-agent={USER_AGENT}'
+        ],
+        "prefs": {"profile.default_content_setting_values.notifications": 2},
+        "exclude_switches": [],
+        "page_load_timeout": 40,
+        "block_resources": "pchome",
+        "network_log": True
+    },
+    # 商品數量檢查（無頭模式，快速）
+    "probe": {
+        "headless": True,
+        "arguments": [
+            '--no-sandbox',
+            '--disable-dev-shm-usage',
+            '--disable-gpu',
+            '--window-size=1920,1080',
+            '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        ],
+        "prefs": {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2
+        },
+        "exclude_switches": ['enable-logging'],
+        "page_load_timeout": 20,
+        "block_resources": "probe",
+        "network_log": False
+    }
+}
+
+
+def build_chrome_options(profile, headless=None):
+    """
+    依設定檔建立 Chrome 選項
+
+    Args:
+        profile (str): BROWSER_PROFILES 中的設定檔名稱
+        headless (bool): 覆寫設定檔的無頭模式設定，None 表示依設定檔
+
+    Returns:
+        Options: Chrome 選項
+    """
+    config = BROWSER_PROFILES[profile]
+    chrome_options = Options()
+    if config["headless"] if headless is None else headless:
+        chrome_options.add_argument('--headless')  # 無頭模式
+    for argument in config["arguments"]:
+        chrome_options.add_argument(argument)
+    chrome_options.add_experimental_option("prefs", config["prefs"])
+    if config["exclude_switches"]:
+        chrome_options.add_experimental_option('excludeSwitches', config["exclude_switches"])
+    if config.get("network_log"):
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return chrome_options
+
+
+def quit_driver(driver):
+    """關閉 WebDriver；借自常駐瀏覽器服務的只中斷連線並歸還"""
+    if getattr(driver, "_daemon_lease", None):
+        from browser_daemon import detach_driver
+        detach_driver(driver)
+        return
+    driver.quit()
+
+
+def create_driver(profile, block_resources=None):
+    """
+    依設定檔啟動一個新的 Chrome WebDriver
+
+    Args:
+        profile (str): BROWSER_PROFILES 中的設定檔名稱
+        block_resources (bool): 是否封鎖資源，None 表示依 resource_blocking.BLOCK_RESOURCES
+
+    設定了 SCRAPER_BROWSER_DAEMON 時優先向常駐瀏覽器服務借用，省下啟動 Chrome 的時間。
+
+    Returns:
+        WebDriver: 已設定頁面載入逾時與資源封鎖的 Chrome WebDriver
+    """
+    config = BROWSER_PROFILES[profile]
+    driver = None
+    if BROWSER_DAEMON:
+        from browser_daemon import attach_driver
+        driver = attach_driver(profile, BROWSER_DAEMON)
+    if driver is None:
+        driver = webdriver.Chrome(options=build_chrome_options(profile))
+    driver.set_page_load_timeout(config["page_load_timeout"])
+    if config.get("block_resources"):
+        apply_resource_blocking(driver, config["block_resources"], block_resources)
+    return driver
+
+
+class BrowserPool:
+    """
+    行程內共用的 Chrome WebDriver 池
+
+    借出前會做健康檢查，已失效的瀏覽器直接丟棄重建；每個瀏覽器載入
+    recycle_after 頁後就關閉重開，避免長時間執行造成記憶體膨脹。
+    """
+
+    def __init__(self, max_idle=4, recycle_after=50):
+        """
+        Args:
+            max_idle (int): 每個設定檔最多保留幾個閒置瀏覽器
+            recycle_after (int): 每個瀏覽器最多載入幾頁後回收
+        """
+        self.max_idle = max_idle
+        self.recycle_after = recycle_after
+        self._idle = {}  # profile -> [driver, ...]
+        self._pages = {}  # driver -> 已載入頁數
+        self._profiles = {}  # driver -> profile
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "reused": 0, "recycled": 0, "unhealthy": 0}
+
+    def _is_healthy(self, driver):
+        """檢查瀏覽器是否仍可操作"""
+        try:
+            driver.window_handles
+            return True
+        except WebDriverException:
+            return False
+
+    def _discard(self, driver):
+        """關閉並移除瀏覽器"""
+        with self._lock:
+            self._pages.pop(driver, None)
+            self._profiles.pop(driver, None)
+        try:
+            quit_driver(driver)
+        except:
+            pass
+
+    def acquire(self, profile):
+        """
+        借出一個指定設定檔的瀏覽器，沒有可用的閒置瀏覽器時新建一個
+
+        Args:
+            profile (str): BROWSER_PROFILES 中的設定檔名稱
+
+        Returns:
+            WebDriver: Chrome WebDriver
+        """
+        while True:
+            with self._lock:
+                idle = self._idle.get(profile)
+                driver = idle.pop() if idle else None
+            if driver is None:
+                break
+            if self._is_healthy(driver):
+                with self._lock:
+                    self.stats["reused"] += 1
+                return driver
+            with self._lock:
+                self.stats["unhealthy"] += 1
+            self._discard(driver)
+
+        driver = create_driver(profile)
+        with self._lock:
+            self._pages[driver] = 0
+            self._profiles[driver] = profile
+            self.stats["created"] += 1
+        return driver
+
+    def release(self, driver):
+        """
+        歸還瀏覽器；超過回收頁數或閒置數量已滿時直接關閉
+
+        Args:
+            driver: 先前由 acquire 借出的 WebDriver
+        """
+        keep = False
+        with self._lock:
+            profile = self._profiles.get(driver)
+            if self._pages.get(driver, 0) >= self.recycle_after:
+                self.stats["recycled"] += 1
+            elif profile is not None:
+                idle = self._idle.setdefault(profile, [])
+                if len(idle) < self.max_idle:
+                    idle.append(driver)
+                    keep = True
+        if not keep:
+            self._discard(driver)
+
+    def record_page(self, driver, pages=1):
+        """記錄瀏覽器載入的頁數，用於判斷何時回收"""
+        with self._lock:
+            if driver in self._pages:
+                self._pages[driver] += pages
+
+    @contextmanager
+    def borrow(self, profile):
+        """
+        以 with 語法借用瀏覽器，離開區塊時自動歸還
+
+        Args:
+            profile (str): BROWSER_PROFILES 中的設定檔名稱
+        """
+        driver = self.acquire(profile)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close_all(self):
+        """關閉所有閒置的瀏覽器"""
+        with self._lock:
+            drivers = [driver for idle in self._idle.values() for driver in idle]
+            self._idle = {}
+        for driver in drivers:
+            self._discard(driver)
+
+
+_browser_pool = None
+_browser_pool_lock = threading.Lock()
+
+
+def get_browser_pool():
+    """
+    取得行程內共用的瀏覽器池，程式結束時自動關閉所有瀏覽器
+
+    Returns:
+        BrowserPool: 共用的瀏覽器池
+    """
+    global _browser_pool
+    with _browser_pool_lock:
+        if _browser_pool is None:
+            _browser_pool = BrowserPool()
+            atexit.register(_browser_pool.close_all)
+        return _browser_pool
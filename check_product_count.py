@@ -1,15 +1,23 @@
 import json
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-import time
-from urllib.parse import quote
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import argparse
 import warnings
 import logging
+import time
 import os
+import requests
+from urllib.parse import urlparse
+from browser_pool import get_browser_pool, USER_AGENT
+from rate_limiter import get_rate_limiter, parse_rate_spec, configure_rates
+from product_parsers import (
+    MOMO_PAGE_SIZE, PCHOME_SEARCH_API_URL, build_momo_search_url, parse_momo_page, parse_momo_total
+)
+from resilience import RetryPolicy, CircuitOpenError, call_with_retry
 
 # 抑制警告和日誌
 warnings.filterwarnings("ignore")
@@ -18,226 +26,389 @@ logging.getLogger('urllib3').setLevel(logging.CRITICAL)
 os.environ['WDM_LOG_LEVEL'] = '0'
 os.environ['WDM_PRINT_FIRST_LINE'] = 'False'
 
+# momo 搜尋頁載入完成的判斷依據（總數元素或商品列表）
+MOMO_READY_SELECTORS = [
+    ".searchTotal",
+    "span.totalNum",
+    ".totalResults",
+    "li.listAreaLi",
+    "li.goodsItemLi",
+    "li[data-gtm]"
+]
 
-def check_momo_product_count(keyword, target_count=100):
+# 暫時性錯誤（逾時、連線失敗、5xx、429）的重試設定，間隔另受速率限制器控制
+HTTP_RETRY_POLICY = RetryPolicy(max_attempts=3, base_delay=1.0, max_delay=10.0)
+
+COUNT_CACHE_FILE = os.environ.get("SCRAPER_COUNT_CACHE", "product_count_cache.json")
+COUNT_CACHE_TTL = int(os.environ.get("SCRAPER_COUNT_CACHE_TTL", str(6 * 60 * 60)))  # 預設 6 小時
+
+
+class CountCache:
     """
-    檢查 momo 購物網是否有至少 target_count 筆商品
-    
+    商品數量檢查結果的快取（JSON 檔案），超過 ttl 秒的結果視為過期
+
+    每筆記錄 platform + keyword -> {count, exact, checked_at}；exact 為 False 表示
+    count 只是「至少」的下限，只能回答不超過 count 的目標數量。
+    """
+
+    def __init__(self, path=COUNT_CACHE_FILE, ttl=COUNT_CACHE_TTL):
+        """
+        Args:
+            path (str): 快取檔案路徑
+            ttl (int): 結果的有效秒數
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+
+    @staticmethod
+    def _key(platform, keyword):
+        return f"{platform}:{keyword}"
+
+    def get(self, platform, keyword, target_count):
+        """
+        取得仍有效且足以判斷 target_count 的結果
+
+        Returns:
+            dict | None: {count, exact, checked_at}，沒有可用結果時回傳 None
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(platform, keyword))
+        if entry is None or time.time() - entry["checked_at"] > self.ttl:
+            return None
+        if not entry["exact"] and entry["count"] < target_count:
+            return None
+        return entry
+
+    def set(self, platform, keyword, count, exact):
+        with self._lock:
+            self._entries[self._key(platform, keyword)] = {
+                "count": count, "exact": exact, "checked_at": time.time()
+            }
+
+    def save(self):
+        """寫回快取檔案，並移除已過期的結果"""
+        now = time.time()
+        with self._lock:
+            self._entries = {key: entry for key, entry in self._entries.items()
+                             if now - entry["checked_at"] <= self.ttl}
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=4)
+            os.replace(temp_path, self.path)
+
+
+_count_cache = None
+_count_cache_lock = threading.Lock()
+
+
+def get_count_cache():
+    """
+    取得行程內共用的商品數量快取
+
+    Returns:
+        CountCache: 共用的商品數量快取
+    """
+    global _count_cache
+    with _count_cache_lock:
+        if _count_cache is None:
+            _count_cache = CountCache()
+        return _count_cache
+
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def _get_http_session():
+    """
+    取得商品數量檢查共用的 requests Session
+
+    不借用 product_scraper 的 Session：匯入爬蟲模組會一併建立解析行程池的設定、
+    替 WebDriver 安裝指令計數並註冊報告區段，商品數量檢查都用不到。
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.8"})
+            _http_session = session
+        return _http_session
+
+
+def _http_get(url, description, **kwargs):
+    """
+    送出 GET：套用各網站的速率限制，暫時性錯誤依 HTTP_RETRY_POLICY 重試
+
+    Returns:
+        requests.Response: 狀態碼為 2xx 的回應
+
+    Raises:
+        requests.RequestException: 無法重試的錯誤或重試用盡
+        CircuitOpenError: 該網站連續失敗，暫停請求中
+    """
+    def get_once():
+        get_rate_limiter().wait(url)
+        response = _get_http_session().get(url, timeout=15, **kwargs)
+        response.raise_for_status()
+        return response
+
+    return call_with_retry(get_once, url, HTTP_RETRY_POLICY, description)
+
+
+def _fetch_momo_html(keyword, page):
+    """以 HTTP 取得 momo 搜尋結果頁的 HTML"""
+    response = _http_get(build_momo_search_url(keyword, page), f"momo「{keyword}」第 {page} 頁")
+    return response.content
+
+
+def _render_momo_html(keyword, page):
+    """以無頭 Chrome 渲染 momo 搜尋結果頁（HTML 中沒有商品列表時使用）"""
+    search_url = build_momo_search_url(keyword, page)
+    # 從瀏覽器池借用無頭模式的 WebDriver（同一個行程內重複使用）
+    with get_browser_pool().borrow("probe") as driver:
+        get_rate_limiter().wait(search_url)
+        driver.get(search_url)
+        # 等待總數或商品列表出現，取代固定秒數的等待
+        try:
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, ", ".join(MOMO_READY_SELECTORS))))
+        except TimeoutException:
+            pass
+        return driver.page_source
+
+
+def _count_momo_products(keyword, target_count):
+    """
+    取得 momo 搜尋結果的商品總數
+
+    先以 HTTP 讀取頁面上的總數；HTML 中沒有商品列表時才改用瀏覽器渲染。
+    頁面上找不到總數時逐頁累計商品數，直到最後一頁（不滿一頁）或已達 target_count。
+
+    Returns:
+        tuple: (商品數, 是否為確切總數)
+    """
+    fetch = _fetch_momo_html
+    page_html = fetch(keyword, 1)
+    element_count = parse_momo_page(page_html)[0]
+    total = parse_momo_total(page_html)
+    if total is None and element_count == 0:
+        fetch = _render_momo_html
+        page_html = fetch(keyword, 1)
+        element_count = parse_momo_page(page_html)[0]
+        total = parse_momo_total(page_html)
+
+    if total is not None:
+        print(f"  → momo 「{keyword}」頁面總數: {total}")
+        return total, True
+
+    count = element_count
+    page = 1
+    while element_count >= MOMO_PAGE_SIZE and count < target_count:
+        page += 1
+        element_count = parse_momo_page(fetch(keyword, page))[0]
+        count += element_count
+    exact = element_count < MOMO_PAGE_SIZE
+    print(f"  → momo 「{keyword}」逐頁累計 {page} 頁: {'' if exact else '至少 '}{count}")
+    return count, exact
+
+
+def _count_pchome_products(keyword, target_count):
+    """
+    以 PChome 搜尋 API 的 totalRows 取得商品總數
+
+    Returns:
+        tuple: (商品數, 是否為確切總數)
+    """
+    params = {"q": keyword, "page": 1, "sort": "sale/dc"}
+    response = _http_get(PCHOME_SEARCH_API_URL, f"PChome「{keyword}」", params=params)
+    total_count = int(response.json().get("totalRows") or 0)
+    print(f"  → PChome 「{keyword}」總商品數: {total_count}")
+    return total_count, True
+
+
+PLATFORM_COUNTERS = {
+    "momo": _count_momo_products,
+    "pchome": _count_pchome_products
+}
+
+
+def _probe_url(platform, keyword):
+    """某個平台檢查商品數量時第一個請求的網址（用於估計速率限制下的耗時）"""
+    return build_momo_search_url(keyword, 1) if platform == "momo" else PCHOME_SEARCH_API_URL
+
+
+def estimate_check_seconds(jobs, target_count, cache=None, refresh=False):
+    """
+    估計一批檢查在各網站速率限制下至少需要的秒數
+
+    每個未快取的 關鍵字 × 平台 至少要一個請求；同一個網站的請求共用一個 token bucket，
+    所以耗時取決於最慢的網站（預設 momo 每秒 0.5 個請求），與同時執行的檢查數無關。
+
     Args:
-        keyword (str): 搜尋關鍵字
+        jobs (list): (keyword, platform)
         target_count (int): 目標商品數量
-    
+        cache (CountCache): 結果快取
+        refresh (bool): 是否忽略快取
+
     Returns:
-        dict: 包含 platform, has_enough, actual_count 的字典
+        dict: platform -> {"requests", "rate", "seconds"}，只包含需要發出請求的平台
     """
-    driver = None
-    try:
-        # 設定 Chrome 選項（無頭模式，快速）
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')  # 無頭模式
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
-        
-        # 禁用圖片載入以提高速度
-        prefs = {
-            "profile.managed_default_content_settings.images": 2,
-            "profile.default_content_setting_values.notifications": 2
+    limiter = get_rate_limiter()
+    pending = {}
+    for keyword, platform in jobs:
+        if cache and not refresh and cache.get(platform, keyword, target_count):
+            continue
+        pending.setdefault(platform, []).append(_probe_url(platform, keyword))
+    estimates = {}
+    for platform, urls in pending.items():
+        estimates[platform] = {
+            "requests": len(urls),
+            "rate": limiter.limit(urlparse(urls[0]).hostname)[0],
+            "seconds": limiter.minimum_seconds(urls[0], len(urls))
         }
-        chrome_options.add_experimental_option("prefs", prefs)
-        chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
-        
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.set_page_load_timeout(20)
-        
-        print(f"正在檢查 momo: {keyword}")
-        
-        # 建構搜尋 URL（只檢查第一頁）
-        encoded_keyword = quote(keyword)
-        search_url = f"https://www.momoshop.com.tw/search/searchShop.jsp?keyword={encoded_keyword}&searchType=1&cateLevel=0&ent=k&sortType=1&curPage=1"
-        
-        driver.get(search_url)
-        time.sleep(3)
-        
-        # 嘗試找到總商品數量的顯示元素
-        wait = WebDriverWait(driver, 10)
-        total_count = 0
-        
-        # 方法1: 尋找顯示總數的元素
-        selectors_for_total = [
-            ".searchListArea .searchTotal",
-            ".searchTotal",
-            "span.totalNum",
-            ".totalResults",
-            "div[class*='total']"
-        ]
-        
-        for selector in selectors_for_total:
-            try:
-                total_elem = driver.find_element(By.CSS_SELECTOR, selector)
-                total_text = total_elem.text
-                # 提取數字
-                import re
-                numbers = re.findall(r'\d+', total_text)
-                if numbers:
-                    total_count = int(numbers[0])
-                    print(f"  → 從頁面元素找到總數: {total_count}")
-                    break
-            except NoSuchElementException:
-                continue
-        
-        # 方法2: 如果找不到總數，計算商品元素數量並推估
-        if total_count == 0:
-            selectors_to_try = [
-                "li.listAreaLi",
-                ".listAreaUl li.listAreaLi",
-                "li.goodsItemLi",
-                ".prdListArea .goodsItemLi",
-                ".searchPrdListArea li",
-                "li[data-gtm]"
-            ]
-            
-            for selector in selectors_to_try:
-                try:
-                    product_elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                    if product_elements:
-                        first_page_count = len(product_elements)
-                        # momo 每頁通常 30 個商品，推估總數
-                        # 但我們只關心是否超過 target_count
-                        print(f"  → 第一頁找到 {first_page_count} 個商品")
-                        
-                        # 如果第一頁就有 30 個商品，很可能有更多頁
-                        if first_page_count >= 30:
-                            # 估計至少有 3-4 頁的商品
-                            total_count = first_page_count * 3
-                        else:
-                            total_count = first_page_count
-                        break
-                except NoSuchElementException:
-                    continue
-        
-        has_enough = total_count >= target_count
-        
+    return estimates
+
+
+def _check_product_count(platform, keyword, target_count, cache=None, refresh=False):
+    """
+    檢查某個平台是否有至少 target_count 筆商品（先查快取，refresh 為 True 時直接重新檢查）
+
+    Returns:
+        dict: 包含 platform, has_enough, actual_count, exact, cached, keyword 的字典，失敗時另有 error
+    """
+    entry = cache.get(platform, keyword, target_count) if cache and not refresh else None
+    if entry:
         return {
-            "platform": "momo",
-            "has_enough": has_enough,
-            "actual_count": total_count,
+            "platform": platform,
+            "has_enough": entry["count"] >= target_count,
+            "actual_count": entry["count"],
+            "exact": entry["exact"],
+            "cached": True,
             "keyword": keyword
         }
-        
-    except Exception as e:
-        print(f"momo 檢查發生錯誤: {e}")
+
+    print(f"正在檢查 {platform}: {keyword}")
+    try:
+        count, exact = PLATFORM_COUNTERS[platform](keyword, target_count)
+    except (requests.RequestException, CircuitOpenError, ValueError, AttributeError, WebDriverException) as e:
+        print(f"{platform} 檢查發生錯誤: {e}")
         return {
-            "platform": "momo",
+            "platform": platform,
             "has_enough": False,
             "actual_count": 0,
+            "exact": False,
+            "cached": False,
             "keyword": keyword,
             "error": str(e)
         }
-    
-    finally:
-        if driver:
-            try:
-                driver.quit()
-            except:
-                pass
+
+    if cache:
+        cache.set(platform, keyword, count, exact)
+    return {
+        "platform": platform,
+        "has_enough": count >= target_count,
+        "actual_count": count,
+        "exact": exact,
+        "cached": False,
+        "keyword": keyword
+    }
+
+
+def check_momo_product_count(keyword, target_count=100):
+    """
+    檢查 momo 購物網是否有至少 target_count 筆商品
+
+    Args:
+        keyword (str): 搜尋關鍵字
+        target_count (int): 目標商品數量
+
+    Returns:
+        dict: 包含 platform, has_enough, actual_count 的字典
+    """
+    return _check_product_count("momo", keyword, target_count, get_count_cache())
 
 
 def check_pchome_product_count(keyword, target_count=100):
     """
     檢查 PChome 購物網是否有至少 target_count 筆商品
-    
+
     Args:
         keyword (str): 搜尋關鍵字
         target_count (int): 目標商品數量
-    
+
     Returns:
         dict: 包含 platform, has_enough, actual_count 的字典
     """
-    driver = None
+    return _check_product_count("pchome", keyword, target_count, get_count_cache())
+
+
+def check_product_counts(keywords, target_count=100, workers=8, cache=None, refresh=False):
+    """
+    同時檢查多個關鍵字在 momo 與 PChome 的商品數量
+
+    每個 關鍵字 × 平台 都是獨立的工作，各網站的請求間隔仍由速率限制器控制，
+    workers 超過速率允許的數量並不會更快（預設 momo 每秒 0.5 個請求，約每 2 秒檢查一個關鍵字，
+    可用 --rate momo=RPS[:BURST] 或環境變數 SCRAPER_HOST_RATES 調整）；快取中仍有效的結果不會重新檢查。
+
+    Args:
+        keywords (list): 搜尋關鍵字
+        target_count (int): 目標商品數量
+        workers (int): 同時執行的檢查數
+        cache (CountCache): 結果快取，預設為共用快取
+        refresh (bool): 忽略快取中的結果，全部重新檢查（新結果仍會寫入快取）
+
+    Returns:
+        list: 每個關鍵字的結果 {keyword, target_count, momo, pchome, both_have_enough}，順序與 keywords 相同
+    """
+    cache = cache or get_count_cache()
+    jobs = [(keyword, platform) for keyword in keywords for platform in PLATFORM_COUNTERS]
+    estimates = estimate_check_seconds(jobs, target_count, cache, refresh)
+    slowest = max(estimates, key=lambda platform: estimates[platform]["seconds"], default=None)
+    if slowest and estimates[slowest]["seconds"] >= 1:
+        estimate = estimates[slowest]
+        print(f"{slowest} 需要檢查 {estimate['requests']} 個關鍵字，速率限制每秒 {estimate['rate']:g} 個請求，"
+              f"預計至少 {estimate['seconds']:.0f} 秒（逐頁累計或改用瀏覽器時更久；可用 --rate 調整速率）")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        checked = list(executor.map(
+            lambda job: _check_product_count(job[1], job[0], target_count, cache, refresh), jobs))
     try:
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')  # 無頭模式
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
-        
-        prefs = {
-            "profile.managed_default_content_settings.images": 2,
-            "profile.default_content_setting_values.notifications": 2
-        }
-        chrome_options.add_experimental_option("prefs", prefs)
-        chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
-        
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.set_page_load_timeout(20)
-        
-        print(f"正在檢查 PChome: {keyword}")
-        
-        encoded_keyword = quote(keyword)
-        search_url = f"https://ecshweb.pchome.com.tw/search/v3.3/all/results?q={encoded_keyword}&page=1&sort=sale/dc"
-        
-        driver.get(search_url)
-        time.sleep(2)
-        
-        try:
-            # PChome 的搜尋結果是 JSON 格式
-            body = driver.find_element(By.TAG_NAME, "pre").text
-            data = json.loads(body)
-            
-            # 從 JSON 中取得總商品數
-            total_count = data.get("totalRows", 0)
-            print(f"  → PChome 總商品數: {total_count}")
-            
-            has_enough = total_count >= target_count
-            
-            return {
-                "platform": "pchome",
-                "has_enough": has_enough,
-                "actual_count": total_count,
-                "keyword": keyword
-            }
-            
-        except Exception as e:
-            print(f"解析 PChome JSON 失敗: {e}")
-            return {
-                "platform": "pchome",
-                "has_enough": False,
-                "actual_count": 0,
-                "keyword": keyword,
-                "error": str(e)
-            }
-        
-    except Exception as e:
-        print(f"PChome 檢查發生錯誤: {e}")
-        return {
-            "platform": "pchome",
-            "has_enough": False,
-            "actual_count": 0,
+        cache.save()
+    except OSError as e:
+        print(f"無法寫入商品數量快取: {e}")
+
+    results = []
+    for index, keyword in enumerate(keywords):
+        momo_result, pchome_result = checked[index * 2], checked[index * 2 + 1]
+        results.append({
             "keyword": keyword,
-            "error": str(e)
-        }
-    
-    finally:
-        if driver:
-            try:
-                driver.quit()
-            except:
-                pass
+            "target_count": target_count,
+            "momo": momo_result,
+            "pchome": pchome_result,
+            "both_have_enough": momo_result["has_enough"] and pchome_result["has_enough"]
+        })
+    return results
+
+
+def _format_count(result):
+    return f"{'' if result['exact'] else '至少 '}{result['actual_count']}"
 
 
 def check_both_platforms(keyword, target_count=100):
     """
     同時檢查 momo 和 PChome 兩個平台的商品數量
-    
+
     Args:
         keyword (str): 搜尋關鍵字
         target_count (int): 目標商品數量（預設 100）
-    
+
     Returns:
         dict: 包含兩個平台檢查結果的字典
     """
@@ -245,64 +416,103 @@ def check_both_platforms(keyword, target_count=100):
     print(f"檢查關鍵字: {keyword}")
     print(f"目標數量: {target_count} 筆")
     print(f"{'='*60}\n")
-    
-    # 檢查 momo
-    momo_result = check_momo_product_count(keyword, target_count)
-    
-    # 檢查 PChome
-    pchome_result = check_pchome_product_count(keyword, target_count)
-    
-    # 整理結果
-    results = {
-        "keyword": keyword,
-        "target_count": target_count,
-        "momo": momo_result,
-        "pchome": pchome_result,
-        "both_have_enough": momo_result["has_enough"] and pchome_result["has_enough"]
-    }
-    
+
+    # 兩個平台同時檢查
+    results = check_product_counts([keyword], target_count)[0]
+    momo_result, pchome_result = results["momo"], results["pchome"]
+
     # 顯示結果
     print(f"\n{'='*60}")
     print(f"檢查結果摘要")
     print(f"{'='*60}")
     print(f"關鍵字: {keyword}")
     print(f"\nmomo 購物網:")
-    print(f"  • 商品數量: {momo_result['actual_count']} 筆")
+    print(f"  • 商品數量: {_format_count(momo_result)} 筆")
     print(f"  • 是否足夠: {'✓ 是' if momo_result['has_enough'] else '✗ 否'}")
     if "error" in momo_result:
         print(f"  • 錯誤: {momo_result['error']}")
-    
+
     print(f"\nPChome 購物網:")
-    print(f"  • 商品數量: {pchome_result['actual_count']} 筆")
+    print(f"  • 商品數量: {_format_count(pchome_result)} 筆")
     print(f"  • 是否足夠: {'✓ 是' if pchome_result['has_enough'] else '✗ 否'}")
     if "error" in pchome_result:
         print(f"  • 錯誤: {pchome_result['error']}")
-    
+
     print(f"\n最終結論:")
     if results["both_have_enough"]:
         print(f"  ✓ 兩個平台都有至少 {target_count} 筆商品")
     else:
         print(f"  ✗ 至少有一個平台商品數量不足 {target_count} 筆")
     print(f"{'='*60}\n")
-    
+
     return results
 
 
+def _load_keywords(keywords_file):
+    """讀取關鍵字清單（每行一個關鍵字，# 開頭為註解）"""
+    with open(keywords_file, "r", encoding="utf-8-sig") as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="檢查關鍵字在 momo 與 PChome 的商品數量（不帶參數時以互動模式執行）")
+    parser.add_argument("keywords", nargs="*", help="要檢查的關鍵字")
+    parser.add_argument("--file", help="關鍵字清單檔案（每行一個）")
+    parser.add_argument("--target", type=int, default=100, help="目標商品數量（預設 100）")
+    parser.add_argument("--workers", type=int, default=8, help="同時執行的檢查數（預設 8）")
+    parser.add_argument("--ttl", type=int, default=COUNT_CACHE_TTL,
+                        help=f"快取結果的有效秒數（預設 {COUNT_CACHE_TTL}）")
+    parser.add_argument("--refresh", action="store_true", help="忽略快取，全部重新檢查")
+    parser.add_argument("--output", help="結果輸出的 JSON 檔案")
+    parser.add_argument("--rate", action="append", default=[], type=parse_rate_spec, metavar="HOST=RPS[:BURST]",
+                        help="調整某個網站的請求速率，可重複指定，例如 --rate momo=1:3 --rate pchome=0.8"
+                             "（也可用環境變數 SCRAPER_HOST_RATES，以逗號分隔）")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    print("="*60)
-    print("商品數量檢查工具")
-    print("檢查 momo 和 PChome 是否有足夠的商品數量")
-    print("="*60)
-    
-    keyword = input("\n請輸入搜尋關鍵字: ").strip()
-    
-    if not keyword:
-        print("錯誤: 關鍵字不能為空")
-        exit(1)
-    
-    # 詢問目標數量（預設 100）
-    target_input = input("請輸入目標商品數量 (預設 100): ").strip()
-    target_count = int(target_input) if target_input.isdigit() else 100
-    
-    # 執行檢查
-    results = check_both_platforms(keyword, target_count)
+    args = _parse_args()
+    for host, rate, burst in configure_rates(args.rate):
+        print(f"速率設定: {host} 每秒 {rate:g} 個請求，突發上限 {burst}")
+    keywords = list(args.keywords)
+    if args.file:
+        keywords.extend(_load_keywords(args.file))
+
+    if keywords:
+        # 批次模式：同時檢查所有關鍵字
+        started = time.perf_counter()
+        results = check_product_counts(keywords, args.target, args.workers, CountCache(ttl=args.ttl),
+                                       args.refresh)
+
+        print(f"\n{'='*60}")
+        print(f"商品數量檢查結果（目標 {args.target} 筆）")
+        print(f"{'='*60}")
+        for result in results:
+            print(f"  {'✓' if result['both_have_enough'] else '✗'} {result['keyword']}："
+                  f"momo {_format_count(result['momo'])}，PChome {_format_count(result['pchome'])}")
+        enough = sum(result["both_have_enough"] for result in results)
+        print(f"共 {len(results)} 個關鍵字，{enough} 個兩個平台都足夠，耗時 {time.perf_counter() - started:.1f} 秒")
+        print(f"{'='*60}\n")
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=4)
+            print(f"結果已寫入 {args.output}")
+    else:
+        print("="*60)
+        print("商品數量檢查工具")
+        print("檢查 momo 和 PChome 是否有足夠的商品數量")
+        print("="*60)
+
+        keyword = input("\n請輸入搜尋關鍵字: ").strip()
+
+        if not keyword:
+            print("錯誤: 關鍵字不能為空")
+            exit(1)
+
+        # 詢問目標數量（預設 100）
+        target_input = input("請輸入目標商品數量 (預設 100): ").strip()
+        target_count = int(target_input) if target_input.isdigit() else 100
+
+        # 執行檢查
+        results = check_both_platforms(keyword, target_count)
@@ -0,0 +1,253 @@
+from contextlib import contextmanager
+from mysql.connector import errors
+import mysql.connector
+import threading
+import atexit
+import time
+import os
+
+# MySQL 連線設定（可用環境變數覆寫）；不指定資料庫，查詢一律寫成 資料庫.表格
+MYSQL_CONFIG = {
+    "host": os.environ.get("MYSQL_HOST", "localhost"),
+    "port": int(os.environ.get("MYSQL_PORT", "3306")),
+    "user": os.environ.get("MYSQL_USER", "root"),
+    "password": os.environ.get("MYSQL_PASSWORD", "12345678"),
+    "auth_plugin": "caching_sha2_password",
+    "autocommit": True,
+    "use_unicode": True,
+    "charset": "utf8mb4"
+}
+
+# 連線池大小、借用逾時秒數、閒置多久後借出前先 ping 確認
+POOL_SIZE = int(os.environ.get("MYSQL_POOL_SIZE", "5"))
+POOL_TIMEOUT = float(os.environ.get("MYSQL_POOL_TIMEOUT", "10"))
+VALIDATE_AFTER = float(os.environ.get("MYSQL_POOL_VALIDATE_AFTER", "30"))
+
+# 批次插入時每批的列數（每批合併成一個多列 INSERT）
+INSERT_CHUNK_SIZE = 500
+
+
+class MySQLPool:
+    """
+    行程內共用的 MySQL 連線池
+
+    caching_sha2_password 驗證每次連線都要多次往返，是小請求最主要的成本，
+    所以連線建立後保留重複使用。連線數達到 size 時借用會等待，超過 timeout
+    秒拋出 PoolError；閒置超過 validate_after 秒的連線借出前先 ping，已斷線就重建。
+    """
+
+    def __init__(self, size=POOL_SIZE, timeout=POOL_TIMEOUT, validate_after=VALIDATE_AFTER, config=None):
+        """
+        Args:
+            size (int): 最多同時開啟的連線數
+            timeout (float): 連線都被借走時最多等待幾秒
+            validate_after (float): 閒置超過幾秒的連線借出前先確認仍可使用
+            config (dict): mysql.connector.connect 的參數，預設為 MYSQL_CONFIG
+        """
+        self.size = size
+        self.timeout = timeout
+        self.validate_after = validate_after
+        self.config = dict(config or MYSQL_CONFIG)
+        self._idle = []  # [(connection, 歸還時間), ...]
+        self._open = 0  # 已開啟（閒置 + 借出）的連線數，包含建立中的連線
+        self._condition = threading.Condition()
+        self.stats = {
+            "created": 0, "reused": 0, "checkouts": 0, "waits": 0, "wait_seconds": 0.0,
+            "timeouts": 0, "invalid": 0, "discarded": 0
+        }
+
+    def _connect(self):
+        """建立新連線；失敗時釋放預留的名額"""
+        try:
+            conn = mysql.connector.connect(**self.config)
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self.stats["created"] += 1
+        return conn
+
+    def _is_valid(self, conn):
+        """以 ping 確認連線仍可使用"""
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        """關閉連線並釋放名額"""
+        with self._condition:
+            self._open -= 1
+            self.stats["discarded"] += 1
+            self._condition.notify()
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """
+        借出一個連線，沒有閒置連線且未達上限時新建一個
+
+        Returns:
+            MySQLConnection: 已連線、autocommit 的連線
+
+        Raises:
+            PoolError: 等待 timeout 秒仍沒有可用的連線
+        """
+        deadline = time.monotonic() + self.timeout
+        waited_since = None
+        while True:
+            with self._condition:
+                while not self._idle and self._open >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats["timeouts"] += 1
+                        raise errors.PoolError(f"等待 {self.timeout:g} 秒仍沒有可用的 MySQL 連線（上限 {self.size} 個）")
+                    if waited_since is None:
+                        waited_since = time.monotonic()
+                        self.stats["waits"] += 1
+                    self._condition.wait(remaining)
+                if waited_since is not None:
+                    self.stats["wait_seconds"] += time.monotonic() - waited_since
+                    waited_since = None
+                self.stats["checkouts"] += 1
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                else:
+                    conn, released_at = None, None
+                    self._open += 1  # 先預留名額，在鎖外建立連線
+
+            if conn is None:
+                return self._connect()
+            if time.monotonic() - released_at < self.validate_after or self._is_valid(conn):
+                with self._condition:
+                    self.stats["reused"] += 1
+                return conn
+            with self._condition:
+                self.stats["invalid"] += 1
+                self.stats["checkouts"] -= 1
+            self._discard(conn)
+
+    def release(self, conn, broken=False):
+        """
+        歸還連線；未完成的交易會先回滾
+
+        Args:
+            conn: 先前由 acquire 借出的連線
+            broken (bool): 使用中發生連線層級的錯誤，直接關閉不再使用
+        """
+        if not broken:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except Exception:
+                broken = True
+        if broken:
+            self._discard(conn)
+            return
+        with self._condition:
+            self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        以 with 語法借用連線，離開區塊時自動歸還
+
+        連線中斷類的錯誤（InterfaceError、OperationalError）發生時連線不放回池中。
+        """
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except (errors.InterfaceError, errors.OperationalError):
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken)
+
+    def report(self):
+        """
+        Returns:
+            dict: 連線池設定、目前借出 / 閒置的連線數與累計統計
+        """
+        with self._condition:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "in_use": self._open - len(self._idle),
+                "idle": len(self._idle),
+                **self.stats,
+                "wait_seconds": round(self.stats["wait_seconds"], 3)
+            }
+
+    def close_all(self):
+        """關閉所有閒置的連線"""
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+
+def insert_rows(cursor, query, rows, on_error=None, chunk_size=INSERT_CHUNK_SIZE):
+    """
+    以 executemany 分批插入資料列，交易由呼叫端開始與提交
+
+    mysql.connector 會把每批合併成一個多列 INSERT，一批只需一次往返。某一批失敗時
+    （例如違反 UNIQUE），MySQL 只回滾該語句，這一批改為逐列插入，略過有問題的資料列。
+
+    Args:
+        cursor: 資料庫游標
+        query (str): INSERT ... VALUES (%s, ...) 語句
+        rows (list): 每列的參數 tuple
+        on_error (callable): 逐列插入失敗時呼叫 on_error(資料列索引, 錯誤)
+        chunk_size (int): 每批的列數
+
+    Returns:
+        int: 成功插入的列數
+    """
+    inserted = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        try:
+            cursor.executemany(query, chunk)
+            inserted += len(chunk)
+            continue
+        except (errors.InterfaceError, errors.OperationalError):
+            raise
+        except errors.Error as e:
+            print(f"第 {start + 1} ~ {start + len(chunk)} 列批次插入失敗，改為逐列插入: {e}")
+
+        for offset, row in enumerate(chunk):
+            try:
+                cursor.execute(query, row)
+                inserted += 1
+            except (errors.InterfaceError, errors.OperationalError):
+                raise
+            except errors.Error as e:
+                if on_error:
+                    on_error(start + offset, e)
+    return inserted
+
+
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+
+def get_db_pool():
+    """
+    取得行程內共用的 MySQL 連線池，程式結束時自動關閉閒置連線
+
+    Returns:
+        MySQLPool: 共用的連線池
+    """
+    global _db_pool
+    with _db_pool_lock:
+        if _db_pool is None:
+            _db_pool = MySQLPool()
+            atexit.register(_db_pool.close_all)
+        return _db_pool
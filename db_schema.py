@@ -0,0 +1,293 @@
+from mysql.connector import Error
+from datetime import datetime
+import argparse
+from db_pool import get_db_pool
+
+# 自動遞增的代理主鍵（三個表格都允許重複或缺少 SKU，沒有天然主鍵）
+ID_COLUMN = ("id", "BIGINT UNSIGNED NOT NULL AUTO_INCREMENT")
+
+# 三個表格的唯一定義：所在資料庫、欄位（名稱, 型別）與索引（名稱, 類型, 欄位）
+# 啟動時的遷移與匯出 SQL 檔案的建表語句都由這裡產生
+TABLES = {
+    # 標註結果：與 momo 商品相符的 PChome 商品（connect 為對應的 momo SKU，允許重複 SKU）
+    "products": {
+        "database": "products_database",
+        "columns": [
+            ID_COLUMN,
+            ("sku", "VARCHAR(100)"),
+            ("title", "VARCHAR(255)"),
+            ("image", "TEXT"),
+            ("url", "TEXT"),
+            ("platform", "VARCHAR(50)"),
+            ("connect", "VARCHAR(100)"),
+            ("price", "DECIMAL(10, 2)"),
+            ("uncertainty_problem", "TINYINT UNSIGNED NOT NULL DEFAULT 0 CHECK (uncertainty_problem BETWEEN 0 AND 100)"),
+            ("query", "VARCHAR(100)")
+        ],
+        "keys": [
+            ("PRIMARY", "PRIMARY KEY", ["id"]),
+            # 刪除已標註商品時以 connect（momo SKU）查詢與刪除
+            ("idx_connect", "KEY", ["connect"]),
+            ("idx_sku", "KEY", ["sku"]),
+            ("idx_query", "KEY", ["query"])
+        ]
+    },
+    # 標註時作為 root 的 momo 商品（允許重複 SKU）
+    "momo_products": {
+        "database": "momo_database",
+        "columns": [
+            ID_COLUMN,
+            ("sku", "VARCHAR(100)"),
+            ("title", "VARCHAR(255)"),
+            ("image", "TEXT"),
+            ("url", "TEXT"),
+            ("platform", "VARCHAR(50)"),
+            ("connect", "VARCHAR(100)"),
+            ("price", "DECIMAL(10, 2)"),
+            ("num", "INT"),
+            ("query", "VARCHAR(100)")
+        ],
+        "keys": [
+            ("PRIMARY", "PRIMARY KEY", ["id"]),
+            ("idx_sku", "KEY", ["sku"]),
+            ("idx_query", "KEY", ["query"])
+        ]
+    },
+    # 從 pchome_products.json 載入的候選商品
+    "pchome_products": {
+        "database": "pchome_database",
+        "columns": [
+            ID_COLUMN,
+            ("sku", "VARCHAR(100)"),
+            ("title", "VARCHAR(255)"),
+            ("image", "TEXT"),
+            ("url", "TEXT"),
+            ("platform", "VARCHAR(50)"),
+            ("connect", "VARCHAR(100)"),
+            ("price", "DECIMAL(10, 2)"),
+            ("query", "VARCHAR(100)")
+        ],
+        "keys": [
+            ("PRIMARY", "PRIMARY KEY", ["id"]),
+            ("sku", "UNIQUE KEY", ["sku"]),
+            ("idx_query", "KEY", ["query"])
+        ]
+    }
+}
+
+# 已套用的遷移版本記錄在這個表格
+MIGRATIONS_TABLE = "products_database.schema_migrations"
+
+# 避免多個行程（例如 Flask reloader）同時執行遷移
+MIGRATION_LOCK = "product_comparison_schema"
+
+
+def qualified_name(table):
+    """回傳 資料庫.表格 名稱，例如 products_database.products"""
+    return f"{TABLES[table]['database']}.{table}"
+
+
+def column_names(table):
+    """回傳表格的欄位名稱列表（依建表順序）"""
+    return [name for name, _ in TABLES[table]["columns"]]
+
+
+def _key_sql(name, kind, columns):
+    """索引定義，例如 KEY `idx_sku` (`sku`)；主鍵不寫名稱"""
+    column_list = ", ".join(f"`{column}`" for column in columns)
+    if kind == "PRIMARY KEY":
+        return f"PRIMARY KEY ({column_list})"
+    return f"{kind} `{name}` ({column_list})"
+
+
+def create_table_sql(table, qualified=True):
+    """
+    產生表格的建表語句
+
+    Args:
+        table (str): TABLES 中的表格名稱
+        qualified (bool): 表格名稱是否加上資料庫（匯出的 SQL 檔案不加，匯入時由使用者選擇資料庫）
+
+    Returns:
+        str: CREATE TABLE IF NOT EXISTS 語句
+    """
+    definition = TABLES[table]
+    name = f"`{definition['database']}`.`{table}`" if qualified else f"`{table}`"
+    lines = [f"  `{column}` {column_type}" for column, column_type in definition["columns"]]
+    lines += [f"  {_key_sql(*key)}" for key in definition["keys"]]
+    body = ",\n".join(lines)
+    return f"CREATE TABLE IF NOT EXISTS {name} (\n{body}\n) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;"
+
+
+def _create_tables(cursor):
+    """建立三個資料庫與表格（已存在的表格不會修改）"""
+    for table, definition in TABLES.items():
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{definition['database']}`")
+        cursor.execute(create_table_sql(table))
+
+
+def _existing_columns(cursor, table):
+    cursor.execute(
+        "SELECT column_name FROM information_schema.columns WHERE table_schema = %s AND table_name = %s",
+        (TABLES[table]["database"], table)
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _existing_keys(cursor, table):
+    cursor.execute(
+        "SELECT DISTINCT index_name FROM information_schema.statistics WHERE table_schema = %s AND table_name = %s",
+        (TABLES[table]["database"], table)
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _add_keys(cursor):
+    """
+    為既有的表格補上代理主鍵 id 與 TABLES 中定義的索引
+
+    每個表格只執行一次 ALTER TABLE（只重建一次表格）；既有資料列會依序編上 id。
+    """
+    for table in TABLES:
+        changes = []
+        if ID_COLUMN[0] not in _existing_columns(cursor, table):
+            changes.append(f"ADD COLUMN `{ID_COLUMN[0]}` {ID_COLUMN[1]} FIRST")
+        existing_keys = _existing_keys(cursor, table)
+        changes += [f"ADD {_key_sql(*key)}" for key in TABLES[table]["keys"] if key[0] not in existing_keys]
+        if changes:
+            print(f"  {qualified_name(table)}: {', '.join(changes)}")
+            cursor.execute(f"ALTER TABLE {qualified_name(table)} " + ", ".join(changes))
+
+
+# 遷移列表：(版本, 說明, 函式)，函式接收 cursor 執行變更
+# 全新的資料庫由版本 1 直接建立最新的表格結構，之後的遷移要先檢查 information_schema，
+# 已經是目標結構時跳過，這樣新舊資料庫都能套用同一份遷移列表
+MIGRATIONS = [
+    (1, "建立 products、momo_products、pchome_products 三個表格", _create_tables),
+    (2, "加入代理主鍵 id，以及 connect、sku、query 索引", _add_keys),
+]
+
+# 比對網頁經常執行、必須使用索引的查詢：(說明, SQL, 參數)
+INDEXED_QUERIES = [
+    ("刪除已標註商品：計算連結數", "SELECT COUNT(*) FROM products_database.products WHERE connect = %s", ("sku",)),
+    ("刪除已標註商品：刪除 PChome 商品", "DELETE FROM products_database.products WHERE connect = %s", ("sku",)),
+    ("刪除已標註商品：刪除 momo 商品", "DELETE FROM momo_database.momo_products WHERE sku = %s", ("sku",)),
+    ("以 SKU 查詢已標註商品", "SELECT * FROM products_database.products WHERE sku = %s", ("sku",)),
+    ("以 SKU 查詢 PChome 商品", "SELECT * FROM pchome_database.pchome_products WHERE sku = %s", ("sku",)),
+] + [
+    (f"以 query 查詢 {table}", f"SELECT * FROM {qualified_name(table)} WHERE query = %s", ("query",))
+    for table in TABLES
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def applied_versions(cursor):
+    """
+    Returns:
+        dict: 已套用的版本 -> 套用時間
+    """
+    cursor.execute(f"SELECT version, applied_at FROM {MIGRATIONS_TABLE} ORDER BY version")
+    return {version: applied_at for version, applied_at in cursor.fetchall()}
+
+
+def migrate():
+    """
+    套用尚未執行的遷移，在程式啟動時執行一次
+
+    之後路由都假設表格已存在，不再於每次請求執行 CREATE DATABASE / CREATE TABLE
+    （DDL 會取得 metadata lock，與其他請求互相等待）。
+
+    Returns:
+        list: 這次套用的版本
+    """
+    applied = []
+    with get_db_pool().connection() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT GET_LOCK(%s, 60)", (MIGRATION_LOCK,))
+        if cursor.fetchone()[0] != 1:
+            raise Error(msg="等待其他行程執行資料庫遷移逾時")
+        try:
+            cursor.execute("CREATE DATABASE IF NOT EXISTS products_database")
+            cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+                version INT PRIMARY KEY,
+                description VARCHAR(255),
+                applied_at DATETIME
+            )
+            """)
+            done = applied_versions(cursor)
+            for version, description, apply in MIGRATIONS:
+                if version in done:
+                    continue
+                print(f"正在套用資料庫遷移 {version}: {description}")
+                # MySQL 的 DDL 會自動提交，每個版本完成後立即記錄，中途失敗時下次從該版本重新開始
+                apply(cursor)
+                cursor.execute(
+                    f"INSERT INTO {MIGRATIONS_TABLE} (version, description, applied_at) VALUES (%s, %s, %s)",
+                    (version, description, datetime.now())
+                )
+                conn.commit()
+                applied.append(version)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+            cursor.fetchone()
+
+    if applied:
+        print(f"資料庫結構已更新到版本 {LATEST_VERSION}")
+    else:
+        print(f"資料庫結構已是最新版本 {LATEST_VERSION}")
+    return applied
+
+
+def check_query_plans():
+    """
+    以 EXPLAIN 確認 INDEXED_QUERIES 都使用索引，沒有全表掃描
+
+    Returns:
+        list: 每個查詢的 {description, table, type, key, rows, ok}
+    """
+    results = []
+    with get_db_pool().connection() as conn, conn.cursor() as cursor:
+        for description, query, params in INDEXED_QUERIES:
+            cursor.execute(f"EXPLAIN {query}", params)
+            columns = [col[0] for col in cursor.description]
+            plan = dict(zip(columns, cursor.fetchone()))
+            cursor.fetchall()
+            results.append({
+                "description": description,
+                "table": plan.get("table"),
+                "type": plan.get("type"),
+                "key": plan.get("key"),
+                "rows": plan.get("rows"),
+                # 以唯一索引查詢空表格時，最佳化階段就已確定沒有資料（Extra 為 no matching row in const table）
+                "ok": (plan.get("key") is not None and plan.get("type") != "ALL")
+                      or "const table" in str(plan.get("Extra") or "")
+            })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="建立或更新比對網頁使用的 MySQL 表格")
+    parser.add_argument("--status", action="store_true", help="只列出已套用的遷移，不執行")
+    parser.add_argument("--explain", action="store_true", help="以 EXPLAIN 確認常用查詢都使用索引（有全表掃描時結束代碼為 1）")
+    args = parser.parse_args()
+
+    try:
+        if args.status:
+            with get_db_pool().connection() as conn, conn.cursor() as cursor:
+                done = applied_versions(cursor)
+            for version, description, _ in MIGRATIONS:
+                state = f"已套用 {done[version]}" if version in done else "尚未套用"
+                print(f"{version}: {description}（{state}）")
+        elif args.explain:
+            results = check_query_plans()
+            for result in results:
+                mark = "✓" if result["ok"] else "✗ 全表掃描"
+                print(f"{mark} {result['description']}: type={result['type']}, key={result['key']}, rows={result['rows']}")
+            if not all(result["ok"] for result in results):
+                raise SystemExit(1)
+        else:
+            migrate()
+    except Error as e:
+        print(f"MySQL 錯誤: {e}")
+        raise SystemExit(1)
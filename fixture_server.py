@@ -0,0 +1,267 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qsl, urlencode
+import threading
+import argparse
+import json
+import re
+import os
+
+FIXTURE_DIR = "fixtures"
+INDEX_FILE = "index.json"
+
+# 回放伺服器上各平台使用的路徑（與正式網站相同，爬蟲只需要換掉網址的前半段）
+MOMO_SEARCH_PATH = "/search/searchShop.jsp"
+PCHOME_API_PATH = "/search/v3.3/all/results"
+
+
+def fixture_key(url):
+    """
+    將網址轉成固定的索引鍵（路徑 + 排序過的查詢參數），忽略網域與參數順序
+
+    Args:
+        url (str): 完整網址或 "路徑?查詢參數"
+
+    Returns:
+        str: 例如 /search/v3.3/all/results?page=1&q=iphone&sort=rnk%2Fdc
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{parts.path}?{query}" if query else parts.path
+
+
+class FixtureStore:
+    """
+    錄製下來的網頁與 JSON 回應
+
+    每個回應存成一個檔案，index.json 記錄 索引鍵 -> {file, content_type}。
+    """
+
+    def __init__(self, fixture_dir=FIXTURE_DIR):
+        """
+        Args:
+            fixture_dir (str): 錄製檔案的資料夾
+        """
+        self.fixture_dir = fixture_dir
+        self.index_path = os.path.join(fixture_dir, INDEX_FILE)
+        self.index = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+
+    def save(self, url, body, content_type):
+        """
+        存入一個回應
+
+        Args:
+            url (str): 請求的網址
+            body (bytes): 回應內容
+            content_type (str): 回應的 Content-Type
+        """
+        key = fixture_key(url)
+        extension = ".json" if "json" in content_type else ".html"
+        with self._lock:
+            entry = self.index.get(key)
+            file_name = entry["file"] if entry else f"{len(self.index) + 1:04d}{extension}"
+            if not os.path.exists(self.fixture_dir):
+                os.makedirs(self.fixture_dir, exist_ok=True)
+            with open(os.path.join(self.fixture_dir, file_name), "wb") as f:
+                f.write(body)
+            self.index[key] = {"file": file_name, "content_type": content_type}
+            with open(self.index_path, "w", encoding="utf-8") as f:
+                json.dump(self.index, f, ensure_ascii=False, indent=4)
+
+    def load(self, url):
+        """
+        取出一個回應
+
+        Returns:
+            tuple | None: (回應內容, Content-Type)，沒有錄製過時回傳 None
+        """
+        entry = self.index.get(fixture_key(url))
+        if entry is None:
+            return None
+        with open(os.path.join(self.fixture_dir, entry["file"]), "rb") as f:
+            return f.read(), entry["content_type"]
+
+    def save_expected(self, platform, keyword, products):
+        """存入錄製當下解析出的商品，作為解析正確性的比對基準"""
+        path = os.path.join(self.fixture_dir, f"expected_{platform}_{_slug(keyword)}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(products, f, ensure_ascii=False, indent=4)
+
+    def load_expected(self, platform, keyword):
+        """讀取比對基準，沒有時回傳 None"""
+        path = os.path.join(self.fixture_dir, f"expected_{platform}_{_slug(keyword)}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def _slug(keyword):
+    return re.sub(r'[^\w\-]+', '_', keyword).strip('_') or "keyword"
+
+
+class FixtureServer:
+    """
+    在本機回放錄製內容的 HTTP 伺服器，取代 momo 與 PChome 的正式網站
+
+    爬蟲以環境變數 MOMO_BASE_URL、PCHOME_SEARCH_API_URL 指向這個伺服器即可離線執行。
+    """
+
+    def __init__(self, fixture_dir=FIXTURE_DIR, host="127.0.0.1", port=0):
+        """
+        Args:
+            fixture_dir (str): 錄製檔案的資料夾
+            host (str): 監聽的位址
+            port (int): 監聽的連接埠，0 表示自動選擇
+        """
+        self.store = FixtureStore(fixture_dir)
+        self.stats = {"served": 0, "missing": 0}
+        self._stats_lock = threading.Lock()
+        self._thread = None
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fixture = server.store.load(self.path)
+                with server._stats_lock:
+                    server.stats["served" if fixture else "missing"] += 1
+                if fixture is None:
+                    self.send_error(404, "fixture not recorded")
+                    return
+                body, content_type = fixture
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def scraper_env(self):
+        """
+        讓爬蟲改連到這個伺服器所需的環境變數
+
+        Returns:
+            dict: MOMO_BASE_URL, PCHOME_BASE_URL, PCHOME_SEARCH_API_URL
+        """
+        return {
+            "MOMO_BASE_URL": self.base_url,
+            "PCHOME_BASE_URL": self.base_url,
+            "PCHOME_SEARCH_API_URL": self.base_url + PCHOME_API_PATH
+        }
+
+    def start(self):
+        """在背景執行緒啟動伺服器"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _strip_scripts(page_html):
+    """移除 <script>，避免回放時頁面上的 JavaScript 連到正式網站"""
+    return re.sub(r'<script\b.*?</script\s*>', '', page_html, flags=re.IGNORECASE | re.DOTALL)
+
+
+def record_fixtures(keywords, pages=2, fixture_dir=FIXTURE_DIR, momo_source="http"):
+    """
+    從正式網站錄製 momo 搜尋頁與 PChome 搜尋 API，並存下當下的解析結果作為比對基準
+
+    Args:
+        keywords (list): 搜尋關鍵字
+        pages (int): 每個關鍵字錄製的頁數
+        fixture_dir (str): 錄製檔案的資料夾
+        momo_source (str): "http" 直接下載 HTML；"browser" 以 Chrome 渲染後取 page_source
+            （momo 商品列表由 JavaScript 產生時使用）
+    """
+    import product_scraper as scraper
+
+    store = FixtureStore(fixture_dir)
+    session = scraper._get_http_session()
+    limiter = scraper.get_rate_limiter()
+
+    for keyword in keywords:
+        momo_products = []
+        for page in range(1, pages + 1):
+            url = scraper.build_momo_search_url(keyword, page)
+            try:
+                if momo_source == "browser":
+                    with scraper.get_browser_pool().borrow("momo") as driver:
+                        scraper._load_momo_page(driver, keyword, page)
+                        page_html = driver.page_source
+                else:
+                    limiter.wait(url)
+                    response = session.get(url, timeout=15)
+                    response.raise_for_status()
+                    page_html = response.text
+            except Exception as e:
+                print(f"錄製 momo 第 {page} 頁失敗: {e}")
+                break
+            page_html = _strip_scripts(page_html)
+            store.save(url, page_html.encode("utf-8"), "text/html; charset=utf-8")
+            momo_products.extend(scraper.parse_momo_search_html(page_html)[1])
+            print(f"已錄製 momo「{keyword}」第 {page} 頁")
+        store.save_expected("momo", keyword, momo_products)
+
+        pchome_products = []
+        for page in range(1, pages + 1):
+            params = {"q": keyword, "page": page, "sort": "rnk/dc"}
+            try:
+                limiter.wait(scraper.PCHOME_SEARCH_API_URL)
+                response = session.get(scraper.PCHOME_SEARCH_API_URL, params=params, timeout=15)
+                response.raise_for_status()
+            except Exception as e:
+                print(f"錄製 PChome 第 {page} 頁失敗: {e}")
+                break
+            store.save(response.url, response.content, "application/json; charset=utf-8")
+            pchome_products.extend(scraper._parse_pchome_api_prods(response.json()))
+            print(f"已錄製 PChome「{keyword}」第 {page} 頁")
+        store.save_expected("pchome", keyword, pchome_products)
+
+    print(f"錄製完成，共 {len(store.index)} 個回應，存放於 {fixture_dir}")
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="錄製 / 回放 momo 與 PChome 的搜尋結果")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record = subparsers.add_parser("record", help="從正式網站錄製")
+    record.add_argument("keywords", nargs="+", help="搜尋關鍵字")
+    record.add_argument("--pages", type=int, default=2, help="每個關鍵字錄製的頁數（預設 2）")
+    record.add_argument("--fixture-dir", default=FIXTURE_DIR, help=f"錄製檔案的資料夾（預設 {FIXTURE_DIR}）")
+    record.add_argument("--momo-source", choices=["http", "browser"], default="http", help="momo 頁面的錄製方式")
+
+    serve = subparsers.add_parser("serve", help="啟動回放伺服器")
+    serve.add_argument("--fixture-dir", default=FIXTURE_DIR, help=f"錄製檔案的資料夾（預設 {FIXTURE_DIR}）")
+    serve.add_argument("--port", type=int, default=8765, help="監聽的連接埠（預設 8765）")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    if args.command == "record":
+        record_fixtures(args.keywords, args.pages, args.fixture_dir, args.momo_source)
+    else:
+        server = FixtureServer(args.fixture_dir, port=args.port)
+        print("回放伺服器已啟動，讓爬蟲改連到本機請設定環境變數：")
+        for name, value in server.scraper_env().items():
+            print(f"  {name}={value}")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
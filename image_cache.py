@@ -0,0 +1,212 @@
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import threading
+import argparse
+import hashlib
+import json
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image
+from browser_pool import USER_AGENT
+
+IMAGE_CACHE_DIR = "image_cache"
+INDEX_FILE = "index.json"
+THUMBNAIL_SIZE = (300, 300)
+PCHOME_IMAGE_BASE_URL = "https://cs.ecimg.tw"
+
+
+def normalize_image_url(image_url):
+    """
+    補齊商品圖片網址，規則與 static/script.js 的 renderTable 相同（PChome 相對路徑接上 cs.ecimg.tw）
+
+    Returns:
+        str: 完整網址，沒有圖片時為空字串
+    """
+    if not image_url or image_url == "無圖片":
+        return ""
+    if image_url.startswith("//"):
+        return "https:" + image_url
+    if not image_url.startswith("http"):
+        return PCHOME_IMAGE_BASE_URL + image_url
+    return image_url
+
+
+class ImageCache:
+    """
+    商品圖片的本機縮圖快取
+
+    縮圖以內容的 SHA-256 命名（相同圖片只存一份），index.json 記錄
+    原始網址 -> {file, broken}；下載失敗或不是圖片的網址只在預先下載時判斷一次。
+    """
+
+    def __init__(self, cache_dir=IMAGE_CACHE_DIR, size=THUMBNAIL_SIZE):
+        """
+        Args:
+            cache_dir (str): 縮圖資料夾
+            size (tuple): 縮圖的最大寬高
+        """
+        self.cache_dir = cache_dir
+        self.size = size
+        self.index_path = os.path.join(cache_dir, INDEX_FILE)
+        self._index = None
+        self._index_mtime = None
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=16))
+        self._session.mount("http://", HTTPAdapter(pool_connections=8, pool_maxsize=16))
+        self._session.headers.update({"User-Agent": USER_AGENT})
+
+    def _load(self):
+        """讀取索引；其他行程（例如爬蟲）更新過索引檔時重新讀取"""
+        try:
+            mtime = os.path.getmtime(self.index_path)
+        except OSError:
+            mtime = None
+        if self._index is None or (mtime is not None and mtime != self._index_mtime):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+            self._index_mtime = mtime
+        return self._index
+
+    def _save(self):
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False)
+        os.replace(temp_path, self.index_path)
+        self._index_mtime = os.path.getmtime(self.index_path)
+
+    def _make_thumbnail(self, body):
+        """
+        將圖片縮成 JPEG 縮圖
+
+        Returns:
+            tuple: (縮圖內容, 副檔名)
+
+        Raises:
+            ValueError: 內容不是可讀取的圖片
+        """
+        try:
+            image = Image.open(BytesIO(body))
+            image.thumbnail(self.size)
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            output = BytesIO()
+            image.save(output, "JPEG", quality=85, optimize=True)
+            return output.getvalue(), ".jpg"
+        except Exception as e:
+            raise ValueError(f"無法讀取圖片: {e}")
+
+    def _fetch(self, url):
+        """
+        下載並縮圖一張圖片，寫入以內容雜湊命名的檔案
+
+        Returns:
+            dict: {file, broken}
+        """
+        try:
+            response = self._session.get(url, timeout=15)
+            response.raise_for_status()
+            if not response.content:
+                raise ValueError("圖片內容為空")
+            thumbnail, extension = self._make_thumbnail(response.content)
+        except (requests.RequestException, ValueError) as e:
+            print(f"圖片無法使用: {url} ({e})")
+            return {"file": None, "broken": True}
+
+        file_name = hashlib.sha256(thumbnail).hexdigest() + extension
+        path = os.path.join(self.cache_dir, file_name)
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(thumbnail)
+        return {"file": file_name, "broken": False}
+
+    def prefetch(self, products, workers=8):
+        """
+        同時下載商品圖片並存成縮圖，已處理過的網址（包含壞圖）不會重複下載
+
+        Args:
+            products (list): 商品列表（使用 image_url 欄位）
+            workers (int): 同時下載的數量
+
+        Returns:
+            dict: {"fetched", "cached", "broken"} 統計
+        """
+        with self._lock:
+            index = self._load()
+            urls = {normalize_image_url(product.get("image_url")) for product in products}
+            pending = [url for url in urls if url and url not in index]
+        stats = {"fetched": 0, "cached": len([url for url in urls if url]) - len(pending), "broken": 0}
+        if not pending:
+            return stats
+
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir, exist_ok=True)
+        print(f"正在下載 {len(pending)} 張商品圖片縮圖...")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for url, entry in zip(pending, executor.map(self._fetch, pending)):
+                with self._lock:
+                    self._index[url] = entry
+                stats["broken" if entry["broken"] else "fetched"] += 1
+
+        with self._lock:
+            self._save()
+        print(f"圖片縮圖完成：新增 {stats['fetched']} 張，已快取 {stats['cached']} 張，無法使用 {stats['broken']} 張")
+        return stats
+
+    def annotate(self, products, url_prefix="/thumbnails/"):
+        """
+        為商品加上 thumbnail_url 與 image_broken 欄位（只查快取，不下載）
+
+        Args:
+            products (list): 商品列表（就地修改）
+            url_prefix (str): 縮圖路由的網址前綴
+        """
+        with self._lock:
+            index = self._load()
+        for product in products:
+            entry = index.get(normalize_image_url(product.get("image_url")))
+            if entry is None:
+                continue
+            product["image_broken"] = entry["broken"]
+            if entry["file"]:
+                product["thumbnail_url"] = url_prefix + entry["file"]
+        return products
+
+
+_image_cache = None
+_image_cache_lock = threading.Lock()
+
+
+def get_image_cache():
+    """
+    取得行程內共用的圖片縮圖快取
+
+    Returns:
+        ImageCache: 共用的圖片縮圖快取
+    """
+    global _image_cache
+    with _image_cache_lock:
+        if _image_cache is None:
+            _image_cache = ImageCache()
+        return _image_cache
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="預先下載商品圖片並建立縮圖快取")
+    parser.add_argument("files", nargs="*", default=["momo_products.json", "pchome_products.json"],
+                        help="商品 JSON 檔案（預設 momo_products.json pchome_products.json）")
+    parser.add_argument("--workers", type=int, default=8, help="同時下載的數量（預設 8）")
+    args = parser.parse_args()
+
+    for products_file in args.files:
+        if not os.path.exists(products_file):
+            print(f"錯誤：{products_file} 檔案不存在")
+            continue
+        with open(products_file, "r", encoding="utf-8") as f:
+            get_image_cache().prefetch(json.load(f), args.workers)
@@ -0,0 +1,381 @@
+from multiprocessing import Process
+from datetime import datetime
+import threading
+import argparse
+import sqlite3
+import socket
+import json
+import time
+import os
+
+JOB_QUEUE_DB = os.environ.get("SCRAPER_JOB_QUEUE", "job_queue.db")
+LEASE_SECONDS = 300  # 借出的工作需在這段時間內回報心跳，否則視為 worker 已當掉
+MAX_ATTEMPTS = 4  # 超過次數仍失敗的工作移到 dead-letter
+RETRY_BASE_SECONDS = 30  # 第 n 次失敗後等待 RETRY_BASE_SECONDS * 2^(n-1) 秒再重試
+RETRY_MAX_SECONDS = 1800
+
+
+class JobQueue:
+    """
+    以 SQLite 保存的抓取工作佇列，可由多個行程（或共用資料夾的多台機器）同時取用
+
+    每個工作是一個 關鍵字 × 平台。worker 以 lease 借出工作並定期 heartbeat 延長借用時間；
+    借用逾時（worker 當掉）的工作會被其他 worker 重新借出。失敗的工作依指數退避重試，
+    超過 max_attempts 次後標記為 dead（dead-letter），需以 retry_dead 手動放回佇列。
+    """
+
+    def __init__(self, path=JOB_QUEUE_DB):
+        """
+        Args:
+            path (str): SQLite 資料庫檔案路徑
+        """
+        self.path = path
+        # isolation_level=None 改為自行以 BEGIN IMMEDIATE 控制交易，避免多個 worker 借出同一個工作
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    keyword TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    platform TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    options TEXT NOT NULL DEFAULT '{}',
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    available_at REAL NOT NULL,
+                    lease_owner TEXT,
+                    lease_expires_at REAL,
+                    last_error TEXT,
+                    result TEXT,
+                    created_at TEXT,
+                    updated_at TEXT,
+                    UNIQUE (query, platform)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, available_at)")
+
+    def enqueue(self, entries, platforms=("momo", "pchome"), options=None, max_attempts=MAX_ATTEMPTS):
+        """
+        加入工作；同一個 query × 平台已在佇列中時略過
+
+        Args:
+            entries (list): product_scraper.load_manifest 回傳的關鍵字清單
+            platforms (tuple): 要抓取的平台
+            options (dict): 平台 -> 傳給抓取函式的額外參數
+            max_attempts (int): 最多嘗試次數
+
+        Returns:
+            int: 實際新增的工作數
+        """
+        now = time.time()
+        timestamp = datetime.now().isoformat(timespec="seconds")
+        rows = [(entry["keyword"], entry["query"], platform, entry["count"],
+                 json.dumps((options or {}).get(platform, {}), ensure_ascii=False),
+                 max_attempts, now, timestamp, timestamp)
+                for entry in entries for platform in platforms]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("""
+                    INSERT OR IGNORE INTO jobs (keyword, query, platform, count, options, max_attempts,
+                                                available_at, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+            return self._conn.total_changes - before
+
+    def lease(self, owner, lease_seconds=LEASE_SECONDS):
+        """
+        借出一個可執行的工作：等待中且已到重試時間，或借用已逾時的工作
+
+        借用逾時的工作若已達 max_attempts 次，改為移到 dead-letter 而不再借出。
+
+        Args:
+            owner (str): worker 識別名稱
+            lease_seconds (float): 借用時間
+
+        Returns:
+            dict | None: 工作內容（options 已轉回 dict），沒有可執行的工作時回傳 None
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = self._conn.execute("""
+                        SELECT * FROM jobs
+                        WHERE (status = 'pending' AND available_at <= ?)
+                           OR (status = 'leased' AND lease_expires_at < ?)
+                        ORDER BY available_at, id LIMIT 1
+                    """, (now, now)).fetchone()
+                    if row is None or row["status"] == "pending" or row["attempts"] < row["max_attempts"]:
+                        break
+                    # 已用完嘗試次數的工作借用逾時（例如每次都讓 worker 當掉），不再借出
+                    print(f"工作 {row['id']}（{row['query']} [{row['platform']}]）的 worker "
+                          f"{row['lease_owner']} 逾時未回報，已嘗試 {row['attempts']} 次，移到 dead-letter")
+                    self._conn.execute("""
+                        UPDATE jobs SET status = 'dead', lease_owner = NULL, lease_expires_at = NULL,
+                                        last_error = ?, updated_at = ?
+                        WHERE id = ?
+                    """, (f"worker {row['lease_owner']} 借用逾時", datetime.now().isoformat(timespec="seconds"),
+                          row["id"]))
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                if row["status"] == "leased":
+                    print(f"工作 {row['id']}（{row['query']} [{row['platform']}]）的 worker "
+                          f"{row['lease_owner']} 逾時未回報，重新借出")
+                self._conn.execute("""
+                    UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_owner = ?,
+                                    lease_expires_at = ?, updated_at = ?
+                    WHERE id = ?
+                """, (owner, now + lease_seconds, datetime.now().isoformat(timespec="seconds"), row["id"]))
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+        job = dict(row)
+        job["attempts"] += 1
+        job["options"] = json.loads(job["options"])
+        return job
+
+    def _update_owned(self, job_id, owner, sql, params):
+        """只更新仍由 owner 借用中的工作，回傳是否成功（借用已被收回時為 False）"""
+        with self._lock:
+            cursor = self._conn.execute(
+                sql + " WHERE id = ? AND status = 'leased' AND lease_owner = ?", (*params, job_id, owner))
+            return cursor.rowcount == 1
+
+    def heartbeat(self, job_id, owner, lease_seconds=LEASE_SECONDS):
+        """
+        延長借用時間
+
+        Returns:
+            bool: 是否仍持有這個工作
+        """
+        return self._update_owned(job_id, owner, "UPDATE jobs SET lease_expires_at = ?",
+                                  (time.time() + lease_seconds,))
+
+    def complete(self, job_id, owner, result):
+        """
+        標記工作完成
+
+        Args:
+            result (dict): 工作結果（輸出檔案、商品數等）
+        """
+        return self._update_owned(
+            job_id, owner,
+            "UPDATE jobs SET status = 'done', lease_owner = NULL, lease_expires_at = NULL, result = ?, updated_at = ?",
+            (json.dumps(result, ensure_ascii=False), datetime.now().isoformat(timespec="seconds")))
+
+    def fail(self, job_id, owner, error):
+        """
+        記錄工作失敗：還有剩餘次數時依指數退避放回佇列，否則移到 dead-letter
+
+        Returns:
+            str | None: 工作的新狀態（pending 或 dead），借用已被收回時回傳 None
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        attempts, max_attempts = row
+        status = "dead" if attempts >= max_attempts else "pending"
+        delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+        updated = self._update_owned(
+            job_id, owner,
+            "UPDATE jobs SET status = ?, available_at = ?, lease_owner = NULL, lease_expires_at = NULL, "
+            "last_error = ?, updated_at = ?",
+            (status, time.time() + delay, error, datetime.now().isoformat(timespec="seconds")))
+        return status if updated else None
+
+    def retry_dead(self):
+        """
+        將 dead-letter 中的工作重新放回佇列（嘗試次數歸零）
+
+        Returns:
+            int: 放回的工作數
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'pending', attempts = 0, available_at = ?, updated_at = ? "
+                "WHERE status = 'dead'", (time.time(), datetime.now().isoformat(timespec="seconds")))
+            return cursor.rowcount
+
+    def stats(self):
+        """
+        Returns:
+            dict: 狀態 -> 工作數（pending, leased, done, dead）
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {"pending": 0, "leased": 0, "done": 0, "dead": 0}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def dead_letters(self):
+        """
+        Returns:
+            list: dead-letter 中的工作 {id, keyword, query, platform, attempts, last_error}
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, keyword, query, platform, attempts, last_error FROM jobs WHERE status = 'dead' "
+                "ORDER BY id").fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _run_job(job, output_dir):
+    """
+    執行一個抓取工作，以檢查點從上次中斷（包含其他 worker 當掉）的頁面繼續
+
+    Returns:
+        dict: {output, count}
+
+    Raises:
+        RuntimeError: 抓取中斷（檢查點仍保留）或沒有抓到任何商品
+    """
+    import product_scraper as scraper
+
+    fetch = scraper.fetch_products_for_momo if job["platform"] == "momo" else scraper.fetch_products_for_pchome
+    # 檢查點以工作 id 命名：佇列中 query 不同但關鍵字相同的工作不會互相接續或誤判
+    options = {**job["options"], "resume": True, "checkpoint_dir": os.path.join(output_dir, scraper.CHECKPOINT_DIR),
+               "checkpoint_name": f"job{job['id']}_{job['platform']}", "raise_on_interrupt": True}
+    try:
+        products = fetch(job["keyword"], job["count"], **options)
+    except scraper.ScrapeInterrupted as e:
+        raise RuntimeError(f"抓取中斷（{e}），已完成的頁面保存在 {e.checkpoint_path}") from e
+    if not products:
+        raise RuntimeError("沒有抓到任何商品")
+
+    output_file = os.path.join(output_dir, f"{scraper._query_slug(job['query'])}_{job['platform']}_products.json")
+    scraper.save_products(products, job["query"], output_file)
+    return {"output": output_file, "count": len(products)}
+
+
+def run_worker(queue_path=JOB_QUEUE_DB, output_dir="batch_output", lease_seconds=LEASE_SECONDS,
+               poll_seconds=5, exit_when_idle=True):
+    """
+    worker 主迴圈：借出工作、執行並回報結果，執行期間以背景執行緒定期送出心跳
+
+    Args:
+        queue_path (str): 佇列資料庫路徑
+        output_dir (str): 輸出資料夾（多台機器時使用共用資料夾）
+        lease_seconds (float): 借用時間，心跳間隔為其三分之一
+        poll_seconds (float): 佇列沒有可執行工作時的等待秒數
+        exit_when_idle (bool): 佇列中沒有等待中或借出中的工作時結束
+
+    Returns:
+        int: 這個 worker 完成的工作數
+    """
+    queue = JobQueue(queue_path)
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    completed = 0
+    try:
+        while True:
+            job = queue.lease(owner, lease_seconds)
+            if job is None:
+                stats = queue.stats()
+                if exit_when_idle and stats["pending"] == 0 and stats["leased"] == 0:
+                    break
+                time.sleep(poll_seconds)
+                continue
+
+            print(f"[{owner}] 開始工作 {job['id']}：{job['query']} [{job['platform']}]（第 {job['attempts']} 次）")
+            stop_heartbeat = threading.Event()
+
+            def send_heartbeats(job_id=job["id"]):
+                while not stop_heartbeat.wait(lease_seconds / 3):
+                    if not queue.heartbeat(job_id, owner, lease_seconds):
+                        print(f"[{owner}] 工作 {job_id} 的借用已被收回")
+                        return
+
+            heartbeat = threading.Thread(target=send_heartbeats, daemon=True)
+            heartbeat.start()
+            try:
+                result = _run_job(job, output_dir)
+            except Exception as e:
+                status = queue.fail(job["id"], owner, str(e))
+                print(f"[{owner}] 工作 {job['id']} 失敗（{e}），"
+                      f"{'已移到 dead-letter' if status == 'dead' else '稍後重試'}")
+            else:
+                queue.complete(job["id"], owner, result)
+                completed += 1
+                print(f"[{owner}] 工作 {job['id']} 完成：{result['count']} 筆 -> {result['output']}")
+            finally:
+                stop_heartbeat.set()
+                heartbeat.join()
+    finally:
+        queue.close()
+    return completed
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="以 SQLite 工作佇列分散執行大量 關鍵字 × 平台 的抓取")
+    parser.add_argument("--queue", default=JOB_QUEUE_DB, help=f"佇列資料庫路徑（預設 {JOB_QUEUE_DB}）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = subparsers.add_parser("enqueue", help="依關鍵字清單加入工作")
+    enqueue.add_argument("manifest", help="關鍵字清單（JSON 或 CSV，欄位 keyword, query, count）")
+    enqueue.add_argument("--platforms", default="momo,pchome", help="要抓取的平台，以逗號分隔（預設 momo,pchome）")
+    enqueue.add_argument("--momo-engine", choices=["selenium", "http"], default="selenium", help="momo 抓取引擎")
+    enqueue.add_argument("--pchome-engine", choices=["api", "selenium"], default="api", help="PChome 抓取引擎")
+    enqueue.add_argument("--extraction", choices=["bulk", "element", "html"], default="bulk",
+                         help="Selenium 引擎的商品擷取模式")
+    enqueue.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS,
+                         help=f"最多嘗試次數，超過後移到 dead-letter（預設 {MAX_ATTEMPTS}）")
+
+    work = subparsers.add_parser("work", help="啟動 worker 行程")
+    work.add_argument("--workers", type=int, default=2, help="worker 行程數（預設 2）")
+    work.add_argument("--output-dir", default="batch_output", help="輸出資料夾（預設 batch_output）")
+    work.add_argument("--lease-seconds", type=float, default=LEASE_SECONDS,
+                      help=f"借用時間，worker 當掉超過這段時間後工作會被重新借出（預設 {LEASE_SECONDS}）")
+    work.add_argument("--forever", action="store_true", help="佇列清空後繼續等待新工作")
+
+    subparsers.add_parser("status", help="顯示佇列狀態與 dead-letter")
+    subparsers.add_parser("retry-dead", help="將 dead-letter 中的工作放回佇列")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    if args.command == "enqueue":
+        from product_scraper import load_manifest
+
+        platforms = tuple(p.strip() for p in args.platforms.split(",") if p.strip())
+        options = {
+            "momo": {"engine": args.momo_engine, "extraction": args.extraction},
+            "pchome": {"engine": args.pchome_engine, "extraction": args.extraction}
+        }
+        added = JobQueue(args.queue).enqueue(load_manifest(args.manifest), platforms, options,
+                                             args.max_attempts)
+        print(f"已加入 {added} 個工作")
+    elif args.command == "work":
+        processes = [Process(target=run_worker,
+                             args=(args.queue, args.output_dir, args.lease_seconds, 5, not args.forever))
+                     for _ in range(args.workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        print(f"worker 已全部結束，佇列狀態：{JobQueue(args.queue).stats()}")
+    elif args.command == "retry-dead":
+        print(f"已將 {JobQueue(args.queue).retry_dead()} 個工作放回佇列")
+    else:
+        queue = JobQueue(args.queue)
+        print(f"佇列狀態：{queue.stats()}")
+        for job in queue.dead_letters():
+            print(f"  ✗ {job['id']} {job['query']} [{job['platform']}] 嘗試 {job['attempts']} 次：{job['last_error']}")
@@ -0,0 +1,184 @@
+from decimal import Decimal
+import threading
+import atexit
+import json
+import os
+from product_stream import read_ndjson
+
+# 比對網頁匯出的 JSON 快照資料夾
+EXPORT_DIR = "json_exports"
+
+# 變更記錄累積多少筆操作後，套用回快照檔並清空記錄
+COMPACT_AFTER = 200
+
+
+def _jsonable(row):
+    """把資料列中的 Decimal 轉成 float，讓 json 可以序列化"""
+    return {key: float(value) if isinstance(value, Decimal) else value for key, value in row.items()}
+
+
+def _row_key(row, index):
+    """以代理主鍵 id 識別資料列；舊快照沒有 id 時以位置代替"""
+    return row["id"] if row.get("id") is not None else f"_{index}"
+
+
+class JsonSnapshot:
+    """
+    以「快照 + 變更記錄」維護三個表格的 JSON 匯出
+
+    {table}_latest.json 是某個時間點的完整快照，之後的新增與刪除以一行一個操作
+    附加到 {table}_changes.ndjson，每次寫入只需附加這次變動的資料列；累積
+    compact_after 筆操作後才把記錄套用回快照檔重寫一次，所以儲存的延遲不會隨表格
+    變大而增加。表格目前的內容等於快照依序重播變更記錄（見 load）。
+
+    記憶體中保留每個表格目前的內容，假設同一時間只有比對網頁一個行程寫入。
+    """
+
+    def __init__(self, export_dir=EXPORT_DIR, compact_after=COMPACT_AFTER):
+        """
+        Args:
+            export_dir (str): 快照與變更記錄的資料夾
+            compact_after (int): 變更記錄累積幾筆操作後壓縮回快照檔
+        """
+        self.export_dir = export_dir
+        self.compact_after = compact_after
+        self._rows = {}  # table -> {id: 資料列}
+        self._pending = {}  # table -> 變更記錄中尚未壓縮的操作數
+        self._lock = threading.Lock()
+
+    def snapshot_path(self, table):
+        return os.path.join(self.export_dir, f"{table}_latest.json")
+
+    def changes_path(self, table):
+        return os.path.join(self.export_dir, f"{table}_changes.ndjson")
+
+    @staticmethod
+    def _apply(rows, change):
+        """將一筆變更套用到 {id: 資料列}"""
+        if change["op"] == "insert":
+            # 以 id 覆寫，重播同一筆新增（例如壓縮途中中斷）不會重複
+            for row in change["rows"]:
+                rows[row["id"]] = row
+        elif change["op"] == "delete":
+            where = change["where"]
+            for key in [key for key, row in rows.items()
+                        if all(str(row.get(column)) == str(value) for column, value in where.items())]:
+                del rows[key]
+
+    def _load(self, table):
+        """第一次使用表格時讀取快照並重播變更記錄"""
+        if table in self._rows:
+            return self._rows[table]
+        rows = {}
+        if os.path.exists(self.snapshot_path(table)):
+            with open(self.snapshot_path(table), "r", encoding="utf-8") as f:
+                rows = {_row_key(row, index): row for index, row in enumerate(json.load(f))}
+        changes = read_ndjson(self.changes_path(table)) if os.path.exists(self.changes_path(table)) else []
+        for change in changes:
+            self._apply(rows, change)
+        self._rows[table] = rows
+        self._pending[table] = len(changes)
+        return rows
+
+    def _write_snapshot(self, table):
+        """重寫快照檔（先寫暫存檔再取代，讀取端不會讀到寫一半的檔案），並清空變更記錄"""
+        os.makedirs(self.export_dir, exist_ok=True)
+        path = self.snapshot_path(table)
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(list(self._rows[table].values()), f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+        # 快照已包含所有變更；若在清空記錄前中斷，重播記錄也只會得到相同結果
+        if os.path.exists(self.changes_path(table)):
+            os.remove(self.changes_path(table))
+        self._pending[table] = 0
+
+    def _append(self, table, change):
+        """附加一筆變更記錄並更新記憶體中的內容，累積足夠操作時壓縮"""
+        rows = self._load(table)
+        os.makedirs(self.export_dir, exist_ok=True)
+        with open(self.changes_path(table), "a", encoding="utf-8") as f:
+            f.write(json.dumps(change, ensure_ascii=False) + "\n")
+        self._apply(rows, change)
+        self._pending[table] += 1
+        if self._pending[table] >= self.compact_after:
+            self._write_snapshot(table)
+            print(f"✓ 已壓縮 {table} 的變更記錄到 {table}_latest.json ({len(rows)} 筆)")
+
+    def record_inserts(self, table, rows):
+        """
+        記錄新增的資料列
+
+        Args:
+            table (str): 表格名稱，例如 products
+            rows (list): 新增的資料列（需包含 id）
+        """
+        if not rows:
+            return
+        with self._lock:
+            self._append(table, {"op": "insert", "rows": [_jsonable(row) for row in rows]})
+
+    def record_delete(self, table, where):
+        """
+        記錄刪除：移除所有欄位值符合 where 的資料列（與 SQL 的 DELETE ... WHERE 條件相同）
+
+        Args:
+            table (str): 表格名稱
+            where (dict): 欄位 -> 值，例如 {"connect": "1234567"}
+        """
+        with self._lock:
+            self._append(table, {"op": "delete", "where": where})
+
+    def replace(self, table, rows):
+        """
+        以完整內容取代表格快照（清空表格或整批重新載入時使用），變更記錄一併清除
+
+        Args:
+            table (str): 表格名稱
+            rows (list): 表格的所有資料列
+        """
+        with self._lock:
+            self._rows[table] = {_row_key(row, index): _jsonable(row) for index, row in enumerate(rows)}
+            self._write_snapshot(table)
+
+    def load(self, table):
+        """
+        Returns:
+            list: 表格目前的所有資料列（快照加上變更記錄）
+        """
+        with self._lock:
+            return list(self._load(table).values())
+
+    def counts(self, tables=("products", "momo_products", "pchome_products")):
+        """
+        Returns:
+            dict: 表格名稱 -> 目前的資料列數
+        """
+        with self._lock:
+            return {table: len(self._load(table)) for table in tables}
+
+    def compact_all(self):
+        """把所有表格尚未壓縮的變更記錄套用回快照檔"""
+        with self._lock:
+            for table in list(self._rows):
+                if self._pending.get(table):
+                    self._write_snapshot(table)
+
+
+_json_snapshot = None
+_json_snapshot_lock = threading.Lock()
+
+
+def get_json_snapshot():
+    """
+    取得行程內共用的 JSON 快照，程式結束時把變更記錄壓縮回快照檔
+
+    Returns:
+        JsonSnapshot: 共用的 JSON 快照
+    """
+    global _json_snapshot
+    with _json_snapshot_lock:
+        if _json_snapshot is None:
+            _json_snapshot = JsonSnapshot()
+            atexit.register(_json_snapshot.compact_all)
+        return _json_snapshot
@@ -1,68 +1,49 @@
 import json
 import os
-from flask import Flask, request, jsonify, render_template
-import mysql.connector
+from flask import Flask, request, jsonify, render_template, send_from_directory
 from mysql.connector import Error
 from datetime import datetime
 from decimal import Decimal
+from product_stream import load_products
+from image_cache import get_image_cache
+from db_pool import get_db_pool, insert_rows
+from db_schema import TABLES, column_names, create_table_sql, migrate, qualified_name
+from json_snapshot import get_json_snapshot
 
 app = Flask(__name__)
 
 # 註冊 min 函數到 Jinja2 模板環境
 app.jinja_env.globals.update(min=min)
 
-def save_to_json_files(products_data, momo_data, pchome_data):
+def _fetch_all(cursor, table, where="", params=()):
     """
-    將三個資料庫的資料分別儲存到三個 JSON 檔案 (只保留 latest 版本)
-    
+    查詢表格中的資料列
+
     Args:
-        products_data: products 表格的資料列表
-        momo_data: momo_products 表格的資料列表
-        pchome_data: pchome_products 表格的資料列表
+        cursor: 資料庫游標
+        table (str): 資料庫.表格 名稱
+        where (str): 查詢條件，例如 "WHERE id > %s"，預設查詢整個表格
+        params (tuple): 查詢條件的參數
+
+    Returns:
+        list: 每列一個字典（欄位名稱 -> 值）
     """
-    # 建立 json_exports 資料夾
-    export_dir = 'json_exports'
-    if not os.path.exists(export_dir):
-        os.makedirs(export_dir)
-    
-    # 轉換 Decimal 為 float
-    def convert_decimal(data):
-        converted = []
-        for item in data:
-            new_item = {}
-            for key, value in item.items():
-                if isinstance(value, Decimal):
-                    new_item[key] = float(value)
-                else:
-                    new_item[key] = value
-            converted.append(new_item)
-        return converted
-    
-    products_data = convert_decimal(products_data)
-    momo_data = convert_decimal(momo_data)
-    pchome_data = convert_decimal(pchome_data)
-    
-    # 只儲存 latest 版本的三個檔案
-    latest_products_file = os.path.join(export_dir, 'products_latest.json')
-    with open(latest_products_file, 'w', encoding='utf-8') as f:
-        json.dump(products_data, f, ensure_ascii=False, indent=2)
-    print(f"✓ 已更新 products_latest.json ({len(products_data)} 筆)")
-    
-    latest_momo_file = os.path.join(export_dir, 'momo_products_latest.json')
-    with open(latest_momo_file, 'w', encoding='utf-8') as f:
-        json.dump(momo_data, f, ensure_ascii=False, indent=2)
-    print(f"✓ 已更新 momo_products_latest.json ({len(momo_data)} 筆)")
-    
-    latest_pchome_file = os.path.join(export_dir, 'pchome_products_latest.json')
-    with open(latest_pchome_file, 'w', encoding='utf-8') as f:
-        json.dump(pchome_data, f, ensure_ascii=False, indent=2)
-    print(f"✓ 已更新 pchome_products_latest.json ({len(pchome_data)} 筆)")
-    
-    return {
-        'products': len(products_data),
-        'momo_products': len(momo_data),
-        'pchome_products': len(pchome_data)
-    }
+    cursor.execute(f"SELECT * FROM {table} {where}", params)
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def _pchome_row(product):
+    """pchome_products.json 的商品轉成 pchome_products 表格的一列"""
+    return (
+        product.get('sku', '無SKU'),
+        product.get('title', '未知商品名稱'),
+        product.get('image_url', '無圖片'),
+        product.get('url', '無連結'),
+        product.get('platform', 'pchome'),
+        '',
+        product.get('price', 0),
+        product.get('query', '')
+    )
 
 def initialize_pchome_database(pchome_file="pchome_products.json"):
     """
@@ -71,64 +52,17 @@ def initialize_pchome_database(pchome_file="pchome_products.json"):
     Args:
         pchome_file (str): PChome 商品 JSON 檔案路徑
     """
-    pchome_products = []
-    if os.path.exists(pchome_file):
-        with open(pchome_file, "r", encoding="utf-8") as f:
-            pchome_products = json.load(f)
-    else:
+    # 爬蟲以串流模式執行中時，讀取同名的 .ndjson 檔案
+    pchome_products = load_products(pchome_file)
+    if pchome_products is None:
         print(f"錯誤：{pchome_file} 檔案不存在")
         return
 
     try:
-        # 先連接到 MySQL 伺服器（不指定資料庫）來建立資料庫
-        temp_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='12345678',
-            auth_plugin='caching_sha2_password',
-            autocommit=True,
-            use_unicode=True,
-            charset='utf8mb4'
-        )
-        
-        temp_cursor = temp_conn.cursor()
-        temp_cursor.execute("CREATE DATABASE IF NOT EXISTS pchome_database")
-        temp_cursor.close()
-        temp_conn.close()
-        print("資料庫 'pchome_database' 已建立或已存在")
-        
-        # 然後連接到指定的資料庫
-        pchome_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='12345678',
-            database='pchome_database',
-            auth_plugin='caching_sha2_password',
-            autocommit=True,
-            use_unicode=True,
-            charset='utf8mb4'
-        )
-
-        if pchome_conn.is_connected():
-            pchome_cursor = pchome_conn.cursor()
-            create_pchome_table_query = """
-            CREATE TABLE IF NOT EXISTS pchome_products (
-                sku VARCHAR(100) UNIQUE,
-                title VARCHAR(255),
-                image TEXT,
-                url TEXT,
-                platform VARCHAR(50),
-                connect VARCHAR(100),
-                price DECIMAL(10, 2),
-                query VARCHAR(100)
-            )
-            """
-            pchome_cursor.execute(create_pchome_table_query)
-            print("表格 'pchome_database.pchome_products' 已建立或已存在")
-
+        with get_db_pool().connection() as conn, conn.cursor() as cursor:
             # 檢查表格是否已有資料
-            pchome_cursor.execute("SELECT COUNT(*) FROM pchome_products")
-            existing_count = pchome_cursor.fetchone()[0]
+            cursor.execute("SELECT COUNT(*) FROM pchome_database.pchome_products")
+            existing_count = cursor.fetchone()[0]
             
             if existing_count > 0:
                 print(f"表格中已有 {existing_count} 筆資料，跳過插入")
@@ -138,64 +72,47 @@ def initialize_pchome_database(pchome_file="pchome_products.json"):
 
             # 插入 PChome 商品資料
             insert_pchome_query = """
-            INSERT INTO pchome_products (sku, title, image, url, platform, connect, price, query)
+            INSERT INTO pchome_database.pchome_products (sku, title, image, url, platform, connect, price, query)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
             """
-            inserted_count = 0
-            for product in pchome_products:
-                try:
-                    pchome_cursor.execute(insert_pchome_query, (
-                        product.get('sku', '無SKU'),
-                        product.get('title', '未知商品名稱'),
-                        product.get('image_url', '無圖片'),
-                        product.get('url', '無連結'),
-                        product.get('platform', 'pchome'),
-                        '',
-                        product.get('price', 0),
-                        product.get('query', '')
-                    ))
-                    inserted_count += 1
-                except Error as e:
-                    print(f"插入商品時發生錯誤: {e}, 商品: {product.get('sku', '無SKU')}")
-                # print(f"已插入商品到 pchome_database.pchome_products：{product}")
+            # 整個檔案在同一個交易中分批插入，最後只提交一次
+            conn.start_transaction()
+            inserted_count = insert_rows(
+                cursor, insert_pchome_query, [_pchome_row(product) for product in pchome_products],
+                on_error=lambda index, e: print(f"插入商品時發生錯誤: {e}, 商品: {pchome_products[index].get('sku', '無SKU')}")
+            )
 
             print(f"總共處理了 {len(pchome_products)} 筆商品")
             print(f"成功插入了 {inserted_count} 筆商品資料到 pchome_database.pchome_products")
             
-            pchome_conn.commit()
+            conn.commit()
             
-            # 🆕 插入後更新 pchome_products_latest.json
+            # 🆕 插入後更新 pchome_products_latest.json（整個表格重新載入，直接取代快照）
             try:
-                # 查詢所有 pchome 資料
-                pchome_cursor.execute("SELECT * FROM pchome_products")
-                all_pchome = [dict(zip([col[0] for col in pchome_cursor.description], row)) 
-                             for row in pchome_cursor.fetchall()]
-                
-                # 轉換 Decimal 為 float
-                for item in all_pchome:
-                    for key, value in item.items():
-                        if isinstance(value, Decimal):
-                            item[key] = float(value)
-                
-                # 儲存到 JSON
-                export_dir = 'json_exports'
-                if not os.path.exists(export_dir):
-                    os.makedirs(export_dir)
-                
-                latest_pchome_file = os.path.join(export_dir, 'pchome_products_latest.json')
-                with open(latest_pchome_file, 'w', encoding='utf-8') as f:
-                    json.dump(all_pchome, f, ensure_ascii=False, indent=2)
+                all_pchome = _fetch_all(cursor, "pchome_database.pchome_products")
+                get_json_snapshot().replace("pchome_products", all_pchome)
                 print(f"✓ 已更新 pchome_products_latest.json ({len(all_pchome)} 筆)")
             except Exception as e:
                 print(f"更新 JSON 時發生錯誤: {e}")
 
     except Error as e:
         print(f"MySQL 錯誤: {e}")
-    finally:
-        if 'pchome_conn' in locals() and pchome_conn.is_connected():
-            pchome_cursor.close()
-            pchome_conn.close()
-            print("pchome_database 連線已關閉")
+
+def sync_json_snapshots():
+    """
+    以資料庫目前的內容重建三個 JSON 快照，在程式啟動時執行一次
+
+    之後的寫入只附加變更記錄；資料庫也可能在比對網頁以外被修改（例如在 Workbench 中執行 SQL），
+    所以每次啟動都重新對齊一次。
+    """
+    try:
+        with get_db_pool().connection() as conn, conn.cursor() as cursor:
+            snapshot = get_json_snapshot()
+            for table in TABLES:
+                snapshot.replace(table, _fetch_all(cursor, qualified_name(table)))
+        print("✓ 已依資料庫內容重建 JSON 快照")
+    except Error as e:
+        print(f"MySQL 錯誤: {e}")
 
 def generate_comparison_html(momo_file="momo_products.json", pchome_file="pchome_products.json"):
     """
@@ -208,18 +125,15 @@ def generate_comparison_html(momo_file="momo_products.json", pchome_file="pchome
     Returns:
         tuple: (momo_products, pchome_products, max_length)
     """
-    momo_products = []
-    if os.path.exists(momo_file):
-        with open(momo_file, "r", encoding="utf-8") as f:
-            momo_products = json.load(f)
-    else:
+    # 爬蟲以串流模式執行中時，讀取同名的 .ndjson 檔案，可看到已抓取的商品
+    momo_products = load_products(momo_file)
+    if momo_products is None:
+        momo_products = []
         print(f"錯誤：{momo_file} 檔案不存在")
 
-    pchome_products = []
-    if os.path.exists(pchome_file):
-        with open(pchome_file, "r", encoding="utf-8") as f:
-            pchome_products = json.load(f)
-    else:
+    pchome_products = load_products(pchome_file)
+    if pchome_products is None:
+        pchome_products = []
         print(f"錯誤：{pchome_file} 檔案不存在")
 
     max_length = len(pchome_products)  # 以 PCHome 商品數量為表格行數
@@ -232,11 +146,24 @@ def index():
     首頁路由，渲染商品比較頁面
     """
     momo_products, pchome_products, max_length = generate_comparison_html()
+    # 有預先下載的縮圖就改用本機縮圖，並標示已知的壞圖
+    image_cache = get_image_cache()
+    image_cache.annotate(momo_products)
+    image_cache.annotate(pchome_products)
     return render_template('comparison.html', 
                          momo_products=momo_products, 
                          pchome_products=pchome_products, 
                          max_length=max_length)
 
+@app.route('/thumbnails/<path:filename>')
+def thumbnail(filename):
+    """
+    提供本機縮圖快取中的圖片。檔名是內容雜湊，內容不會變，可長期快取
+    """
+    response = send_from_directory(os.path.abspath(get_image_cache().cache_dir), filename, max_age=31536000)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
 @app.route('/save-to-mysql', methods=['POST'])
 def save_to_mysql():
     try:
@@ -246,175 +173,73 @@ def save_to_mysql():
         print("收到用於插入的商品資料：", products)
         print("收到用於插入的 MOMO 商品資料：", momo_products)
 
-        # 建立資料庫（如果不存在）
-        temp_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='12345678',
-            auth_plugin='caching_sha2_password',
-            autocommit=True,
-            use_unicode=True,
-            charset='utf8mb4'
-        )
-        temp_cursor = temp_conn.cursor()
-        temp_cursor.execute("CREATE DATABASE IF NOT EXISTS products_database")
-        temp_cursor.execute("CREATE DATABASE IF NOT EXISTS momo_database")
-        temp_cursor.close()
-        temp_conn.close()
-
-        products_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='12345678',
-            database='products_database',
-            auth_plugin='caching_sha2_password',
-            autocommit=True,
-            use_unicode=True,
-            charset='utf8mb4'
-        )
-
-        momo_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='12345678',
-            database='momo_database',
-            auth_plugin='caching_sha2_password',
-            autocommit=True,
-            use_unicode=True,
-            charset='utf8mb4'
-        )
-
-        pchome_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='12345678',
-            database='pchome_database',
-            auth_plugin='caching_sha2_password',
-            autocommit=True,
-            use_unicode=True,
-            charset='utf8mb4'
-        )
-
-        if products_conn.is_connected() and momo_conn.is_connected() and pchome_conn.is_connected():
-            products_cursor = products_conn.cursor()
-            momo_cursor = momo_conn.cursor()
-            pchome_cursor = pchome_conn.cursor()
-
+        # 從連線池借用一個連線，三個資料庫的表格都以 資料庫.表格 存取
+        with get_db_pool().connection() as conn, conn.cursor() as cursor:
             # 先檢查收到的資料
             print(f"準備處理的商品數量：{len(products)}")
             print("收到的商品資料：", json.dumps(products, ensure_ascii=False, indent=2))
 
-            # 確認表格存在（移除 UNIQUE 限制以允許重複 SKU）
-            create_products_table_query = """
-            CREATE TABLE IF NOT EXISTS products (
-                sku VARCHAR(100),
-                title VARCHAR(255),
-                image TEXT,
-                url TEXT,
-                platform VARCHAR(50),
-                connect VARCHAR(100),
-                price DECIMAL(10, 2),
-                uncertainty_problem TINYINT UNSIGNED NOT NULL DEFAULT 0 CHECK (uncertainty_problem BETWEEN 0 AND 100),
-                query VARCHAR(100)
-            )
-            """
-            products_cursor.execute(create_products_table_query)
-            print("表格 'products_database.products' 已建立或已存在（允許重複 SKU）")
-
-            create_momo_table_query = """
-            CREATE TABLE IF NOT EXISTS momo_products (
-                sku VARCHAR(100),
-                title VARCHAR(255),
-                image TEXT,
-                url TEXT,
-                platform VARCHAR(50),
-                connect VARCHAR(100),
-                price DECIMAL(10, 2),
-                num INT,
-                query VARCHAR(100)
-            )
-            """
-            momo_cursor.execute(create_momo_table_query)
-            print("表格 'momo_database.momo_products' 已建立或已存在（允許重複 SKU）")
-
             # 簡單的插入語句，允許重複
             insert_products_query = """
-            INSERT INTO products (sku, title, image, url, platform, connect, price, uncertainty_problem, query)
+            INSERT INTO products_database.products (sku, title, image, url, platform, connect, price, uncertainty_problem, query)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
             """
-            inserted_products_count = 0
-            
-            for product in products:
-                try:
-                    # 直接插入新記錄
-                    products_cursor.execute(insert_products_query, (
-                        product['sku'],
-                        product['title'],
-                        product['image'],
-                        product['url'],
-                        product['platform'],
-                        product['connect'],
-                        product['price'],
-                        product.get('uncertainty_problem', 0),
-                        product.get('query', '')
-                    ))
-                    
-                    inserted_products_count += 1
-                    print(f"已新增商品：{json.dumps(product, ensure_ascii=False)}")
-                    
-                except Error as e:
-                    print(f"處理商品時發生錯誤: {e}")
-                    print(f"問題商品資料: {json.dumps(product, ensure_ascii=False)}")
-                    continue  # 繼續處理下一個商品
+
+            def report_product_error(index, e):
+                print(f"處理商品時發生錯誤: {e}")
+                print(f"問題商品資料: {json.dumps(products[index], ensure_ascii=False)}")
+
+            # 兩個表格的插入在同一個交易中完成，最後只提交一次
+            conn.start_transaction()
+
+            # 記下插入前的最大 id，提交後只讀取新增的資料列更新 JSON 快照
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM products_database.products")
+            products_max_id = cursor.fetchone()[0]
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM momo_database.momo_products")
+            momo_max_id = cursor.fetchone()[0]
+            inserted_products_count = insert_rows(cursor, insert_products_query, [(
+                product['sku'],
+                product['title'],
+                product['image'],
+                product['url'],
+                product['platform'],
+                product['connect'],
+                product['price'],
+                product.get('uncertainty_problem', 0),
+                product.get('query', '')
+            ) for product in products], on_error=report_product_error)
                     
             print(f"總共處理了 {len(products)} 筆商品")
             print(f"成功新增了 {inserted_products_count} 筆")
 
             insert_momo_query = """
-            INSERT INTO momo_products (sku, title, image, url, platform, connect, price, num, query)
+            INSERT INTO momo_database.momo_products (sku, title, image, url, platform, connect, price, num, query)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
             """
-            inserted_momo_count = 0
-            for product in momo_products:
-                try:
-                    momo_cursor.execute(insert_momo_query, (
-                        product['sku'],
-                        product['title'],
-                        product['image'],
-                        product['url'],
-                        product['platform'],
-                        product['connect'],
-                        product['price'],
-                        product['num'],
-                        product.get('query', '')
-                    ))
-                    inserted_momo_count += 1
-                    print(f"已新增 MOMO 商品：{json.dumps(product, ensure_ascii=False)}")
-                except Error as e:
-                    print(f"插入 MOMO 商品時發生錯誤: {e}, 商品: {product.get('sku', '無SKU')}")
-
-            products_conn.commit()
-            momo_conn.commit()
+            inserted_momo_count = insert_rows(cursor, insert_momo_query, [(
+                product['sku'],
+                product['title'],
+                product['image'],
+                product['url'],
+                product['platform'],
+                product['connect'],
+                product['price'],
+                product['num'],
+                product.get('query', '')
+            ) for product in momo_products], on_error=lambda index, e: print(
+                f"插入 MOMO 商品時發生錯誤: {e}, 商品: {momo_products[index].get('sku', '無SKU')}"
+            ))
+
+            conn.commit()
             
-            # 🆕 新增:匯出三個資料庫的所有資料到三個 JSON 檔案
+            # 🆕 新增:只把這次新增的資料列附加到 JSON 快照的變更記錄（pchome_products 沒有變動，不需要更新）
             try:
-                # 查詢 products 表格所有資料
-                products_cursor.execute("SELECT * FROM products")
-                all_products = [dict(zip([col[0] for col in products_cursor.description], row)) 
-                               for row in products_cursor.fetchall()]
-                
-                # 查詢 momo_products 表格所有資料
-                momo_cursor.execute("SELECT * FROM momo_products")
-                all_momo = [dict(zip([col[0] for col in momo_cursor.description], row)) 
-                           for row in momo_cursor.fetchall()]
-                
-                # 查詢 pchome_products 表格所有資料
-                pchome_cursor.execute("SELECT * FROM pchome_products")
-                all_pchome = [dict(zip([col[0] for col in pchome_cursor.description], row)) 
-                             for row in pchome_cursor.fetchall()]
-                
-                # 儲存到三個 JSON 檔案
-                json_counts = save_to_json_files(all_products, all_momo, all_pchome)
+                snapshot = get_json_snapshot()
+                snapshot.record_inserts("products", _fetch_all(
+                    cursor, "products_database.products", "WHERE id > %s ORDER BY id", (products_max_id,)))
+                snapshot.record_inserts("momo_products", _fetch_all(
+                    cursor, "momo_database.momo_products", "WHERE id > %s ORDER BY id", (momo_max_id,)))
+                json_counts = snapshot.counts()
                 
                 print(f"已插入 {inserted_products_count} 筆商品資料到 products_database.products")
                 print(f"已插入 {inserted_momo_count} 筆商品資料到 momo_database.momo_products")
@@ -443,79 +268,17 @@ def save_to_mysql():
         print(f"MySQL 錯誤: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
-    finally:
-        if 'products_conn' in locals() and products_conn.is_connected():
-            products_cursor.close()
-            products_conn.close()
-            print("products_database 連線已關閉")
-        if 'momo_conn' in locals() and momo_conn.is_connected():
-            momo_cursor.close()
-            momo_conn.close()
-            print("momo_database 連線已關閉")
-        if 'pchome_conn' in locals() and pchome_conn.is_connected():
-            pchome_cursor.close()
-            pchome_conn.close()
-            print("pchome_database 連線已關閉")
-
 @app.route('/clear-products', methods=['POST'])
 def clear_products():
     try:
-        # 建立資料庫（如果不存在）
-        temp_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='12345678',
-            auth_plugin='caching_sha2_password',
-            autocommit=True,
-            use_unicode=True,
-            charset='utf8mb4'
-        )
-        temp_cursor = temp_conn.cursor()
-        temp_cursor.execute("CREATE DATABASE IF NOT EXISTS products_database")
-        temp_cursor.close()
-        temp_conn.close()
-
-        products_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='12345678',
-            database='products_database',
-            auth_plugin='caching_sha2_password',
-            autocommit=True,
-            use_unicode=True,
-            charset='utf8mb4'
-        )
-
-        if products_conn.is_connected():
-            products_cursor = products_conn.cursor()
-            # 確保表格存在（若不存在就建立），以避免 TRUNCATE 時出現 1146 錯誤
-            create_products_table_query = """
-            CREATE TABLE IF NOT EXISTS products (
-                sku VARCHAR(100),
-                title VARCHAR(255),
-                image TEXT,
-                url TEXT,
-                platform VARCHAR(50),
-                connect VARCHAR(100),
-                price DECIMAL(10, 2),
-                uncertainty_problem TINYINT UNSIGNED NOT NULL DEFAULT 0 CHECK (uncertainty_problem BETWEEN 0 AND 100),
-                query VARCHAR(100)
-            )
-            """
-            products_cursor.execute(create_products_table_query)
-            products_cursor.execute("TRUNCATE TABLE products")
-            print("已清空 products_database.products 表格（若原本不存在則已建立再清空）")
-            products_conn.commit()
+        with get_db_pool().connection() as conn, conn.cursor() as cursor:
+            cursor.execute("TRUNCATE TABLE products_database.products")
+            print("已清空 products_database.products 表格")
+            conn.commit()
             
             # 🆕 清空後更新 JSON 檔案(寫入空陣列)
             try:
-                export_dir = 'json_exports'
-                if not os.path.exists(export_dir):
-                    os.makedirs(export_dir)
-                
-                latest_products_file = os.path.join(export_dir, 'products_latest.json')
-                with open(latest_products_file, 'w', encoding='utf-8') as f:
-                    json.dump([], f, ensure_ascii=False, indent=2)
+                get_json_snapshot().replace("products", [])
                 print("✓ 已清空 products_latest.json")
             except Exception as e:
                 print(f"更新 JSON 時發生錯誤: {e}")
@@ -526,71 +289,17 @@ def clear_products():
         print(f"MySQL 錯誤: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
-    finally:
-        if 'products_conn' in locals() and products_conn.is_connected():
-            products_cursor.close()
-            products_conn.close()
-            print("products_database 連線已關閉")
-
 @app.route('/clear-momo-products', methods=['POST'])
 def clear_momo_products():
     try:
-        # 建立資料庫（如果不存在）
-        temp_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='12345678',
-            auth_plugin='caching_sha2_password',
-            autocommit=True,
-            use_unicode=True,
-            charset='utf8mb4'
-        )
-        temp_cursor = temp_conn.cursor()
-        temp_cursor.execute("CREATE DATABASE IF NOT EXISTS momo_database")
-        temp_cursor.close()
-        temp_conn.close()
-
-        momo_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='12345678',
-            database='momo_database',
-            auth_plugin='caching_sha2_password',
-            autocommit=True,
-            use_unicode=True,
-            charset='utf8mb4'
-        )
-
-        if momo_conn.is_connected():
-            momo_cursor = momo_conn.cursor()
-            # 確保表格存在（若不存在就建立），以避免 TRUNCATE 時出現 1146 錯誤
-            create_momo_table_query = """
-            CREATE TABLE IF NOT EXISTS momo_products (
-                sku VARCHAR(100),
-                title VARCHAR(255),
-                image TEXT,
-                url TEXT,
-                platform VARCHAR(50),
-                connect VARCHAR(100),
-                price DECIMAL(10, 2),
-                num INT,
-                query VARCHAR(100)
-            )
-            """
-            momo_cursor.execute(create_momo_table_query)
-            momo_cursor.execute("TRUNCATE TABLE momo_products")
-            print("已清空 momo_database.momo_products 表格（若原本不存在則已建立再清空）")
-            momo_conn.commit()
+        with get_db_pool().connection() as conn, conn.cursor() as cursor:
+            cursor.execute("TRUNCATE TABLE momo_database.momo_products")
+            print("已清空 momo_database.momo_products 表格")
+            conn.commit()
             
             # 🆕 清空後更新 JSON 檔案(寫入空陣列)
             try:
-                export_dir = 'json_exports'
-                if not os.path.exists(export_dir):
-                    os.makedirs(export_dir)
-                
-                latest_momo_file = os.path.join(export_dir, 'momo_products_latest.json')
-                with open(latest_momo_file, 'w', encoding='utf-8') as f:
-                    json.dump([], f, ensure_ascii=False, indent=2)
+                get_json_snapshot().replace("momo_products", [])
                 print("✓ 已清空 momo_products_latest.json")
             except Exception as e:
                 print(f"更新 JSON 時發生錯誤: {e}")
@@ -601,77 +310,21 @@ def clear_momo_products():
         print(f"MySQL 錯誤: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
-    finally:
-        if 'momo_conn' in locals() and momo_conn.is_connected():
-            momo_cursor.close()
-            momo_conn.close()
-            print("momo_database 連線已關閉")
-
 @app.route('/clear-pchome-products', methods=['POST'])
 def clear_pchome_products():
     print("\n" + "="*50)
     print("🔴 開始執行清空 PChome 表格操作")
     print("="*50)
     try:
-        # 建立資料庫（如果不存在）
-        temp_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='12345678',
-            auth_plugin='caching_sha2_password',
-            autocommit=True,
-            use_unicode=True,
-            charset='utf8mb4'
-        )
-        temp_cursor = temp_conn.cursor()
-        temp_cursor.execute("CREATE DATABASE IF NOT EXISTS pchome_database")
-        temp_cursor.close()
-        temp_conn.close()
-        print("✓ 資料庫連線成功")
-
-        pchome_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='12345678',
-            database='pchome_database',
-            auth_plugin='caching_sha2_password',
-            autocommit=True,
-            use_unicode=True,
-            charset='utf8mb4'
-        )
-
-        if pchome_conn.is_connected():
-            pchome_cursor = pchome_conn.cursor()
-            # 確保表格存在（若不存在就建立），以避免 TRUNCATE 時出現 1146 錯誤
-            create_pchome_table_query = """
-            CREATE TABLE IF NOT EXISTS pchome_products (
-                sku VARCHAR(100) UNIQUE,
-                title VARCHAR(255),
-                image TEXT,
-                url TEXT,
-                platform VARCHAR(50),
-                connect VARCHAR(100),
-                price DECIMAL(10, 2),
-                query VARCHAR(100)
-            )
-            """
-            pchome_cursor.execute(create_pchome_table_query)
-            print("✓ 表格已確認存在")
-            
+        with get_db_pool().connection() as conn, conn.cursor() as cursor:
             # 步驟 1: 清空資料庫表格
-            pchome_cursor.execute("TRUNCATE TABLE pchome_products")
+            cursor.execute("TRUNCATE TABLE pchome_database.pchome_products")
             print("✅ 步驟 1: 已清空 pchome_database.pchome_products 表格")
-            pchome_conn.commit()
+            conn.commit()
             
             # 步驟 2: 清空 JSON 檔案(寫入空陣列)
-            export_dir = 'json_exports'
-            if not os.path.exists(export_dir):
-                os.makedirs(export_dir)
-            
-            latest_pchome_file = os.path.join(export_dir, 'pchome_products_latest.json')
             try:
-                with open(latest_pchome_file, 'w', encoding='utf-8') as f:
-                    json.dump([], f, ensure_ascii=False, indent=2)
+                get_json_snapshot().replace("pchome_products", [])
                 print("✅ 步驟 2: 已清空 pchome_products_latest.json")
             except Exception as e:
                 print(f"❌ 清空 JSON 時發生錯誤: {e}")
@@ -680,53 +333,30 @@ def clear_pchome_products():
             pchome_file = "pchome_products.json"
             inserted_count = 0
             
-            if os.path.exists(pchome_file):
-                with open(pchome_file, "r", encoding="utf-8") as f:
-                    pchome_products = json.load(f)
-                
+            pchome_products = load_products(pchome_file)
+            if pchome_products is not None:
                 print(f"✓ 從 {pchome_file} 讀取到 {len(pchome_products)} 筆資料")
                 
                 # 插入資料到資料庫
                 insert_pchome_query = """
-                INSERT INTO pchome_products (sku, title, image, url, platform, connect, price, query)
+                INSERT INTO pchome_database.pchome_products (sku, title, image, url, platform, connect, price, query)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
                 """
-                for product in pchome_products:
-                    try:
-                        pchome_cursor.execute(insert_pchome_query, (
-                            product.get('sku', '無SKU'),
-                            product.get('title', '未知商品名稱'),
-                            product.get('image_url', '無圖片'),
-                            product.get('url', '無連結'),
-                            product.get('platform', 'pchome'),
-                            '',
-                            product.get('price', 0),
-                            product.get('query', '')
-                        ))
-                        inserted_count += 1
-                    except Error as e:
-                        print(f"❌ 插入商品時發生錯誤: {e}, 商品: {product.get('sku', '無SKU')}")
+                conn.start_transaction()
+                inserted_count = insert_rows(
+                    cursor, insert_pchome_query, [_pchome_row(product) for product in pchome_products],
+                    on_error=lambda index, e: print(f"❌ 插入商品時發生錯誤: {e}, 商品: {pchome_products[index].get('sku', '無SKU')}")
+                )
                 
-                pchome_conn.commit()
+                conn.commit()
                 print(f"✅ 步驟 3: 成功插入了 {inserted_count} 筆商品資料到資料庫")
                 
-                # 步驟 4: 從資料庫讀取資料並更新 JSON 檔案
-                pchome_cursor.execute("SELECT * FROM pchome_products")
-                all_pchome = [dict(zip([col[0] for col in pchome_cursor.description], row)) 
-                             for row in pchome_cursor.fetchall()]
-                
+                # 步驟 4: 從資料庫讀取資料並更新 JSON 檔案（整個表格重新載入，直接取代快照）
+                all_pchome = _fetch_all(cursor, "pchome_database.pchome_products")
                 print(f"✓ 從資料庫讀取到 {len(all_pchome)} 筆資料")
                 
-                # 轉換 Decimal 為 float
-                for item in all_pchome:
-                    for key, value in item.items():
-                        if isinstance(value, Decimal):
-                            item[key] = float(value)
-                
-                # 寫入 JSON 檔案
                 try:
-                    with open(latest_pchome_file, 'w', encoding='utf-8') as f:
-                        json.dump(all_pchome, f, ensure_ascii=False, indent=2)
+                    get_json_snapshot().replace("pchome_products", all_pchome)
                     print(f"✅ 步驟 4: 已將資料庫資料更新到 pchome_products_latest.json ({len(all_pchome)} 筆)")
                 except Exception as e:
                     print(f"❌ 更新 JSON 時發生錯誤: {e}")
@@ -748,12 +378,6 @@ def clear_pchome_products():
         print("="*50 + "\n")
         return jsonify({'success': False, 'error': str(e)}), 500
 
-    finally:
-        if 'pchome_conn' in locals() and pchome_conn.is_connected():
-            pchome_cursor.close()
-            pchome_conn.close()
-            print("✓ pchome_database 連線已關閉")
-
 @app.route('/initialize-pchome', methods=['POST'])
 def initialize_pchome():
     try:
@@ -780,53 +404,16 @@ def export_all_data():
     from flask import send_file
     
     try:
-        # 連接到三個資料庫
-        products_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='12345678',
-            database='products_database',
-            auth_plugin='caching_sha2_password',
-            autocommit=True,
-            use_unicode=True,
-            charset='utf8mb4'
-        )
-
-        momo_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='12345678',
-            database='momo_database',
-            auth_plugin='caching_sha2_password',
-            autocommit=True,
-            use_unicode=True,
-            charset='utf8mb4'
-        )
-
-        pchome_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='12345678',
-            database='pchome_database',
-            auth_plugin='caching_sha2_password',
-            autocommit=True,
-            use_unicode=True,
-            charset='utf8mb4'
-        )
-
-        if products_conn.is_connected() and momo_conn.is_connected() and pchome_conn.is_connected():
-            products_cursor = products_conn.cursor()
-            momo_cursor = momo_conn.cursor()
-            pchome_cursor = pchome_conn.cursor()
-            
+        # 從連線池借用一個連線，三個資料庫的表格都以 資料庫.表格 存取
+        with get_db_pool().connection() as conn, conn.cursor() as cursor:
             # 建立記憶體中的 ZIP 檔案
             memory_file = io.BytesIO()
             
             # 獲取 query 名稱（從 momo_products 表中取得）
             query_name = "product_data"  # 預設值
             try:
-                momo_cursor.execute("SELECT query FROM momo_products LIMIT 1")
-                result = momo_cursor.fetchone()
+                cursor.execute("SELECT query FROM momo_database.momo_products LIMIT 1")
+                result = cursor.fetchone()
                 if result and result[0]:
                     query_name = result[0].replace(' ', '_')  # 將空格替換為底線
             except:
@@ -836,14 +423,10 @@ def export_all_data():
                 
                 # === 1. 匯出 products 表的 SQL 和 JSON ===
                 print("✓ 正在匯出 products 表...")
-                products_cursor.execute("SELECT * FROM products")
-                products_data = [dict(zip([col[0] for col in products_cursor.description], row)) 
-                                for row in products_cursor.fetchall()]
+                products_data = _fetch_all(cursor, "products_database.products")
                 
                 # 產生 SQL INSERT 語句並放入 sql 資料夾（不包含建表語句，只有資料）
-                products_sql = generate_sql_insert('products', products_data, [
-                    'sku', 'title', 'image', 'url', 'platform', 'connect', 'price', 'uncertainty_problem', 'query'
-                ], include_create_table=False)
+                products_sql = generate_sql_insert('products', products_data, column_names('products'), include_create_table=False)
                 zipf.writestr('sql/products.sql', products_sql)
                 
                 # 產生 JSON 並放入 json 資料夾
@@ -853,14 +436,10 @@ def export_all_data():
                 
                 # === 2. 匯出 momo_products 表的 SQL 和 JSON ===
                 print("✓ 正在匯出 momo_products 表...")
-                momo_cursor.execute("SELECT * FROM momo_products")
-                momo_data = [dict(zip([col[0] for col in momo_cursor.description], row)) 
-                            for row in momo_cursor.fetchall()]
+                momo_data = _fetch_all(cursor, "momo_database.momo_products")
                 
                 # 產生 SQL INSERT 語句並放入 sql 資料夾（不包含建表語句，只有資料）
-                momo_sql = generate_sql_insert('momo_products', momo_data, [
-                    'sku', 'title', 'image', 'url', 'platform', 'connect', 'price', 'num', 'query'
-                ], include_create_table=False)
+                momo_sql = generate_sql_insert('momo_products', momo_data, column_names('momo_products'), include_create_table=False)
                 zipf.writestr('sql/momo_products.sql', momo_sql)
                 
                 # 產生 JSON 並放入 json 資料夾
@@ -870,14 +449,10 @@ def export_all_data():
                 
                 # === 3. 匯出 pchome_products 表的 SQL 和 JSON ===
                 print("✓ 正在匯出 pchome_products 表...")
-                pchome_cursor.execute("SELECT * FROM pchome_products")
-                pchome_data = [dict(zip([col[0] for col in pchome_cursor.description], row)) 
-                              for row in pchome_cursor.fetchall()]
+                pchome_data = _fetch_all(cursor, "pchome_database.pchome_products")
                 
                 # 產生 SQL INSERT 語句並放入 sql 資料夾（不包含建表語句，只有資料）
-                pchome_sql = generate_sql_insert('pchome_products', pchome_data, [
-                    'sku', 'title', 'image', 'url', 'platform', 'connect', 'price', 'query'
-                ], include_create_table=False)
+                pchome_sql = generate_sql_insert('pchome_products', pchome_data, column_names('pchome_products'), include_create_table=False)
                 zipf.writestr('sql/pchome_products.sql', pchome_sql)
                 
                 # 產生 JSON 並放入 json 資料夾
@@ -911,20 +486,6 @@ def export_all_data():
         print("="*50 + "\n")
         return jsonify({'success': False, 'error': str(e)}), 500
 
-    finally:
-        if 'products_conn' in locals() and products_conn.is_connected():
-            products_cursor.close()
-            products_conn.close()
-            print("✓ products_database 連線已關閉")
-        if 'momo_conn' in locals() and momo_conn.is_connected():
-            momo_cursor.close()
-            momo_conn.close()
-            print("✓ momo_database 連線已關閉")
-        if 'pchome_conn' in locals() and pchome_conn.is_connected():
-            pchome_cursor.close()
-            pchome_conn.close()
-            print("✓ pchome_database 連線已關閉")
-
 def generate_sql_insert(table_name, data, columns, include_create_table=True):
     """
     產生完整的 SQL 檔案（可選擇是否包含建表語句）
@@ -961,56 +522,16 @@ def generate_sql_insert(table_name, data, columns, include_create_table=True):
     
     # 只在需要時才包含建表語句
     if include_create_table:
-        # 定義各表的建表語句
-        table_schemas = {
-            'products': """
-CREATE TABLE IF NOT EXISTS `products` (
-  `sku` varchar(100) DEFAULT NULL,
-  `title` varchar(255) DEFAULT NULL,
-  `image` text,
-  `url` text,
-  `platform` varchar(50) DEFAULT NULL,
-  `connect` varchar(100) DEFAULT NULL,
-  `price` decimal(10,2) DEFAULT NULL,
-  `uncertainty_problem` tinyint unsigned NOT NULL DEFAULT '0',
-  `query` varchar(100) DEFAULT NULL
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
-""",
-            'momo_products': """
-CREATE TABLE IF NOT EXISTS `momo_products` (
-  `sku` varchar(100) DEFAULT NULL,
-  `title` varchar(255) DEFAULT NULL,
-  `image` text,
-  `url` text,
-  `platform` varchar(50) DEFAULT NULL,
-  `connect` varchar(100) DEFAULT NULL,
-  `price` decimal(10,2) DEFAULT NULL,
-  `num` int DEFAULT NULL,
-  `query` varchar(100) DEFAULT NULL
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
-""",
-            'pchome_products': """
-CREATE TABLE IF NOT EXISTS `pchome_products` (
-  `sku` varchar(100) DEFAULT NULL,
-  `title` varchar(255) DEFAULT NULL,
-  `image` text,
-  `url` text,
-  `platform` varchar(50) DEFAULT NULL,
-  `connect` varchar(100) DEFAULT NULL,
-  `price` decimal(10,2) DEFAULT NULL,
-  `query` varchar(100) DEFAULT NULL,
-  UNIQUE KEY `sku` (`sku`)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
-"""
-        }
-        
         # 加入建表語句
         sql_lines.append(f"--")
         sql_lines.append(f"-- Table structure for table `{table_name}`")
         sql_lines.append(f"--")
         sql_lines.append("")
         sql_lines.append(f"DROP TABLE IF EXISTS `{table_name}`;")
-        sql_lines.append(table_schemas.get(table_name, f"-- 無建表語句: {table_name}"))
+        if table_name in TABLES:
+            sql_lines.append(create_table_sql(table_name, qualified=False))
+        else:
+            sql_lines.append(f"-- 無建表語句: {table_name}")
         sql_lines.append("")
     
     # 加入資料
@@ -1101,87 +622,37 @@ def delete_labeled_product():
         
         print(f"📝 接收到刪除請求，MOMO SKU: {momo_sku}")
         
-        # 連接到資料庫
-        products_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='12345678',
-            database='products_database',
-            auth_plugin='caching_sha2_password',
-            autocommit=True,
-            use_unicode=True,
-            charset='utf8mb4'
-        )
-
-        momo_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='12345678',
-            database='momo_database',
-            auth_plugin='caching_sha2_password',
-            autocommit=True,
-            use_unicode=True,
-            charset='utf8mb4'
-        )
-
-        pchome_conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='12345678',
-            database='pchome_database',
-            auth_plugin='caching_sha2_password',
-            autocommit=True,
-            use_unicode=True,
-            charset='utf8mb4'
-        )
-
-        if products_conn.is_connected() and momo_conn.is_connected() and pchome_conn.is_connected():
-            products_cursor = products_conn.cursor()
-            momo_cursor = momo_conn.cursor()
-            pchome_cursor = pchome_conn.cursor()
-            
+        # 從連線池借用一個連線，三個資料庫的表格都以 資料庫.表格 存取
+        with get_db_pool().connection() as conn, conn.cursor() as cursor:
             # 步驟 1: 先查詢有多少筆 products 會被刪除
-            products_cursor.execute(
-                "SELECT COUNT(*) FROM products WHERE connect = %s",
+            cursor.execute(
+                "SELECT COUNT(*) FROM products_database.products WHERE connect = %s",
                 (momo_sku,)
             )
-            products_count = products_cursor.fetchone()[0]
+            products_count = cursor.fetchone()[0]
             print(f"✓ 找到 {products_count} 筆連結到 MOMO SKU {momo_sku} 的 PChome 商品")
             
             # 步驟 2: 刪除 products 表中所有 connect 等於該 momo_sku 的記錄
-            delete_products_query = "DELETE FROM products WHERE connect = %s"
-            products_cursor.execute(delete_products_query, (momo_sku,))
-            products_deleted = products_cursor.rowcount
+            delete_products_query = "DELETE FROM products_database.products WHERE connect = %s"
+            cursor.execute(delete_products_query, (momo_sku,))
+            products_deleted = cursor.rowcount
             print(f"✅ 步驟 1: 從 products 表刪除了 {products_deleted} 筆記錄")
             
             # 步驟 3: 刪除 momo_products 表中該 SKU 的記錄
-            delete_momo_query = "DELETE FROM momo_products WHERE sku = %s"
-            momo_cursor.execute(delete_momo_query, (momo_sku,))
-            momo_deleted = momo_cursor.rowcount
+            delete_momo_query = "DELETE FROM momo_database.momo_products WHERE sku = %s"
+            cursor.execute(delete_momo_query, (momo_sku,))
+            momo_deleted = cursor.rowcount
             print(f"✅ 步驟 2: 從 momo_products 表刪除了 {momo_deleted} 筆記錄")
             
-            products_conn.commit()
-            momo_conn.commit()
+            conn.commit()
             
             # 步驟 4: 更新 JSON 檔案
             try:
-                # 查詢 products 表格所有資料
-                products_cursor.execute("SELECT * FROM products")
-                all_products = [dict(zip([col[0] for col in products_cursor.description], row)) 
-                               for row in products_cursor.fetchall()]
-                
-                # 查詢 momo_products 表格所有資料
-                momo_cursor.execute("SELECT * FROM momo_products")
-                all_momo = [dict(zip([col[0] for col in momo_cursor.description], row)) 
-                           for row in momo_cursor.fetchall()]
-                
-                # 查詢 pchome_products 表格所有資料
-                pchome_cursor.execute("SELECT * FROM pchome_products")
-                all_pchome = [dict(zip([col[0] for col in pchome_cursor.description], row)) 
-                             for row in pchome_cursor.fetchall()]
-                
-                # 儲存到三個 JSON 檔案
-                json_counts = save_to_json_files(all_products, all_momo, all_pchome)
+                # 以與 DELETE 相同的條件記錄到 JSON 快照的變更記錄，不需重新查詢整個表格
+                snapshot = get_json_snapshot()
+                snapshot.record_delete("products", {"connect": momo_sku})
+                snapshot.record_delete("momo_products", {"sku": momo_sku})
+                json_counts = snapshot.counts()
                 print(f"✅ 步驟 3: 已更新 JSON 檔案")
                 print(f"   - products_latest.json: {json_counts['products']} 筆")
                 print(f"   - momo_products_latest.json: {json_counts['momo_products']} 筆")
@@ -1211,23 +682,23 @@ def delete_labeled_product():
         print("="*50 + "\n")
         return jsonify({'success': False, 'error': str(e)}), 500
 
-    finally:
-        if 'products_conn' in locals() and products_conn.is_connected():
-            products_cursor.close()
-            products_conn.close()
-            print("✓ products_database 連線已關閉")
-        if 'momo_conn' in locals() and momo_conn.is_connected():
-            momo_cursor.close()
-            momo_conn.close()
-            print("✓ momo_database 連線已關閉")
-        if 'pchome_conn' in locals() and pchome_conn.is_connected():
-            pchome_cursor.close()
-            pchome_conn.close()
-            print("✓ pchome_database 連線已關閉")
+
+@app.route('/db-pool-stats')
+def db_pool_stats():
+    """
+    MySQL 連線池的使用狀況（連線數、借用次數、等待與逾時次數）
+    """
+    return jsonify(get_db_pool().report())
 
 if __name__ == "__main__":
     # 避免在 Flask reloader 重啟時重複執行初始化
     import os
     if os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        # 建立或更新資料庫表格，之後的路由都假設表格已存在
+        try:
+            migrate()
+        except Error as e:
+            print(f"MySQL 錯誤: {e}")
         initialize_pchome_database()
+        sync_json_snapshots()
     app.run(debug=True, port=5000)
\ No newline at end of file
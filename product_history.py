@@ -0,0 +1,151 @@
+from datetime import datetime
+import threading
+import sqlite3
+import os
+
+HISTORY_DB_FILE = os.environ.get('SCRAPER_HISTORY_DB', 'product_history.db')
+
+# 這些欄位有變動時，增量抓取才會重新輸出商品
+TRACKED_FIELDS = ("price", "title", "image_url")
+
+
+class ProductHistory:
+    """
+    以 SQLite 記錄每個平台抓過的商品（以 sku 為鍵）與價格歷史
+
+    known_products 保存每個 SKU 最後一次看到的內容；price_history 只新增不修改，
+    每次出現新 SKU 或價格變動就加一筆帶時間的記錄。
+    """
+
+    def __init__(self, path=HISTORY_DB_FILE):
+        """
+        Args:
+            path (str): SQLite 資料庫檔案路徑
+        """
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS known_products (
+                    platform TEXT NOT NULL,
+                    sku TEXT NOT NULL,
+                    title TEXT,
+                    price INTEGER,
+                    image_url TEXT,
+                    url TEXT,
+                    first_seen TEXT,
+                    last_seen TEXT,
+                    PRIMARY KEY (platform, sku)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS price_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    platform TEXT NOT NULL,
+                    sku TEXT NOT NULL,
+                    price INTEGER,
+                    recorded_at TEXT
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_price_history_sku ON price_history (platform, sku)")
+
+    def _known(self, platform, skus):
+        """取得已知 SKU 的最後內容：sku -> {title, price, image_url}"""
+        known = {}
+        skus = [sku for sku in skus if sku]
+        # SQLite 單一查詢的參數數量有上限，分批查詢
+        for start in range(0, len(skus), 500):
+            batch = skus[start:start + 500]
+            placeholders = ", ".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT sku, title, price, image_url FROM known_products "
+                f"WHERE platform = ? AND sku IN ({placeholders})", [platform, *batch]).fetchall()
+            for sku, title, price, image_url in rows:
+                known[sku] = {"title": title, "price": price, "image_url": image_url}
+        return known
+
+    def diff(self, platform, page_products):
+        """
+        將一頁的商品分成「新的或有變動」與「沒有變動」兩組（不寫入資料庫）
+
+        Args:
+            platform (str): 平台名稱
+            page_products (list): 解析出的商品（包含 sku, title, price, image_url）
+
+        Returns:
+            tuple: (新的或有變動的商品列表, 沒有變動的商品列表)
+        """
+        with self._lock:
+            known = self._known(platform, [product["sku"] for product in page_products])
+
+        fresh, unchanged = [], []
+        for product in page_products:
+            previous = known.get(product["sku"])
+            if previous and all(previous[field] == product[field] for field in TRACKED_FIELDS):
+                unchanged.append(product)
+            else:
+                fresh.append(product)
+        return fresh, unchanged
+
+    def record(self, platform, products):
+        """
+        記錄這次看到的商品：更新 known_products，新 SKU 與價格變動另外寫入 price_history
+
+        Args:
+            platform (str): 平台名稱
+            products (list): 這一頁輸出或確認沒有變動的商品
+        """
+        products = [product for product in products if product.get("sku")]
+        if not products:
+            return
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock, self._conn:
+            known = self._known(platform, [product["sku"] for product in products])
+            self._conn.executemany(
+                "INSERT INTO price_history (platform, sku, price, recorded_at) VALUES (?, ?, ?, ?)",
+                [(platform, product["sku"], product["price"], now) for product in products
+                 if product["sku"] not in known or known[product["sku"]]["price"] != product["price"]])
+            self._conn.executemany("""
+                INSERT INTO known_products (platform, sku, title, price, image_url, url, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (platform, sku) DO UPDATE SET
+                    title = excluded.title, price = excluded.price, image_url = excluded.image_url,
+                    url = excluded.url, last_seen = excluded.last_seen
+            """, [(platform, product["sku"], product["title"], product["price"], product["image_url"],
+                   product.get("url", ""), now, now) for product in products])
+
+    def price_history(self, platform, sku):
+        """
+        取得某個商品的價格歷史
+
+        Returns:
+            list: [(價格, 記錄時間), ...]，依時間排序
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT price, recorded_at FROM price_history WHERE platform = ? AND sku = ? ORDER BY id",
+                (platform, sku)).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_product_history = None
+_product_history_lock = threading.Lock()
+
+
+def get_product_history():
+    """
+    取得行程內共用的商品歷史資料庫
+
+    Returns:
+        ProductHistory: 共用的商品歷史資料庫
+    """
+    global _product_history
+    with _product_history_lock:
+        if _product_history is None:
+            _product_history = ProductHistory()
+        return _product_history
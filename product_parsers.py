@@ -0,0 +1,423 @@
+from collections import Counter
+from bs4 import BeautifulSoup
+import html
+import json
+from urllib.parse import quote
+import re
+import os
+
+# 本模組的解析函式只依賴 HTML / JSON 內容，不需要瀏覽器、網路或選擇器快取，
+# 可以在 ProcessPoolExecutor 的子行程中執行（product_scraper 的解析行程池）
+
+# 網站網址可用環境變數改成本機的回放伺服器（見 fixture_server.py）
+MOMO_BASE_URL = os.environ.get("MOMO_BASE_URL", "https://www.momoshop.com.tw")
+MOMO_PAGE_SIZE = 30  # momo 搜尋結果每頁通常有 30 個商品
+
+# momo 商品列表、標題與價格的候選選擇器（依優先順序）
+MOMO_LIST_SELECTORS = [
+    "li.listAreaLi",
+    ".listAreaUl li.listAreaLi",
+    "li.goodsItemLi",
+    ".prdListArea .goodsItemLi",
+    ".searchPrdListArea li",
+    "li[data-gtm]",
+    ".goodsItemLi",
+    ".searchPrdList li"
+]
+
+MOMO_TITLE_SELECTORS = [
+    "h3.prdName",
+    ".prdNameTitle h3.prdName",
+    ".prdName",
+    "h3",
+    "a[title]",
+    "img[alt]",
+    ".goodsName",
+    ".goodsInfo h3",
+    "a"
+]
+
+MOMO_PRICE_SELECTORS = [
+    ".money .price b",
+    ".price b",
+    ".money b",
+    ".price",
+    ".money",
+    ".cost",
+    "b",
+    "strong",
+    ".goodsPrice",
+    ".priceInfo"
+]
+
+# momo 搜尋頁顯示總筆數的元素（依優先順序）
+MOMO_TOTAL_SELECTORS = [
+    ".searchListArea .searchTotal",
+    ".searchTotal",
+    "span.totalNum",
+    ".totalResults",
+    "div[class*='total']"
+]
+# 頁面內嵌資料中的總筆數欄位
+MOMO_TOTAL_PATTERN = re.compile(r'"(?:totalCount|totalCnt|totalSize|maxCount)"\s*:\s*"?(\d+)')
+
+PCHOME_BASE_URL = os.environ.get("PCHOME_BASE_URL", "https://24h.pchome.com.tw")
+PCHOME_IMAGE_BASE_URL = "https://cs.ecimg.tw"
+PCHOME_SEARCH_API_URL = os.environ.get("PCHOME_SEARCH_API_URL", "https://ecshweb.pchome.com.tw/search/v3.3/all/results")
+
+# 依序嘗試的商品連結與圖片選擇器
+MOMO_LINK_SELECTORS = ["a.goods-img-url", "a[href*='/goods/']", "a[href]"]
+MOMO_IMAGE_SELECTORS = ["img.prdImg", "img"]
+
+# 單次 execute_script 批次擷取商品卡片時使用的欄位選擇器
+MOMO_CARD_FIELDS = {
+    "title": MOMO_TITLE_SELECTORS,
+    "price": MOMO_PRICE_SELECTORS,
+    "link": MOMO_LINK_SELECTORS,
+    "image": MOMO_IMAGE_SELECTORS
+}
+
+PCHOME_LIST_SELECTORS = ["li.c-listInfoGrid__item--gridCardGray5"]
+PCHOME_CARD_FIELDS = {
+    "title": ["div.c-prodInfoV2__title"],
+    "price": ["div.c-prodInfoV2__salePrice"],
+    "link": ["a.c-prodInfoV2__link"],
+    "image": ["div.c-prodInfoV2__head img"]
+}
+
+
+def build_momo_search_url(keyword, page):
+    """建構 momo 搜尋 URL（包含頁數）"""
+    encoded_keyword = quote(keyword)
+    return f"{MOMO_BASE_URL}/search/searchShop.jsp?keyword={encoded_keyword}&searchType=1&cateLevel=0&ent=k&sortType=1&curPage={page}"
+
+
+def _extract_momo_price(price_texts):
+    """
+    從候選價格文字中挑出價格
+
+    Args:
+        price_texts (list): 依序嘗試的價格文字
+
+    Returns:
+        int: 價格，找不到時為 0
+    """
+    for price_text in price_texts:
+        if price_text and ('$' in price_text or 'NT' in price_text or any(c.isdigit() for c in price_text)):
+            # 提取數字
+            numbers = re.findall(r'\d+', price_text.replace(',', ''))
+            if numbers:
+                # 取最大的數字作為價格（避免取到折扣百分比等小數字）
+                potential_prices = [int(num) for num in numbers if int(num) > 10]
+                if potential_prices:
+                    return max(potential_prices)
+    return 0
+
+
+def _normalize_momo_url(url):
+    """將 momo 商品連結補成完整網址"""
+    if not url:
+        return ""
+    if url.startswith("//"):
+        return "https:" + url
+    if not url.startswith("http"):
+        return MOMO_BASE_URL + url
+    return url
+
+
+def _extract_momo_sku(url):
+    """提取 i_code 作為 sku，如果找不到則使用網址最後一段"""
+    if not url:
+        return ""
+
+    # 首先嘗試提取 i_code
+    match = re.search(r'i_code=(\d+)', url)
+    if match:
+        return match.group(1)
+
+    # 如果找不到 i_code，則使用網址的最後一段
+    # 例如：https://www.momoshop.com.tw/goods/GoodsDetail.jsp?i_code=123456
+    # 或：https://www.momoshop.com.tw/product/ABC123
+    last_part = url.rstrip('/').split('/')[-1]
+    # 如果最後一段包含參數，只取檔名部分
+    if '?' in last_part:
+        last_part = last_part.split('?')[0]
+    # 如果最後一段有副檔名，去掉副檔名
+    if '.' in last_part:
+        last_part = last_part.split('.')[0]
+    return last_part
+
+
+def _normalize_momo_image_url(image_url):
+    """處理 momo 圖片的相對路徑和協議相對路徑"""
+    if not image_url:
+        return ""
+    if image_url.startswith("//"):
+        return "https:" + image_url
+    if image_url.startswith("/"):
+        return MOMO_BASE_URL + image_url
+    if not image_url.startswith("http"):
+        # 如果是相對路徑但不以 / 開頭，假設是 momoshop 的圖片
+        if "momoshop" not in image_url:
+            return "https://cdn3.momoshop.com.tw/momoshop/upload/media/" + image_url
+        return "https://" + image_url
+    return image_url
+
+
+def _build_momo_record(title, price, url, image_url):
+    """
+    組合 momo 商品解析結果
+
+    Returns:
+        dict | None: 包含 title, price, image_url, url, sku 的字典，缺少必要欄位時回傳 None
+    """
+    # 確保所有必要欄位都有值才回傳商品
+    if not (title and price > 0 and url):
+        return None
+
+    return {
+        "title": title,
+        "price": price,
+        "image_url": image_url if image_url else "",
+        "url": url,
+        "sku": _extract_momo_sku(url)
+    }
+
+
+def _extract_cards_from_soup(soup, list_selectors, fields, hits=None):
+    """
+    與 product_scraper.EXTRACT_CARDS_SCRIPT 相同的擷取規則，改以 BeautifulSoup 作用在靜態 HTML 上
+
+    Args:
+        soup (BeautifulSoup): 已解析的頁面
+        list_selectors (list): 商品列表的候選選擇器（依優先順序）
+        fields (dict): title, price, link, image 各欄位的候選選擇器
+        hits (dict): 若提供，記錄商品列表勝出的選擇器（"list" -> Counter）
+
+    Returns:
+        list: 每張卡片的 {titles, prices, href, image} 字典
+    """
+    elements = []
+    for selector in list_selectors:
+        elements = soup.select(selector)
+        if elements:
+            if hits is not None:
+                hits["list"][selector] += 1
+            break
+
+    def first(card, selectors, getter):
+        for selector in selectors:
+            el = card.select_one(selector)
+            if el is not None:
+                return getter(el)
+        return None
+
+    def title_text(card, selector):
+        el = card.select_one(selector)
+        if el is None:
+            return None
+        if selector == "img[alt]":
+            return el.get("alt") or ""
+        if selector == "a[title]":
+            return el.get("title") or ""
+        return el.get_text(" ", strip=True)
+
+    return [{
+        "titles": [title_text(card, selector) for selector in fields["title"]],
+        "prices": [[el.get_text(" ", strip=True) for el in card.select(selector)]
+                   for selector in fields["price"]],
+        "href": first(card, fields["link"], lambda el: el.get("href") or ""),
+        "image": first(card, fields["image"], lambda el: el.get("src") or
+                       el.get("data-original") or el.get("data-src") or "")
+    } for card in elements]
+
+
+def _parse_momo_card_data(card, fields=MOMO_CARD_FIELDS, hits=None):
+    """
+    將批次擷取的 momo 卡片原始資料轉換成商品記錄，規則與 _parse_momo_element 相同
+
+    Args:
+        card (dict): {titles, prices, href, image}，titles 與 prices 依 fields 的選擇器順序排列
+        fields (dict): 擷取卡片時使用的選擇器
+        hits (dict): 若提供，記錄標題與價格勝出的選擇器（欄位名稱 -> Counter）
+
+    Returns:
+        dict | None: 包含 title, price, image_url, url, sku 的字典，缺少必要欄位時回傳 None
+    """
+    # 依選擇器優先順序挑選標題
+    title = ""
+    title_selector = None
+    for selector, text in zip(fields["title"], card["titles"]):
+        if text is None:
+            continue
+        title = text.strip()
+        if title and len(title) > 5:  # 確保標題有足夠長度
+            title_selector = selector
+            break
+    if not title:
+        return None
+
+    price = 0
+    for selector, price_texts in zip(fields["price"], card["prices"]):
+        price = _extract_momo_price(price_texts)
+        if price > 0:
+            break
+    if price <= 0:
+        return None
+
+    if hits is not None:
+        if title_selector:
+            hits["title"][title_selector] += 1
+        hits["price"][selector] += 1
+
+    return _build_momo_record(title, price,
+                              _normalize_momo_url(card["href"]),
+                              _normalize_momo_image_url(card["image"]))
+
+
+def _parse_pchome_card_data(card):
+    """
+    將批次擷取的 PChome 卡片原始資料轉換成商品記錄
+
+    Args:
+        card (dict): {titles, prices, href, image}
+
+    Returns:
+        dict | None: 包含 title, price, image_url, url, sku 的字典，缺少必要欄位時回傳 None
+    """
+    url = card["href"]
+    title = card["titles"][0]
+    price_texts = card["prices"][0]
+    if not url or title is None or not price_texts:
+        return None
+
+    if not url.startswith(("http://", "https://")):
+        url = PCHOME_BASE_URL + url
+    sku_match = re.search(r'/prod/(.*?)(?:\?|$)', url)
+    sku = sku_match.group(1) if sku_match else ""
+
+    title = title.strip()
+    price_digits = re.sub(r'[^\d]', '', price_texts[0])
+    price = int(price_digits) if price_digits else 0
+
+    if not (title and price > 0 and url and sku):
+        return None
+
+    return {
+        "title": title,
+        "price": price,
+        "image_url": card["image"] or "",
+        "url": url,
+        "sku": sku
+    }
+
+
+def _parse_pchome_api_prods(data):
+    """
+    將 PChome 搜尋 API 的商品記錄轉換成與 DOM 解析相同的欄位
+
+    Args:
+        data (dict): API 回傳的 JSON
+
+    Returns:
+        list: 包含 title, price, image_url, url, sku 的商品列表（尚未編號）
+    """
+    page_products = []
+    for prod in data.get("prods") or []:
+        sku = prod.get("Id") or ""
+        title = html.unescape(prod.get("name") or "").strip()
+        try:
+            price = int(prod.get("price") or 0)
+        except (TypeError, ValueError):
+            price = 0
+
+        if not (title and price > 0 and sku):
+            continue
+
+        image_path = prod.get("picB") or prod.get("picS") or ""
+        if image_path and not image_path.startswith("http"):
+            image_path = PCHOME_IMAGE_BASE_URL + image_path
+
+        page_products.append({
+            "title": title,
+            "price": price,
+            "image_url": image_path,
+            "url": f"{PCHOME_BASE_URL}/prod/{sku}",
+            "sku": sku
+        })
+    return page_products
+
+
+def parse_momo_page(page_html, list_selectors=None, fields=None):
+    """
+    解析一頁 momo 搜尋結果
+
+    Args:
+        page_html (str | bytes): 搜尋結果頁的 HTML（HTTP 回應或瀏覽器的 page_source）
+        list_selectors (list): 商品列表的候選選擇器，預設 MOMO_LIST_SELECTORS
+        fields (dict): 各欄位的候選選擇器，預設 MOMO_CARD_FIELDS
+
+    Returns:
+        tuple: (該頁商品元素數量, 解析成功的商品列表, 勝出的選擇器 {"list", "title", "price"} -> Counter)
+    """
+    fields = fields or MOMO_CARD_FIELDS
+    hits = {"list": Counter(), "title": Counter(), "price": Counter()}
+    soup = BeautifulSoup(page_html, "lxml")
+    cards = _extract_cards_from_soup(soup, list_selectors or MOMO_LIST_SELECTORS, fields, hits)
+    page_products = [record for record in (_parse_momo_card_data(card, fields, hits) for card in cards) if record]
+    return len(cards), page_products, hits
+
+
+def parse_momo_total(page_html):
+    """
+    從 momo 搜尋結果頁取得搜尋結果的總筆數
+
+    Args:
+        page_html (str | bytes): 搜尋結果頁的 HTML
+
+    Returns:
+        int | None: 總筆數，頁面上沒有總數時回傳 None
+    """
+    soup = BeautifulSoup(page_html, "lxml")
+    for selector in MOMO_TOTAL_SELECTORS:
+        element = soup.select_one(selector)
+        if element is None:
+            continue
+        # 總數可能有千分位逗號，例如「共 1,234 筆」
+        numbers = re.findall(r'\d[\d,]*', element.get_text())
+        if numbers:
+            return int(numbers[0].replace(",", ""))
+
+    if isinstance(page_html, bytes):
+        page_html = page_html.decode("utf-8", errors="ignore")
+    match = MOMO_TOTAL_PATTERN.search(page_html)
+    return int(match.group(1)) if match else None
+
+
+def parse_pchome_page(page_html):
+    """
+    解析一頁 PChome 搜尋結果（瀏覽器渲染後的 page_source）
+
+    Args:
+        page_html (str | bytes): 搜尋結果頁的 HTML
+
+    Returns:
+        tuple: (該頁商品元素數量, 解析成功的商品列表)
+    """
+    soup = BeautifulSoup(page_html, "lxml")
+    cards = _extract_cards_from_soup(soup, PCHOME_LIST_SELECTORS, PCHOME_CARD_FIELDS)
+    return len(cards), [record for record in map(_parse_pchome_card_data, cards) if record]
+
+
+def parse_pchome_api_page(page_json):
+    """
+    解析一頁 PChome 搜尋 API 的回應
+
+    Args:
+        page_json (str | bytes | dict): API 回傳的 JSON
+
+    Returns:
+        tuple: (該頁商品數量, 解析成功的商品列表)
+    """
+    data = json.loads(page_json) if isinstance(page_json, (str, bytes)) else page_json
+    return len(data.get("prods") or []), _parse_pchome_api_prods(data)
@@ -1,17 +1,42 @@
 import json
-from selenium import webdriver
+import csv
+import time
+import argparse
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-import time
-import random
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 from urllib.parse import quote
 import re
+import threading
+import atexit
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import repeat
 import warnings
 import logging
 import os
+import requests
+from requests.adapters import HTTPAdapter
+from browser_pool import get_browser_pool, USER_AGENT
+from rate_limiter import get_rate_limiter, parse_rate_spec, configure_rates
+from product_stream import NDJSONWriter, ndjson_path_for
+from product_history import get_product_history
+from image_cache import get_image_cache
+from resource_blocking import collect_network_stats, estimate_bytes_saved
+from resilience import RetryPolicy, RetryableError, CircuitOpenError, call_with_retry
+from scrape_metrics import (
+    start_run, finish_run, current_run, page_scope, record, timed,
+    install_webdriver_counter, write_json_report, write_prometheus
+)
+from product_parsers import (
+    MOMO_BASE_URL, MOMO_PAGE_SIZE, MOMO_LIST_SELECTORS, MOMO_TITLE_SELECTORS, MOMO_PRICE_SELECTORS,
+    MOMO_LINK_SELECTORS, MOMO_IMAGE_SELECTORS, MOMO_CARD_FIELDS,
+    PCHOME_BASE_URL, PCHOME_SEARCH_API_URL, PCHOME_LIST_SELECTORS, PCHOME_CARD_FIELDS,
+    build_momo_search_url, parse_momo_page, parse_pchome_page,
+    _extract_momo_price, _build_momo_record, _normalize_momo_url, _normalize_momo_image_url,
+    _parse_momo_card_data, _parse_pchome_card_data, _parse_pchome_api_prods
+)
 
 # 在文件開頭添加這些行來抑制所有警告和日誌
 warnings.filterwarnings("ignore")
@@ -22,515 +47,1327 @@ logging.getLogger('urllib3').setLevel(logging.CRITICAL)
 os.environ['WDM_LOG_LEVEL'] = '0'
 os.environ['WDM_PRINT_FIRST_LINE'] = 'False'
 
-def fetch_products_for_momo(keyword, max_products=50):
+# 每個 WebDriver 指令都記入抓取指標的 webdriver_rpcs
+install_webdriver_counter()
+
+MOMO_SHORT_PAGE_THRESHOLD = 20  # 少於 20 個商品視為最後一頁
+PCHOME_API_PAGE_SIZE = 20  # PChome 搜尋 API 每頁 20 筆
+METRICS_REPORT_FILE = "scrape_report.json"
+
+# 重試設定：頁面載入與 HTTP 請求遇到暫時性錯誤時以指數退避重試（間隔另受速率限制器控制）
+PAGE_RETRY_POLICY = RetryPolicy(max_attempts=3, base_delay=2.0, max_delay=15.0)
+HTTP_RETRY_POLICY = RetryPolicy(max_attempts=4, base_delay=1.0, max_delay=20.0)
+
+# 在瀏覽器內依選擇器優先順序一次擷取所有商品卡片的原始資料，
+# 回傳 [{titles, prices, href, image}, ...]，後續處理交給 Python
+EXTRACT_CARDS_SCRIPT = """
+const listSelectors = arguments[0];
+const fields = arguments[1];
+let cards = [];
+for (const selector of listSelectors) {
+    cards = document.querySelectorAll(selector);
+    if (cards.length) break;
+}
+const first = (card, selectors, getter) => {
+    for (const selector of selectors) {
+        const el = card.querySelector(selector);
+        if (el) return getter(el);
+    }
+    return null;
+};
+return Array.from(cards, card => ({
+    titles: fields.title.map(selector => {
+        const el = card.querySelector(selector);
+        if (!el) return null;
+        if (selector === "img[alt]") return el.getAttribute("alt") || "";
+        if (selector === "a[title]") return el.getAttribute("title") || "";
+        return el.innerText || "";
+    }),
+    prices: fields.price.map(selector =>
+        Array.from(card.querySelectorAll(selector), el => el.innerText || "")),
+    href: first(card, fields.link, el => el.href || el.getAttribute("href") || ""),
+    image: first(card, fields.image, el =>
+        el.src || el.getAttribute("data-original") || el.getAttribute("data-src") || "")
+}));
+"""
+
+# 解析行程池的行程數，預設為 CPU 核心數；設為 0 則在目前行程內解析
+PARSE_PROCESSES = int(os.environ.get('SCRAPER_PARSE_PROCESSES', os.cpu_count() or 1))
+
+# 記錄各欄位最後成功的選擇器，跨執行保存
+SELECTOR_CACHE_FILE = "selector_cache.json"
+
+# 抓取進度檢查點的資料夾
+CHECKPOINT_DIR = "checkpoints"
+
+# 共用的 HTTP 連線池（HTTP 引擎使用）
+_http_session = None
+_http_session_lock = threading.Lock()
+
+_selector_cache = None
+_selector_cache_lock = threading.Lock()
+
+_parse_executor = None
+_parse_executor_lock = threading.Lock()
+
+
+class SelectorCache:
+    """
+    記錄每個平台、每個欄位最後成功匹配的選擇器
+
+    之後的頁面與執行會優先嘗試上次成功的選擇器；當它不再匹配、由其他
+    選擇器勝出時，會自動改記新的選擇器。結果保存在 JSON 檔案中。
+    """
+
+    def __init__(self, path=SELECTOR_CACHE_FILE):
+        """
+        Args:
+            path (str): 快取檔案路徑
+        """
+        self.path = path
+        self._winners = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._winners is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._winners = json.load(f)
+            except (OSError, ValueError):
+                self._winners = {}
+
+    def ordered(self, platform, field, selectors):
+        """
+        回傳調整順序後的選擇器列表，上次成功的選擇器排在最前面
+
+        Args:
+            platform (str): 平台名稱
+            field (str): 欄位名稱（list, title, price）
+            selectors (list): 預設優先順序的選擇器列表
+
+        Returns:
+            list: 調整順序後的選擇器列表
+        """
+        with self._lock:
+            self._load()
+            winner = self._winners.get(platform, {}).get(field)
+        if winner in selectors:
+            return [winner] + [selector for selector in selectors if selector != winner]
+        return list(selectors)
+
+    def record(self, platform, field, selector):
+        """記錄某欄位成功匹配的選擇器"""
+        with self._lock:
+            self._load()
+            fields = self._winners.setdefault(platform, {})
+            previous = fields.get(field)
+            if previous != selector:
+                fields[field] = selector
+                self._dirty = True
+                if previous:
+                    print(f"{platform} 的 {field} 選擇器已由 '{previous}' 改為 '{selector}'")
+
+    def learn(self, platform, hits):
+        """
+        依一頁中各選擇器勝出的次數，記錄最常勝出的選擇器
+
+        Args:
+            platform (str): 平台名稱
+            hits (dict): 欄位名稱 -> Counter(選擇器 -> 勝出次數)
+        """
+        for field, counter in hits.items():
+            if counter:
+                self.record(platform, field, counter.most_common(1)[0][0])
+
+    def save(self):
+        """有變更時寫回快取檔案"""
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                with open(self.path, "w", encoding="utf-8") as f:
+                    json.dump(self._winners, f, ensure_ascii=False, indent=2)
+                self._dirty = False
+            except OSError as e:
+                print(f"儲存選擇器快取失敗: {e}")
+
+
+def get_selector_cache():
+    """
+    取得行程內共用的選擇器快取
+
+    Returns:
+        SelectorCache: 共用的選擇器快取
+    """
+    global _selector_cache
+    with _selector_cache_lock:
+        if _selector_cache is None:
+            _selector_cache = SelectorCache()
+        return _selector_cache
+
+
+def _query_slug(query):
+    """將查詢名稱轉成可用於檔名的字串"""
+    return re.sub(r'[^\w\-]+', '_', query).strip('_') or "query"
+
+
+class ScrapeInterrupted(Exception):
+    """抓取中途停止（raise_on_interrupt=True 時拋出），已完成的頁面保留在檢查點"""
+
+    def __init__(self, message, products, checkpoint_path):
+        super().__init__(message)
+        self.products = products
+        self.checkpoint_path = checkpoint_path
+
+
+class ScrapeCheckpoint:
+    """
+    以 JSON 檔案保存抓取進度（下一頁頁數、已收集的商品與 SKU）
+
+    每合併完一頁就寫入一次；抓取中斷後以 resume=True 重新執行，
+    即可從上次完成的頁面繼續，成功完成後自動刪除檢查點。
+    """
+
+    def __init__(self, platform, keyword, checkpoint_dir=CHECKPOINT_DIR, name=None):
+        """
+        Args:
+            platform (str): 平台名稱
+            keyword (str): 搜尋關鍵字
+            checkpoint_dir (str): 檢查點資料夾
+            name (str): 檔案名稱（不含副檔名），預設為 平台_關鍵字；同一個關鍵字可能同時有多個
+                抓取時（例如工作佇列中 query 不同的工作）需指定不重複的名稱
+        """
+        self.keyword = keyword
+        self.path = os.path.join(checkpoint_dir, f"{name or platform + '_' + _query_slug(keyword)}.json")
+        self.interrupted = False  # 中途因錯誤停止時設為 True，保留檢查點供下次繼續
+
+    def load(self):
+        """
+        讀取檢查點
+
+        Returns:
+            tuple | None: (下一頁頁數, 商品列表, SKU 集合)，沒有可用的檢查點時回傳 None
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("keyword") != self.keyword:
+            return None
+        return data["next_page"], data["products"], set(data["seen_skus"])
+
+    def save(self, next_page, products, seen_skus):
+        """寫入檢查點（先寫暫存檔再取代，避免中斷時留下損壞的檔案）"""
+        checkpoint_dir = os.path.dirname(self.path)
+        if checkpoint_dir and not os.path.exists(checkpoint_dir):
+            os.makedirs(checkpoint_dir, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "keyword": self.keyword,
+                "next_page": next_page,
+                "products": products,
+                "seen_skus": sorted(seen_skus)
+            }, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        """刪除檢查點"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def finish(self):
+        """抓取結束時呼叫：完整結束就刪除檢查點，中途停止則保留並提示"""
+        if self.interrupted:
+            print(f"已完成的頁面保存在 {self.path}，可使用 --resume 繼續")
+        else:
+            self.clear()
+
+
+def _open_checkpoint(platform, keyword, checkpoint_dir, resume, name=None):
+    """
+    建立檢查點，並在 resume 時讀回先前的進度（name 見 ScrapeCheckpoint）
+
+    Returns:
+        tuple: (ScrapeCheckpoint | None, 起始頁數, 商品列表, SKU 集合)
+    """
+    if not checkpoint_dir:
+        return None, 1, [], set()
+
+    checkpoint = ScrapeCheckpoint(platform, keyword, checkpoint_dir, name)
+    if resume:
+        state = checkpoint.load()
+        if state:
+            start_page, products, seen_skus = state
+            print(f"從檢查點繼續 {platform}：第 {start_page} 頁起，已收集 {len(products)} 個商品")
+            return checkpoint, start_page, products, seen_skus
+    return checkpoint, 1, [], set()
+
+
+def _finish_checkpoint(checkpoint, products, raise_on_interrupt):
+    """
+    抓取結束：完整結束就刪除檢查點，中途停止則保留
+
+    Raises:
+        ScrapeInterrupted: raise_on_interrupt 為 True 且抓取中途停止
+    """
+    if not checkpoint:
+        return
+    checkpoint.finish()
+    if checkpoint.interrupted and raise_on_interrupt:
+        raise ScrapeInterrupted("抓取中途停止", products, checkpoint.path)
+
+
+def _interrupted(platform, checkpoint, products, error, raise_on_interrupt):
+    """
+    抓取發生錯誤：保留檢查點，回傳已抓到的商品
+
+    Raises:
+        ScrapeInterrupted: raise_on_interrupt 為 True
+    """
+    print(f"{platform} 爬蟲發生錯誤，回傳已抓到的 {len(products)} 個商品: {error}")
+    if checkpoint and os.path.exists(checkpoint.path):
+        print(f"已完成的頁面保存在 {checkpoint.path}，可使用 --resume 繼續")
+    if raise_on_interrupt:
+        raise ScrapeInterrupted(str(error), products, checkpoint.path if checkpoint else None) from error
+    return products
+
+
+def _learned_momo_fields():
+    """依選擇器快取調整 momo 標題與價格選擇器的順序"""
+    cache = get_selector_cache()
+    return dict(MOMO_CARD_FIELDS,
+                title=cache.ordered("momo", "title", MOMO_TITLE_SELECTORS),
+                price=cache.ordered("momo", "price", MOMO_PRICE_SELECTORS))
+
+
+def _throttle(url):
+    """依網站的禮貌速率等待，等待秒數記入抓取指標的 throttle_seconds"""
+    record("throttle_seconds", get_rate_limiter().wait(url))
+
+
+def _record_network(driver, platform):
+    """把瀏覽器這一頁的流量、被封鎖的請求數與估計節省的位元組數記入抓取指標"""
+    stats = collect_network_stats(driver)
+    if stats:
+        record("network_requests", stats["requests"])
+        record("transferred_bytes", stats["transferred_bytes"])
+        record("blocked_requests", stats["blocked_requests"])
+        saved = estimate_bytes_saved(platform, stats["blocked_requests"])
+        if saved is not None:
+            record("estimated_bytes_saved", saved)
+
+
+def _http_get(url, description, **kwargs):
+    """
+    以共用 Session 送出 GET：套用速率限制，暫時性錯誤（逾時、連線失敗、5xx、429）依 HTTP_RETRY_POLICY 重試
+
+    Args:
+        url (str): 網址
+        description (str): 重試訊息中顯示的名稱
+        **kwargs: 傳給 session.get 的其他參數（例如 params）
+
+    Returns:
+        requests.Response: 狀態碼為 2xx 的回應
+
+    Raises:
+        requests.RequestException: 無法重試的錯誤或重試用盡
+        CircuitOpenError: 該網站連續失敗，暫停請求中
+    """
+    def get_once():
+        _throttle(url)
+        record("http_requests")
+        with timed("navigation_seconds"):
+            response = _get_http_session().get(url, timeout=15, **kwargs)
+        response.raise_for_status()
+        return response
+
+    return call_with_retry(get_once, url, HTTP_RETRY_POLICY, description)
+
+
+def _load_momo_page(driver, keyword, page):
+    """
+    載入 momo 搜尋結果的某一頁並找出商品元素（含重試）
+
+    Args:
+        driver: Chrome WebDriver
+        keyword (str): 搜尋關鍵字
+        page (int): 頁數
+
+    Returns:
+        list: 商品 WebElement 列表，找不到時為空列表
+
+    Raises:
+        TimeoutException: 重試後仍載入逾時
+        CircuitOpenError: momo 連續失敗，暫停請求中
+    """
+    search_url = build_momo_search_url(keyword, page)
+    wait = WebDriverWait(driver, 15)
+    cache = get_selector_cache()
+    list_selectors = cache.ordered("momo", "list", MOMO_LIST_SELECTORS)
+
+    def load_once():
+        # 依網站的禮貌速率等待（重試也受同一個速率限制）
+        _throttle(search_url)
+        with timed("navigation_seconds"):
+            driver.get(search_url)
+
+        # 等待任一候選選擇器出現（單一條件，不會每個選擇器各等 15 秒）
+        with timed("wait_seconds"):
+            try:
+                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ", ".join(MOMO_LIST_SELECTORS))))
+            except TimeoutException:
+                pass
+
+        # 依優先順序查找商品元素（上次成功的選擇器優先）
+        for selector in list_selectors:
+            product_elements = driver.find_elements(By.CSS_SELECTOR, selector)
+            if product_elements:
+                #print(f"使用選擇器 '{selector}' 找到 {len(product_elements)} 個商品")
+                cache.record("momo", "list", selector)
+                return product_elements
+
+        # 所有列表選擇器都沒有匹配（momo 改版時會持續增加）
+        record("selector_misses")
+        raise RetryableError(f"momo 第 {page} 頁未找到商品元素")
+
+    # 找不到商品時重新載入；載入逾時重試用盡或斷路器開啟時例外往外拋，由呼叫端保留檢查點
+    try:
+        return call_with_retry(load_once, search_url, PAGE_RETRY_POLICY, f"momo 第 {page} 頁")
+    except RetryableError as e:
+        print(f"{e}，視為沒有更多商品")
+        return []
+
+
+def _parse_momo_element(element, fields=MOMO_CARD_FIELDS, hits=None):
+    """
+    解析單一 momo 商品元素
+
+    Args:
+        element: 商品的 WebElement
+        fields (dict): title, price, link, image 各欄位的候選選擇器
+        hits (dict): 若提供，記錄標題與價格勝出的選擇器（欄位名稱 -> Counter）
+
+    Returns:
+        dict | None: 包含 title, price, image_url, url, sku 的字典，缺少必要欄位時回傳 None
+    """
+    # 提取商品標題
+    title = ""
+    title_selector = None
+    for selector in fields["title"]:
+        try:
+            title_elem = element.find_element(By.CSS_SELECTOR, selector)
+            if selector == "img[alt]":
+                title = title_elem.get_attribute("alt").strip()
+            elif selector == "a[title]":
+                title = title_elem.get_attribute("title").strip()
+            else:
+                title = title_elem.text.strip()
+
+            if title and len(title) > 5:  # 確保標題有足夠長度
+                title_selector = selector
+                break
+        except NoSuchElementException:
+            continue
+
+    # 如果沒有找到標題，跳過這個商品
+    if not title:
+        return None
+
+    # 提取價格
+    price = 0
+    for selector in fields["price"]:
+        price_texts = [price_elem.text for price_elem in element.find_elements(By.CSS_SELECTOR, selector)]
+        price = _extract_momo_price(price_texts)
+        if price > 0:
+            break
+
+    # 如果沒有找到價格，跳過這個商品
+    if price <= 0:
+        return None
+
+    if hits is not None:
+        if title_selector:
+            hits["title"][title_selector] += 1
+        hits["price"][selector] += 1
+
+    # 提取商品連結
+    url = ""
+    for selector in fields["link"]:
+        try:
+            link_elem = element.find_element(By.CSS_SELECTOR, selector)
+            url = _normalize_momo_url(link_elem.get_attribute("href"))
+            break
+        except NoSuchElementException:
+            continue
+
+    # 提取商品圖片
+    image_url = ""
+    for selector in fields["image"]:
+        try:
+            img_elem = element.find_element(By.CSS_SELECTOR, selector)
+            # 優先使用 src，然後是 data-original，最後是 data-src
+            image_url = _normalize_momo_image_url(img_elem.get_attribute("src") or
+                                                  img_elem.get_attribute("data-original") or
+                                                  img_elem.get_attribute("data-src"))
+            break
+        except NoSuchElementException:
+            continue
+
+    return _build_momo_record(title, price, url, image_url)
+
+
+def _get_http_session():
+    """
+    取得共用的 requests Session（含連線池），避免每頁重新建立 TCP/TLS 連線
+
+    Returns:
+        requests.Session: 共用的 HTTP Session
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "User-Agent": USER_AGENT,
+                "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.8"
+            })
+            _http_session = session
+        return _http_session
+
+
+def _extract_cards_in_browser(driver, list_selectors, fields):
+    """
+    以單次 execute_script 擷取整頁商品卡片的原始資料，取代逐一 find_element 的大量 WebDriver 往返
+
+    Args:
+        driver: Chrome WebDriver
+        list_selectors (list): 商品列表的候選選擇器（依優先順序）
+        fields (dict): title, price, link, image 各欄位的候選選擇器
+
+    Returns:
+        list: 每張卡片的 {titles, prices, href, image} 字典
+    """
+    return driver.execute_script(EXTRACT_CARDS_SCRIPT, list_selectors, fields) or []
+
+
+def _parse_momo_cards(cards, fields):
+    """
+    解析一整頁的 momo 卡片原始資料，並把勝出的選擇器記入選擇器快取
+
+    Args:
+        cards (list): {titles, prices, href, image} 字典列表
+        fields (dict): 擷取卡片時使用的選擇器
+
+    Returns:
+        list: 解析成功的商品列表
+    """
+    hits = {"title": Counter(), "price": Counter()}
+    page_products = [parsed for parsed in (_parse_momo_card_data(card, fields, hits) for card in cards) if parsed]
+    get_selector_cache().learn("momo", hits)
+    return page_products
+
+
+def get_parse_executor():
+    """
+    取得行程內共用的解析行程池，程式結束時自動關閉
+
+    Returns:
+        ProcessPoolExecutor: 共用的解析行程池
+    """
+    global _parse_executor
+    with _parse_executor_lock:
+        if _parse_executor is None:
+            _parse_executor = ProcessPoolExecutor(max_workers=PARSE_PROCESSES)
+            atexit.register(_parse_executor.shutdown)
+        return _parse_executor
+
+
+def _run_parser(parser, *args):
+    """在解析行程池中執行 product_parsers 的解析函式（PARSE_PROCESSES 為 0 時直接執行）"""
+    if PARSE_PROCESSES <= 0:
+        return parser(*args)
+    return get_parse_executor().submit(parser, *args).result()
+
+
+def parse_momo_search_html(page_html):
+    """
+    解析 momo 搜尋結果頁的 HTML（不需要瀏覽器），解析工作交給解析行程池
+
+    使用與 Selenium 引擎相同的選擇器優先順序，回傳與 _scrape_momo_page 相同的格式，
+    子行程回傳的勝出選擇器在這裡記入選擇器快取。
+
+    Args:
+        page_html (str | bytes): 搜尋結果頁的 HTML
+
+    Returns:
+        tuple: (該頁商品元素數量, 解析成功的商品列表)，找不到商品列表時為 (0, [])
+    """
+    list_selectors = get_selector_cache().ordered("momo", "list", MOMO_LIST_SELECTORS)
+    element_count, page_products, hits = _run_parser(parse_momo_page, page_html, list_selectors,
+                                                     _learned_momo_fields())
+    get_selector_cache().learn("momo", hits)
+    return element_count, page_products
+
+
+def parse_momo_pages(pages_html):
+    """
+    以解析行程池平行解析多頁 momo HTML，適合大量回補已存下的頁面
+
+    Args:
+        pages_html (iterable): 每頁的 HTML
+
+    Returns:
+        list: 依輸入順序排列的 (該頁商品元素數量, 解析成功的商品列表)
+    """
+    cache = get_selector_cache()
+    list_selectors = cache.ordered("momo", "list", MOMO_LIST_SELECTORS)
+    fields = _learned_momo_fields()
+    if PARSE_PROCESSES <= 0:
+        parsed = map(parse_momo_page, pages_html, repeat(list_selectors), repeat(fields))
+    else:
+        parsed = get_parse_executor().map(parse_momo_page, pages_html, repeat(list_selectors), repeat(fields))
+
+    results = []
+    for element_count, page_products, hits in parsed:
+        cache.learn("momo", hits)
+        results.append((element_count, page_products))
+    cache.save()
+    return results
+
+
+def _fetch_momo_http(keyword, max_products, products, seen_skus, start_page=1, checkpoint=None, stream=None,
+                     history=None):
+    """
+    以 HTTP（requests + lxml）抓取 momo 搜尋結果，不啟動瀏覽器
+
+    Args:
+        keyword (str): 搜尋關鍵字
+        max_products (int): 最大抓取商品數量
+        products (list): 已收集的商品列表（會就地新增）
+        seen_skus (set): 已收集的 SKU（會就地新增）
+        start_page (int): 起始頁數
+        checkpoint (ScrapeCheckpoint): 每頁完成後寫入進度的檢查點
+        stream (NDJSONWriter): 串流輸出
+        history (ProductHistory): 增量模式的商品歷史
+
+    Returns:
+        bool: False 表示第一頁的 HTML 沒有商品列表（例如由 JavaScript 渲染），需改用 Selenium
+    """
+    page = start_page
+    while len(products) < max_products:
+        with page_scope(page):
+            print(f"正在以 HTTP 抓取第 {page} 頁...")
+            try:
+                response = _http_get(build_momo_search_url(keyword, page), f"momo 第 {page} 頁")
+            except (requests.RequestException, CircuitOpenError) as e:
+                if page == start_page:
+                    print(f"HTTP 抓取失敗，改用 Selenium: {e}")
+                    return False
+                print(f"第 {page} 頁 HTTP 抓取失敗，停止抓取: {e}")
+                if checkpoint:
+                    checkpoint.interrupted = True
+                return True
+
+            with timed("parse_seconds"):
+                element_count, page_products = parse_momo_search_html(response.content)
+            record("parse_failures", element_count - len(page_products))
+            if element_count == 0:
+                record("selector_misses")
+            if page == start_page and element_count == 0:
+                print("HTML 中沒有商品列表（可能由 JavaScript 渲染），改用 Selenium")
+                return False
+
+            page_products_count, unchanged_count = _merge_page_products(page_products, products, seen_skus,
+                                                                        max_products, "momo", stream, history)
+            if checkpoint:
+                checkpoint.save(page + 1, products, seen_skus)
+            if _should_stop_momo(page, element_count, page_products_count, products, max_products, unchanged_count):
+                break
+
+        page += 1
+
+    return True
+
+
+def _scrape_momo_page(driver, keyword, page, extraction="bulk"):
+    """
+    抓取並解析 momo 搜尋結果的某一頁
+
+    Args:
+        driver: Chrome WebDriver
+        keyword (str): 搜尋關鍵字
+        page (int): 頁數
+        extraction (str): "bulk" 以單次 execute_script 擷取整頁；"element" 逐一查詢每個商品元素；
+            "html" 取 page_source 交給解析行程池
+
+    Returns:
+        tuple: (該頁商品元素數量, 解析成功的商品列表)，商品尚未編號也尚未去除重複 SKU
+    """
+    product_elements = _load_momo_page(driver, keyword, page)
+    _record_network(driver, "momo")
+    if not product_elements:
+        return 0, []
+
+    print(f"開始解析第 {page} 頁的 {len(product_elements)} 個商品")
+    with timed("parse_seconds"):
+        element_count, page_products = _extract_momo_products(driver, page, product_elements, extraction)
+    record("parse_failures", element_count - len(page_products))
+    return element_count, page_products
+
+
+def _extract_momo_products(driver, page, product_elements, extraction):
+    """
+    依擷取模式把已載入的 momo 頁面解析成商品列表
+
+    Returns:
+        tuple: (該頁商品元素數量, 解析成功的商品列表)
+    """
+    if extraction == "html":
+        try:
+            return parse_momo_search_html(driver.page_source)
+        except WebDriverException as e:
+            print(f"取得第 {page} 頁原始碼失敗，改為逐一解析商品: {e}")
+    fields = _learned_momo_fields()
+    if extraction == "bulk":
+        try:
+            list_selectors = get_selector_cache().ordered("momo", "list", MOMO_LIST_SELECTORS)
+            cards = _extract_cards_in_browser(driver, list_selectors, fields)
+            return len(cards), _parse_momo_cards(cards, fields)
+        except WebDriverException as e:
+            print(f"批次擷取第 {page} 頁失敗，改為逐一解析商品: {e}")
+
+    page_products = []
+    hits = {"title": Counter(), "price": Counter()}
+    for i, element in enumerate(product_elements):
+        try:
+            parsed = _parse_momo_element(element, fields, hits)
+            if parsed:
+                page_products.append(parsed)
+        except Exception as e:
+            print(f"解析第 {i+1} 個商品時發生錯誤: {e}")
+            continue
+    get_selector_cache().learn("momo", hits)
+
+    return len(product_elements), page_products
+
+
+def _merge_page_products(page_products, products, seen_skus, max_products, platform, stream=None, history=None):
+    """
+    將一頁的解析結果依序併入商品列表，並以 seen_skus 全域去除重複 SKU
+
+    Args:
+        page_products (list): _scrape_momo_page 回傳的商品列表
+        products (list): 已收集的商品列表（會就地新增）
+        seen_skus (set): 已收集的 SKU（會就地新增）
+        max_products (int): 最大抓取商品數量
+        platform (str): 平台名稱
+        stream (NDJSONWriter): 串流輸出，這一頁新增的商品會立即寫出
+        history (ProductHistory): 增量模式使用，只併入新的或 price / title / image_url 有變動的商品
+
+    Returns:
+        tuple: (這一頁實際新增的商品數量, 增量模式下沒有變動而略過的商品數量)；
+            新增 0 個且有未變動的商品時，表示增量模式應停止翻頁
+    """
+    unchanged = []
+    if history:
+        page_products, unchanged = history.diff(platform, page_products)
+        seen_skus.update(product["sku"] for product in unchanged)
+        record("products_unchanged", len(unchanged))
+
+    added = 0
+    duplicates = 0
+    for parsed in page_products:
+        # 如果已經獲得足夠的商品，就停止
+        if len(products) >= max_products:
+            break
+
+        sku = parsed["sku"]
+        # 檢查 SKU 是否重複
+        if sku and sku in seen_skus:
+            #print(f"跳過重複 SKU: {sku}")
+            duplicates += 1
+            continue
+
+        product = {
+            "id": len(products) + 1,  # 順序編號
+            "title": parsed["title"],
+            "price": parsed["price"],
+            "image_url": parsed["image_url"],
+            "url": parsed["url"],
+            "platform": platform,
+            "sku": sku
+        }
+        products.append(product)
+        if sku:
+            seen_skus.add(sku)
+        added += 1
+        #print(f"成功解析商品 {len(products)}: {product['title'][:50]}... (NT$ {product['price']:,})")
+
+    record("products_kept", added)
+    record("products_duplicate", duplicates)
+    if stream and added:
+        stream.write_page(products[-added:])
+    if history:
+        history.record(platform, (products[-added:] if added else []) + unchanged)
+        if unchanged and not added:
+            record("incremental_stops")
+            print(f"這一頁的 {len(unchanged)} 個商品都已抓過且沒有變動，停止翻頁")
+    return added, len(unchanged)
+
+
+def _should_stop_momo(page, element_count, page_products_count, products, max_products, unchanged_count=0):
+    """
+    判斷 momo 多頁抓取是否應該在這一頁之後停止
+
+    Args:
+        page_products_count (int): 這一頁新增的商品數量
+        unchanged_count (int): 增量模式下這一頁沒有變動而略過的商品數量
+    """
+    if element_count == 0:
+        print("無法找到商品元素，可能頁面結構已改變或已到達最後一頁")
+        return True
+
+    #print(f"第 {page} 頁抓取到 {page_products_count} 個有效商品，目前總計 {len(products)} 個商品")
+
+    # 如果這一頁的商品數量少於預期，可能是最後一頁了
+    if element_count < MOMO_SHORT_PAGE_THRESHOLD:  # momo 一般每頁有 30 個商品，如果少於 20 個可能是最後一頁
+        print("可能已到達最後一頁，停止抓取")
+        return True
+
+    # 增量模式下整頁都已抓過且沒有變動（_merge_page_products 已記錄並印出停止原因）
+    if unchanged_count and page_products_count == 0:
+        return True
+
+    # 如果這一頁沒有找到任何有效商品，也停止抓取
+    if page_products_count == 0:
+        print("這一頁沒有找到有效商品，停止抓取")
+        return True
+
+    return len(products) >= max_products
+
+
+def _fetch_momo_pages_parallel(keyword, max_products, workers, products, seen_skus, extraction,
+                               start_page=1, checkpoint=None, stream=None, history=None):
+    """
+    以多個 WebDriver 同時抓取 momo 的多個頁面，並依頁數順序合併結果
+
+    每個 worker 執行緒各自從瀏覽器池借用一個 Chrome，頁數依序分派給閒置的 worker；
+    合併時固定依頁數順序進行，所以商品編號與單執行緒模式一致。一旦達到
+    max_products 或遇到最後一頁，就不再派發新的頁面。
+
+    Args:
+        keyword (str): 搜尋關鍵字
+        max_products (int): 最大抓取商品數量
+        workers (int): 同時使用的瀏覽器數量
+        products (list): 已收集的商品列表（會就地新增）
+        seen_skus (set): 已收集的 SKU（會就地新增）
+        extraction (str): 商品卡片擷取模式，見 _scrape_momo_page
+        start_page (int): 起始頁數
+        checkpoint (ScrapeCheckpoint): 每頁合併後寫入進度的檢查點
+        stream (NDJSONWriter): 串流輸出
+        history (ProductHistory): 增量模式的商品歷史
+    """
+    pool = get_browser_pool()
+    run = current_run()
+
+    def scrape_page(page):
+        # worker 執行緒記錄的指標歸到呼叫端的這次抓取
+        with page_scope(page, run, "fetch_seconds"), pool.borrow("momo") as driver:
+            print(f"正在抓取第 {page} 頁...")
+            pool.record_page(driver)
+            return _scrape_momo_page(driver, keyword, page, extraction)
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = {}  # page -> Future
+    next_page = start_page
+    merge_page = start_page
+    try:
+        while len(products) < max_products:
+            # 只派發湊滿 max_products 所需的頁數，避免多抓用不到的頁面
+            pages_needed = -(-(max_products - len(products)) // MOMO_PAGE_SIZE)
+            while len(pending) < min(workers, pages_needed):
+                pending[next_page] = executor.submit(scrape_page, next_page)
+                next_page += 1
+
+            # 依頁數順序等待並合併結果
+            element_count, page_products = pending.pop(merge_page).result()
+            with page_scope(merge_page, timer="merge_seconds"):
+                page_products_count, unchanged_count = _merge_page_products(page_products, products, seen_skus,
+                                                                            max_products, "momo", stream, history)
+            if checkpoint:
+                checkpoint.save(merge_page + 1, products, seen_skus)
+            if _should_stop_momo(merge_page, element_count, page_products_count, products, max_products,
+                                 unchanged_count):
+                break
+            merge_page += 1
+    finally:
+        # 取消尚未開始的頁面，已在執行中的頁面結果直接捨棄
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def fetch_products_for_momo(keyword, max_products=50, workers=1, engine="selenium", extraction="bulk",
+                            resume=False, checkpoint_dir=CHECKPOINT_DIR, stream=None, incremental=False,
+                            checkpoint_name=None, raise_on_interrupt=False):
     """
     使用 Selenium 從 momo 購物網抓取商品資訊
-    
+
     Args:
         keyword (str): 搜尋關鍵字
         max_products (int): 最大抓取商品數量
-    
+        workers (int): 同時抓取頁面的瀏覽器數量，大於 1 時啟用平行多頁抓取
+        engine (str): "selenium" 使用瀏覽器；"http" 直接以 requests + lxml 抓取頁面，
+            HTML 中沒有商品列表時才改用 Selenium
+        extraction (str): Selenium 引擎的商品擷取模式，"bulk" 每頁只用一次 execute_script，
+            "element" 逐一以 find_element 查詢每個商品，"html" 取 page_source 交給解析行程池
+        resume (bool): 是否從上次中斷的檢查點繼續抓取
+        checkpoint_dir (str): 檢查點資料夾，設為 None 則不寫入檢查點
+        stream (NDJSONWriter): 串流輸出，每頁新增的商品會立即以 NDJSON 寫出
+        incremental (bool): 增量模式，只回傳新的或 price / title / image_url 有變動的商品
+            （以 sku 比對 product_history 的記錄），整頁都沒有變動時提早停止翻頁
+        checkpoint_name (str): 檢查點檔案名稱，預設為 平台_關鍵字（見 ScrapeCheckpoint）
+        raise_on_interrupt (bool): 中途停止時拋出 ScrapeInterrupted，而不是回傳已抓到的部分商品
+            （工作佇列以此判斷工作是否完成）
+
     Returns:
         list: 商品資訊列表，每個商品包含 id, title, price, image_url, url, platform, sku
     """
-    
-    products = []
-    product_id = 1  # 順序編號
-    driver = None
-    page = 1  # 當前頁數
-    seen_skus = set()  # 追蹤已經收集的 SKU，避免重複
-    
+
+    # 每頁完成後保存進度；resume 時讀回當前頁數、已收集的商品與 SKU（用於避免重複）
+    checkpoint, page, products, seen_skus = _open_checkpoint("momo", keyword, checkpoint_dir, resume,
+                                                             checkpoint_name)
+    start_page = page
+    history = get_product_history() if incremental else None
+    run = start_run("momo", keyword)
+
     try:
-        # 設定 Chrome 選項
-        chrome_options = Options()
-        # chrome_options.add_argument('--headless')  # 無頭模式
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--disable-software-rasterizer')
-        chrome_options.add_argument('--disable-extensions')
-        chrome_options.add_argument('--disable-plugins')
-        chrome_options.add_argument('--disable-background-timer-throttling')
-        chrome_options.add_argument('--disable-backgrounding-occluded-windows')
-        chrome_options.add_argument('--disable-renderer-backgrounding')
-        chrome_options.add_argument('--disable-web-security')
-        chrome_options.add_argument('--disable-features=VizDisplayCompositor')
-        chrome_options.add_argument('--disable-ipc-flooding-protection')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-        
-        # 禁用圖片載入以提高速度
-        prefs = {
-            "profile.managed_default_content_settings.images": 2,
-            "profile.default_content_setting_values.notifications": 2
-        }
-        chrome_options.add_experimental_option("prefs", prefs)
-        
-        # 初始化 WebDriver
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.set_page_load_timeout(30)
         print(f"正在搜尋 momo: {keyword}")
-        
-        # 等待頁面載入
-        wait = WebDriverWait(driver, 15)
-        
-        # 多頁抓取循環
-        while len(products) < max_products:
-            # 建構搜尋 URL（包含頁數）
-            encoded_keyword = quote(keyword)
-            search_url = f"https://www.momoshop.com.tw/search/searchShop.jsp?keyword={encoded_keyword}&searchType=1&cateLevel=0&ent=k&sortType=1&curPage={page}"
-            
-            print(f"正在抓取第 {page} 頁...")
-            
-            # 頁面載入重試
-            attempt = 1
-            max_attempts = 3
-            product_elements = []
-            while attempt <= max_attempts:
-                try:
-                    driver.get(search_url)
-                    time.sleep(3)  # 等待頁面載入
-                    
-                    # 嘗試查找商品元素
-                    selectors_to_try = [
-                        "li.listAreaLi",
-                        ".listAreaUl li.listAreaLi",
-                        "li.goodsItemLi",
-                        ".prdListArea .goodsItemLi",
-                        ".searchPrdListArea li",
-                        "li[data-gtm]",
-                        ".goodsItemLi",
-                        ".searchPrdList li"
-                    ]
-                    
-                    for selector in selectors_to_try:
-                        try:
-                            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
-                            product_elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                            if product_elements:
-                                #print(f"使用選擇器 '{selector}' 找到 {len(product_elements)} 個商品")
-                                break
-                        except TimeoutException:
-                            continue
-                    
-                    # 如果找到有效商品元素或商品數量少於 20 個但大於 0，則退出重試
-                    if product_elements:
-                        break
-                    # 如果未找到商品元素或商品數量少於 20 個，則重試
-                    print(f"第 {page} 頁未找到足夠商品元素（找到 {len(product_elements)} 個），重試 {attempt}/{max_attempts}")
-                    attempt += 1
-                    time.sleep(random.uniform(3, 6))  # 重試間隔
-                except TimeoutException:
-                    print(f"第 {page} 頁載入超時，重試 {attempt}/{max_attempts}")
-                    attempt += 1
-                    time.sleep(random.uniform(3, 6))
-            
-            if not product_elements:
-                print("無法找到商品元素，可能頁面結構已改變或已到達最後一頁")
-                break
-            
-            print(f"開始解析 {len(product_elements)} 個商品")
-            page_products_count = 0
-            
-            # 解析每個商品
-            for i, element in enumerate(product_elements):
-                try:
-                    # 如果已經獲得足夠的商品，就停止
-                    if len(products) >= max_products:
+
+        if engine == "http" and _fetch_momo_http(keyword, max_products, products, seen_skus, start_page, checkpoint,
+                                                stream, history):
+            print(f"成功從 momo 獲取 {len(products)} 個唯一商品（已自動過濾重複 SKU）")
+            _finish_checkpoint(checkpoint, products, raise_on_interrupt)
+            return products
+
+        if workers > 1:
+            _fetch_momo_pages_parallel(keyword, max_products, workers, products, seen_skus, extraction,
+                                       start_page, checkpoint, stream, history)
+            print(f"成功從 momo 獲取 {len(products)} 個唯一商品（已自動過濾重複 SKU）")
+            _finish_checkpoint(checkpoint, products, raise_on_interrupt)
+            return products
+
+        # 從瀏覽器池借用 WebDriver，結束後自動歸還
+        pool = get_browser_pool()
+        with pool.borrow("momo") as driver:
+            # 多頁抓取循環
+            while len(products) < max_products:
+                with page_scope(page):
+                    print(f"正在抓取第 {page} 頁...")
+
+                    pool.record_page(driver)
+                    element_count, page_products = _scrape_momo_page(driver, keyword, page, extraction)
+                    page_products_count, unchanged_count = _merge_page_products(page_products, products, seen_skus,
+                                                                                max_products, "momo", stream, history)
+                    if checkpoint:
+                        checkpoint.save(page + 1, products, seen_skus)
+                    if _should_stop_momo(page, element_count, page_products_count, products, max_products,
+                                         unchanged_count):
                         break
-                    
-                    # 提取商品標題
-                    title = ""
-                    title_selectors = [
-                        "h3.prdName",
-                        ".prdNameTitle h3.prdName",
-                        ".prdName",
-                        "h3",
-                        "a[title]",
-                        "img[alt]",
-                        ".goodsName",
-                        ".goodsInfo h3",
-                        "a"
-                    ]
-                    
-                    for selector in title_selectors:
-                        try:
-                            title_elem = element.find_element(By.CSS_SELECTOR, selector)
-                            if selector == "img[alt]":
-                                title = title_elem.get_attribute("alt").strip()
-                            elif selector == "a[title]":
-                                title = title_elem.get_attribute("title").strip()
-                            else:
-                                title = title_elem.text.strip()
-                            
-                            if title and len(title) > 5:  # 確保標題有足夠長度
-                                break
-                        except NoSuchElementException:
-                            continue
-                    
-                    # 如果沒有找到標題，跳過這個商品
-                    if not title:
-                        continue
-                    
-                    # 提取價格
-                    price = 0
-                    price_selectors = [
-                        ".money .price b",
-                        ".price b",
-                        ".money b",
-                        ".price",
-                        ".money",
-                        ".cost",
-                        "b",
-                        "strong",
-                        ".goodsPrice",
-                        ".priceInfo"
-                    ]
-                    
-                    for selector in price_selectors:
-                        try:
-                            price_elements = element.find_elements(By.CSS_SELECTOR, selector)
-                            for price_elem in price_elements:
-                                price_text = price_elem.text
-                                if price_text and ('$' in price_text or 'NT' in price_text or any(c.isdigit() for c in price_text)):
-                                    # 提取數字
-                                    numbers = re.findall(r'\d+', price_text.replace(',', ''))
-                                    if numbers:
-                                        # 取最大的數字作為價格（避免取到折扣百分比等小數字）
-                                        potential_prices = [int(num) for num in numbers if int(num) > 10]
-                                        if potential_prices:
-                                            price = max(potential_prices)
-                                            break
-                            if price > 0:
-                                break
-                        except NoSuchElementException:
-                            continue
-                    
-                    # 如果沒有找到價格，跳過這個商品
-                    if price <= 0:
-                        continue
-                    
-                    # 提取商品連結
-                    url = ""
-                    try:
-                        link_elem = element.find_element(By.CSS_SELECTOR, "a.goods-img-url")
-                        url = link_elem.get_attribute("href")
-                        if not url.startswith("http"):
-                            url = "https://www.momoshop.com.tw" + url
-                    except NoSuchElementException:
-                        # 嘗試找其他可能的連結選擇器
-                        try:
-                            link_elem = element.find_element(By.CSS_SELECTOR, "a[href*='/goods/']")
-                            url = link_elem.get_attribute("href")
-                            if not url.startswith("http"):
-                                url = "https://www.momoshop.com.tw" + url
-                        except NoSuchElementException:
-                            # 嘗試找任何連結
-                            try:
-                                link_elem = element.find_element(By.CSS_SELECTOR, "a[href]")
-                                url = link_elem.get_attribute("href")
-                                if url and not url.startswith("http"):
-                                    url = "https://www.momoshop.com.tw" + url
-                            except NoSuchElementException:
-                                url = ""
-                    
-                    # 提取 i_code 作為 sku，如果找不到則使用網址最後一段
-                    sku = ""
-                    if url:
-                        # 首先嘗試提取 i_code
-                        match = re.search(r'i_code=(\d+)', url)
-                        if match:
-                            sku = match.group(1)
-                        else:
-                            # 如果找不到 i_code，則使用網址的最後一段
-                            # 例如：https://www.momoshop.com.tw/goods/GoodsDetail.jsp?i_code=123456
-                            # 或：https://www.momoshop.com.tw/product/ABC123
-                            url_parts = url.rstrip('/').split('/')
-                            if url_parts:
-                                last_part = url_parts[-1]
-                                # 如果最後一段包含參數，只取檔名部分
-                                if '?' in last_part:
-                                    last_part = last_part.split('?')[0]
-                                # 如果最後一段有副檔名，去掉副檔名
-                                if '.' in last_part:
-                                    last_part = last_part.split('.')[0]
-                                sku = last_part
-                    
-                    # 提取商品圖片
-                    image_url = ""
-                    try:
-                        # 優先尋找第一個商品圖片
-                        img_elem = element.find_element(By.CSS_SELECTOR, "img.prdImg")
-                        # 優先使用 src，然後是 data-original，最後是 data-src
-                        image_url = (img_elem.get_attribute("src") or 
-                                   img_elem.get_attribute("data-original") or 
-                                   img_elem.get_attribute("data-src"))
-                        
-                        if image_url:
-                            # 處理相對路徑和協議相對路徑
-                            if image_url.startswith("//"):
-                                image_url = "https:" + image_url
-                            elif image_url.startswith("/"):
-                                image_url = "https://www.momoshop.com.tw" + image_url
-                            elif not image_url.startswith("http"):
-                                # 如果是相對路徑但不以 / 開頭，假設是 momoshop 的圖片
-                                if "momoshop" not in image_url:
-                                    image_url = "https://cdn3.momoshop.com.tw/momoshop/upload/media/" + image_url
-                                else:
-                                    image_url = "https://" + image_url
-                    except NoSuchElementException:
-                        # 如果找不到 prdImg，嘗試其他圖片選擇器
-                        try:
-                            img_elem = element.find_element(By.CSS_SELECTOR, "img")
-                            image_url = (img_elem.get_attribute("src") or 
-                                       img_elem.get_attribute("data-original") or 
-                                       img_elem.get_attribute("data-src"))
-                            
-                            if image_url:
-                                # 處理相對路徑和協議相對路徑
-                                if image_url.startswith("//"):
-                                    image_url = "https:" + image_url
-                                elif image_url.startswith("/"):
-                                    image_url = "https://www.momoshop.com.tw" + image_url
-                                elif not image_url.startswith("http"):
-                                    if "momoshop" not in image_url:
-                                        image_url = "https://cdn3.momoshop.com.tw/momoshop/upload/media/" + image_url
-                                    else:
-                                        image_url = "https://" + image_url
-                        except NoSuchElementException:
-                            image_url = ""
-                    
-                    # 確保所有必要欄位都有值才加入商品
-                    if title and price > 0 and url:
-                        # 檢查 SKU 是否重複
-                        if sku and sku in seen_skus:
-                            #print(f"跳過重複 SKU: {sku}")
-                            continue
-                        
-                        product = {
-                            "id": product_id,
-                            "title": title,
-                            "price": price,
-                            "image_url": image_url if image_url else "",
-                            "url": url,
-                            "platform": "momo",
-                            "sku": sku
-                        }
-                        products.append(product)
-                        if sku:
-                            seen_skus.add(sku)
-                        product_id += 1
-                        page_products_count += 1
-                        #print(f"成功解析商品 {len(products)}: {title[:50]}... (NT$ {price:,})")
-                    
-                    # 避免過於頻繁的操作
-                    time.sleep(random.uniform(0.05, 0.1))
-                    
-                except Exception as e:
-                    print(f"解析第 {i+1} 個商品時發生錯誤: {e}")
-                    continue
-            
-            #print(f"第 {page} 頁抓取到 {page_products_count} 個有效商品，目前總計 {len(products)} 個商品")
-            
-            # 如果這一頁的商品數量少於預期，可能是最後一頁了
-            if len(product_elements) < 20:  # momo 一般每頁有 30 個商品，如果少於 20 個可能是最後一頁
-                print("可能已到達最後一頁，停止抓取")
-                break
-            
-            # 如果這一頁沒有找到任何有效商品，也停止抓取
-            if page_products_count == 0:
-                print("這一頁沒有找到有效商品，停止抓取")
-                break
-                
-            # 如果還需要更多商品，則跳到下一頁
-            if len(products) < max_products:
+
+                # 還需要更多商品，則跳到下一頁（頁面間隔由速率限制器控制）
                 page += 1
-                time.sleep(random.uniform(2, 3))  # 頁面間隔
-            else:
-                break
-        
+
         print(f"成功從 momo 獲取 {len(products)} 個唯一商品（已自動過濾重複 SKU）")
-        
+        _finish_checkpoint(checkpoint, products, raise_on_interrupt)
+
         return products
-        
+
+    except ScrapeInterrupted:
+        raise
     except Exception as e:
-        print(f"momo Selenium 爬蟲發生錯誤: {e}")
-        return []
-    
+        # 回傳已抓到的商品；檢查點保留，之後可從中斷的頁面繼續
+        return _interrupted("momo", checkpoint, products, e, raise_on_interrupt)
+
     finally:
-        # 確保關閉瀏覽器
-        if driver:
-            try:
-                driver.quit()
-            except:
-                pass
+        # 保存這次學到的選擇器
+        get_selector_cache().save()
+        finish_run(run)
+
+
+def _fetch_pchome_api_page(keyword, page):
+    """
+    取得 PChome 搜尋 API 的某一頁 JSON
+
+    Args:
+        keyword (str): 搜尋關鍵字
+        page (int): 頁數
+
+    Returns:
+        dict: API 回傳的 JSON（包含 totalRows, totalPage, prods）
+    """
+    params = {"q": keyword, "page": page, "sort": "rnk/dc"}
+    return _http_get(PCHOME_SEARCH_API_URL, f"PChome API 第 {page} 頁", params=params).json()
+
+
+def _parse_pchome_api_page(data):
+    """解析 PChome 搜尋 API 的一頁，解析時間記入 parse_seconds"""
+    with timed("parse_seconds"):
+        page_products = _parse_pchome_api_prods(data)
+    record("parse_failures", len(data.get("prods") or []) - len(page_products))
+    return page_products
+
+
+def _fetch_pchome_api(keyword, max_products, workers, products, seen_skus, start_page=1, checkpoint=None,
+                      stream=None, history=None):
+    """
+    以 PChome 搜尋 JSON API 抓取商品，頁數由第一頁的 totalRows 決定後平行抓取其餘頁面
+
+    Args:
+        keyword (str): 搜尋關鍵字
+        max_products (int): 最大抓取商品數量
+        workers (int): 同時抓取的頁面數量
+        products (list): 已收集的商品列表（會就地新增）
+        seen_skus (set): 已收集的 SKU（會就地新增）
+        start_page (int): 起始頁數
+        checkpoint (ScrapeCheckpoint): 每頁合併後寫入進度的檢查點
+        stream (NDJSONWriter): 串流輸出
+        history (ProductHistory): 增量模式的商品歷史
+
+    Returns:
+        bool: False 表示 API 第一頁無法取得或格式不符，需改用 DOM 翻頁爬蟲
+    """
+    run = current_run()
+    try:
+        with page_scope(start_page, run, "fetch_seconds"):
+            first_page = _fetch_pchome_api_page(keyword, start_page)
+        total_rows = int(first_page.get("totalRows") or 0)
+    except (requests.RequestException, ValueError, AttributeError, CircuitOpenError) as e:
+        print(f"PChome 搜尋 API 失敗，改用網頁爬蟲: {e}")
+        return False
+
+    if total_rows > 0 and "prods" not in first_page:
+        print("PChome 搜尋 API 回傳格式不符，改用網頁爬蟲")
+        return False
+
+    page_size = len(first_page.get("prods") or []) or PCHOME_API_PAGE_SIZE
+    total_pages = int(first_page.get("totalPage") or -(-total_rows // page_size))
+    remaining = max(max_products - len(products), 0)
+    pages_needed = min(total_pages, start_page - 1 + -(-remaining // page_size))
+    print(f"PChome 搜尋 API 共 {total_rows} 筆商品，預計抓取至第 {pages_needed} 頁")
+
+    with page_scope(start_page, run, "merge_seconds"):
+        added, unchanged_count = _merge_page_products(_parse_pchome_api_page(first_page), products, seen_skus,
+                                                      max_products, "pchome", stream, history)
+    if checkpoint:
+        checkpoint.save(start_page + 1, products, seen_skus)
+
+    # 增量模式下整頁都沒有新的或變動的商品，就不再往後抓
+    if unchanged_count and not added:
+        return True
+
+    def fetch_page(page):
+        with page_scope(page, run, "fetch_seconds"):
+            return _fetch_pchome_api_page(keyword, page)
+
+    if pages_needed > start_page and len(products) < max_products:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(fetch_page, page) for page in range(start_page + 1, pages_needed + 1)]
+            # 依頁數順序合併，商品編號與逐頁抓取一致
+            for page, future in enumerate(futures, start=start_page + 1):
+                try:
+                    data = future.result()
+                except (requests.RequestException, ValueError, CircuitOpenError) as e:
+                    print(f"PChome 第 {page} 頁抓取失敗，停止合併後續頁面: {e}")
+                    if checkpoint:
+                        checkpoint.interrupted = True
+                    break
+                with page_scope(page, run, "merge_seconds"):
+                    added, unchanged_count = _merge_page_products(_parse_pchome_api_page(data), products,
+                                                                  seen_skus, max_products, "pchome", stream, history)
+                if checkpoint:
+                    checkpoint.save(page + 1, products, seen_skus)
+                if len(products) >= max_products or (unchanged_count and not added):
+                    break
+            for future in futures:
+                future.cancel()
+
+    return True
+
+
+def _wait_for_stable_count(driver, selector, timeout=5, interval=0.5):
+    """
+    等待符合選擇器的元素數量不再變化（懶載入完成），逾時則直接繼續
+
+    Args:
+        driver: Chrome WebDriver
+        selector (str): 商品元素的 CSS 選擇器
+        timeout (float): 最長等待秒數
+        interval (float): 檢查間隔秒數
+    """
+    last_count = [-1]
+
+    def count_is_stable(d):
+        count = len(d.find_elements(By.CSS_SELECTOR, selector))
+        stable = count > 0 and count == last_count[0]
+        last_count[0] = count
+        return stable
+
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=interval).until(count_is_stable)
+    except TimeoutException:
+        pass
+
+
+def _first_card_href(driver):
+    """取得 PChome 目前頁面第一個商品的連結，找不到時回傳 None"""
+    try:
+        return driver.find_element(By.CSS_SELECTOR, PCHOME_CARD_FIELDS["link"][0]).get_attribute("href")
+    except (NoSuchElementException, WebDriverException):
+        return None
+
+
+def _wait_for_page_change(driver, old_href, timeout=15):
+    """
+    點擊下一頁後，等待第一個商品的連結改變（代表新頁面已渲染），逾時則直接繼續
+
+    Args:
+        driver: Chrome WebDriver
+        old_href (str): 點擊前第一個商品的連結
+        timeout (float): 最長等待秒數
+    """
+    if old_href is None:
+        return
+    try:
+        WebDriverWait(driver, timeout).until(lambda d: _first_card_href(d) not in (None, old_href))
+    except TimeoutException:
+        pass
+
+
+def _parse_pchome_element(element):
+    """
+    解析單一 PChome 商品元素
+
+    Args:
+        element: 商品的 WebElement
+
+    Returns:
+        dict | None: 包含 title, price, image_url, url, sku 的字典，缺少必要欄位時回傳 None
+    """
+    # 提取連結和 SKU
+    link_element = element.find_element(By.CSS_SELECTOR, "a.c-prodInfoV2__link")
+    url = link_element.get_attribute("href")
+    if not url.startswith(("http://", "https://")):
+        url = PCHOME_BASE_URL + url
+
+    sku_match = re.search(r'/prod/(.*?)(?:\?|$)', url)
+    sku = sku_match.group(1) if sku_match else ""
+
+    # 提取標題
+    title_elem = element.find_element(By.CSS_SELECTOR, "div.c-prodInfoV2__title")
+    title = title_elem.text.strip()
+
+    # 提取價格
+    price_text = element.find_element(By.CSS_SELECTOR, "div.c-prodInfoV2__salePrice").text
+    price = int(re.sub(r'[^\d]', '', price_text))
+
+    # 提取圖片
+    image_url = ""
+    try:
+        img_elem = element.find_element(By.CSS_SELECTOR, "div.c-prodInfoV2__head img")
+        image_url = img_elem.get_attribute("src")
+    except NoSuchElementException:
+        image_url = "" # 找不到圖片就算了
+
+    if not (title and price > 0 and url and sku):
+        return None
 
+    return {
+        "title": title,
+        "price": price,
+        "image_url": image_url,
+        "url": url,
+        "sku": sku
+    }
 
-def fetch_products_for_pchome(keyword, max_products=50):
+
+def fetch_products_for_pchome(keyword, max_products=50, engine="api", workers=4, extraction="bulk",
+                              resume=False, checkpoint_dir=CHECKPOINT_DIR, stream=None, incremental=False,
+                              checkpoint_name=None, raise_on_interrupt=False):
     """
-    使用 Selenium 從 PChome 購物網抓取商品資訊，適應 2025年10月 的新版網頁結構。
+    從 PChome 購物網抓取商品資訊。預設使用搜尋 JSON API，
+    API 無法使用時才改用 Selenium 爬蟲（適應 2025年10月 的新版網頁結構）。
     
     Args:
         keyword (str): 搜尋關鍵字
         max_products (int): 最大抓取商品數量
+        engine (str): "api" 使用搜尋 JSON API（失敗時改用 Selenium）；"selenium" 直接使用 Selenium 翻頁
+        workers (int): API 引擎同時抓取的頁面數量
+        extraction (str): Selenium 引擎的商品擷取模式，"bulk" 每頁只用一次 execute_script，
+            "element" 逐一以 find_element 查詢每個商品，"html" 取 page_source 交給解析行程池
+        resume (bool): 是否從上次中斷的檢查點繼續抓取。API 引擎從中斷的頁數繼續；
+            Selenium 翻頁無法直接跳頁，會從第 1 頁重新翻頁並略過檢查點中已收集的 SKU
+        checkpoint_dir (str): 檢查點資料夾，設為 None 則不寫入檢查點
+        stream (NDJSONWriter): 串流輸出，每頁新增的商品會立即以 NDJSON 寫出
+        incremental (bool): 增量模式，只回傳新的或 price / title / image_url 有變動的商品
+            （以 sku 比對 product_history 的記錄），整頁都沒有變動時提早停止翻頁
+        checkpoint_name (str): 檢查點檔案名稱，預設為 平台_關鍵字（見 ScrapeCheckpoint）
+        raise_on_interrupt (bool): 中途停止時拋出 ScrapeInterrupted，而不是回傳已抓到的部分商品
+            （工作佇列以此判斷工作是否完成）
     
     Returns:
         list: 商品資訊列表
     """
-    products = []
-    product_id = 1
     driver = None
+    checkpoint, start_page, products, seen_skus = _open_checkpoint("pchome", keyword, checkpoint_dir, resume,
+                                                                   checkpoint_name)
+    history = get_product_history() if incremental else None
+    run = start_run("pchome", keyword)
     page = 1
-    seen_skus = set()
 
     try:
-        chrome_options = Options()
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-        
-        prefs = {"profile.default_content_setting_values.notifications": 2}
-        chrome_options.add_experimental_option("prefs", prefs)
-        
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.set_page_load_timeout(40)
+        if engine == "api":
+            print(f"正在搜尋 PChome: {keyword}")
+            if _fetch_pchome_api(keyword, max_products, workers, products, seen_skus, start_page, checkpoint,
+                                 stream, history):
+                print(f"成功從 PChome 獲取 {len(products)} 個唯一商品。")
+                _finish_checkpoint(checkpoint, products, raise_on_interrupt)
+                return products
+
+        # 從瀏覽器池借用 WebDriver
+        pool = get_browser_pool()
+        driver = pool.acquire("pchome")
         wait = WebDriverWait(driver, 20)
         print(f"正在搜尋 PChome: {keyword}")
 
         encoded_keyword = quote(keyword)
-        search_url = f"https://24h.pchome.com.tw/search/?q={encoded_keyword}"
-        driver.get(search_url)
-        time.sleep(2)
+        search_url = f"{PCHOME_BASE_URL}/search/?q={encoded_keyword}"
+        _throttle(search_url)
+        with timed("navigation_seconds"):
+            driver.get(search_url)
 
         while len(products) < max_products:
-            print(f"正在抓取 PChome 第 {page} 頁...")
+            with page_scope(page):
+                print(f"正在抓取 PChome 第 {page} 頁...")
+                pool.record_page(driver)
             
-            try:
-                # 等待新結構的商品項目出現
-                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "li.c-listInfoGrid__item--gridCardGray5")))
-                
-                # 滾動頁面以確保所有商品都載入
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
-                
-                # 根據新結構獲取所有商品元素
-                product_elements = driver.find_elements(By.CSS_SELECTOR, "li.c-listInfoGrid__item--gridCardGray5")
-            except TimeoutException:
-                print("頁面加載超時或找不到新結構的商品容器 (li.c-listInfoGrid__item--gridCardGray5)。")
-                try:
-                    driver.save_screenshot("pchome_error_screenshot.png")
-                    print("已儲存錯誤截圖: pchome_error_screenshot.png")
-                except Exception as e:
-                    print(f"儲存截圖失敗: {e}")
-                break
+                attempts = []
 
-            if not product_elements:
-                print("找不到商品，可能已到達最後一頁。")
-                break
+                def load_once(current_page=page):
+                    # 第 1 頁重試時重新載入搜尋頁；之後的頁面是點擊換頁，只能再等待一次
+                    if attempts and current_page == 1:
+                        _throttle(search_url)
+                        with timed("navigation_seconds"):
+                            driver.get(search_url)
+                    attempts.append(current_page)
+                    with timed("wait_seconds"):
+                        # 等待新結構的商品項目出現
+                        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "li.c-listInfoGrid__item--gridCardGray5")))
 
-            for element in product_elements:
-                if len(products) >= max_products:
-                    break
+                        # 滾動頁面並等待懶載入的商品數量穩定，以確保所有商品都載入
+                        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                        _wait_for_stable_count(driver, PCHOME_LIST_SELECTORS[0])
 
                 try:
-                    # 提取連結和 SKU
-                    link_element = element.find_element(By.CSS_SELECTOR, "a.c-prodInfoV2__link")
-                    url = link_element.get_attribute("href")
-                    if not url.startswith("https://"):
-                        url = "https://24h.pchome.com.tw" + url
-                    
-                    sku_match = re.search(r'/prod/(.*?)(?:\?|$)', url)
-                    sku = sku_match.group(1) if sku_match else ""
-
-                    # 提取標題
-                    title_elem = element.find_element(By.CSS_SELECTOR, "div.c-prodInfoV2__title")
-                    title = title_elem.text.strip()
-
-                    # 提取價格
-                    price_text = element.find_element(By.CSS_SELECTOR, "div.c-prodInfoV2__salePrice").text
-                    price = int(re.sub(r'[^\d]', '', price_text))
-
-                    # 提取圖片
-                    image_url = ""
+                    call_with_retry(load_once, search_url, PAGE_RETRY_POLICY, f"PChome 第 {page} 頁")
+
+                    # 根據新結構獲取所有商品元素
+                    product_elements = driver.find_elements(By.CSS_SELECTOR, "li.c-listInfoGrid__item--gridCardGray5")
+                except TimeoutException:
+                    record("selector_misses")
+                    print("頁面加載超時或找不到新結構的商品容器 (li.c-listInfoGrid__item--gridCardGray5)。")
                     try:
-                        img_elem = element.find_element(By.CSS_SELECTOR, "div.c-prodInfoV2__head img")
-                        image_url = img_elem.get_attribute("src")
-                    except NoSuchElementException:
-                        image_url = "" # 找不到圖片就算了
-
-                    if title and price > 0 and url and sku:
-                        if sku in seen_skus:
-                            continue
-                        
-                        seen_skus.add(sku)
-                        product = {
-                            "id": product_id,
-                            "title": title,
-                            "price": price,
-                            "image_url": image_url,
-                            "url": url,
-                            "platform": "pchome",
-                            "sku": sku
-                        }
-                        products.append(product)
-                        product_id += 1
-
-                except (NoSuchElementException, ValueError) as e:
-                    continue
+                        driver.save_screenshot("pchome_error_screenshot.png")
+                        print("已儲存錯誤截圖: pchome_error_screenshot.png")
+                    except Exception as e:
+                        print(f"儲存截圖失敗: {e}")
+                    break
+
+                if not product_elements:
+                    print("找不到商品，可能已到達最後一頁。")
+                    break
+
+                with timed("parse_seconds"):
+                    page_products = None
+                    if extraction == "html":
+                        try:
+                            page_products = _run_parser(parse_pchome_page, driver.page_source)[1]
+                        except WebDriverException as e:
+                            print(f"取得 PChome 第 {page} 頁原始碼失敗，改為逐一解析商品: {e}")
+                    elif extraction == "bulk":
+                        try:
+                            cards = _extract_cards_in_browser(driver, PCHOME_LIST_SELECTORS, PCHOME_CARD_FIELDS)
+                            page_products = [parsed for parsed in map(_parse_pchome_card_data, cards) if parsed]
+                        except WebDriverException as e:
+                            print(f"批次擷取 PChome 第 {page} 頁失敗，改為逐一解析商品: {e}")
+
+                    if page_products is None:
+                        page_products = []
+                        for element in product_elements:
+                            try:
+                                parsed = _parse_pchome_element(element)
+                                if parsed:
+                                    page_products.append(parsed)
+                            except (NoSuchElementException, ValueError) as e:
+                                continue
+
+                record("parse_failures", len(product_elements) - len(page_products))
+                _record_network(driver, "pchome")
+
+                added, unchanged_count = _merge_page_products(page_products, products, seen_skus, max_products,
+                                                              "pchome", stream, history)
+                if checkpoint:
+                    checkpoint.save(max(page + 1, start_page), products, seen_skus)
             
-            if len(products) >= max_products:
-                break
+                if len(products) >= max_products or (unchanged_count and not added):
+                    break
 
-            # 點擊下一頁按鈕
-            try:
-                # 先滾動到頁面底部，確保下一頁按鈕可見
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(1)
+                # 點擊下一頁按鈕
+                try:
+                    # 先滾動到頁面底部，確保下一頁按鈕可見
+                    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
                 
-                # 使用新的選擇器來找到下一頁按鈕
-                # 根據 HTML 結構，尋找包含向右箭頭圖示的元素
-                next_icon = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "i.o-iconFonts--arrowSolidRight")))
-                # 點擊圖示的父元素（應該是可點擊的按鈕）
-                next_page_button = next_icon.find_element(By.XPATH, "..")
-                driver.execute_script("arguments[0].click();", next_page_button)
-                page += 1
-                time.sleep(random.uniform(3, 5))
-            except (TimeoutException, NoSuchElementException):
-                print("找不到下一頁按鈕，抓取結束。")
-                break
+                    # 使用新的選擇器來找到下一頁按鈕
+                    # 根據 HTML 結構，尋找包含向右箭頭圖示的元素
+                    next_icon = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "i.o-iconFonts--arrowSolidRight")))
+                    # 點擊圖示的父元素（應該是可點擊的按鈕）
+                    next_page_button = next_icon.find_element(By.XPATH, "..")
+                    first_href = _first_card_href(driver)
+                    _throttle(PCHOME_BASE_URL)
+                    driver.execute_script("arguments[0].click();", next_page_button)
+                    page += 1
+                    # 等待第一個商品換成下一頁的內容，取代固定秒數的等待
+                    with timed("navigation_seconds"):
+                        _wait_for_page_change(driver, first_href)
+                except (TimeoutException, NoSuchElementException):
+                    print("找不到下一頁按鈕，抓取結束。")
+                    break
         
         print(f"成功從 PChome 獲取 {len(products)} 個唯一商品。")
+        _finish_checkpoint(checkpoint, products, raise_on_interrupt)
         return products
 
+    except ScrapeInterrupted:
+        raise
     except Exception as e:
-        print(f"PChome Selenium 爬蟲發生錯誤: {e}")
-        return []
+        # 回傳已抓到的商品；檢查點保留，之後可從中斷的頁面繼續
+        return _interrupted("PChome", checkpoint, products, e, raise_on_interrupt)
 
     finally:
+        # 歸還瀏覽器給瀏覽器池
         if driver:
-            try:
-                driver.quit()
-            except:
-                pass
-
+            pool.release(driver)
+        finish_run(run)
 
-if __name__ == "__main__":
-    # 測試爬蟲
-    keyword = input("輸入關鍵字: ")
-    english_keyword = input("輸入關鍵字的英文名稱: ")
-    num = int(input("輸入數量: "))
-    products = fetch_products_for_momo(keyword, num)
-    
-    # 為每個商品添加查詢關鍵字
-    for product in products:
-        product['query'] = english_keyword
-    
-    # 儲存 products 至 JSON 檔案
-    with open("momo_products.json", "w", encoding="utf-8") as f:
-        json.dump(products, f, ensure_ascii=False, indent=4)
 
+def _print_products(products):
+    """在終端機列出商品"""
     if products:
         print(f"\n找到 {len(products)} 個商品：")
         for product in products:
@@ -544,25 +1381,224 @@ if __name__ == "__main__":
     else:
         print("沒有找到商品")
 
-    products = fetch_products_for_pchome(keyword, num)
-    
+
+def save_products(products, query, output_file):
+    """
+    為每個商品加上查詢關鍵字（英文名稱）並儲存成 JSON 檔案
+
+    Args:
+        products (list): 商品資訊列表
+        query (str): 查詢關鍵字的英文名稱
+        output_file (str): 輸出的 JSON 檔案路徑
+    """
     # 為每個商品添加查詢關鍵字
     for product in products:
-        product['query'] = english_keyword
-    
-    # 儲存 products 至 JSON 檔案
-    with open("pchome_products.json", "w", encoding="utf-8") as f:
+        product['query'] = query
+
+    output_dir = os.path.dirname(output_file)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    with open(output_file, "w", encoding="utf-8") as f:
         json.dump(products, f, ensure_ascii=False, indent=4)
 
-    if products:
-        print(f"\n找到 {len(products)} 個商品：")
-        for product in products:
-            print(f"ID: {product['id']}")
-            print(f"標題: {product['title']}")
-            print(f"價格: NT$ {product['price']:,}")
-            print(f"圖片: {product['image_url']}")
-            print(f"連結: {product['url']}")
-            print(f"平台: {product['platform']}")
-            print("-" * 50)
+
+def load_manifest(manifest_file):
+    """
+    讀取批次抓取的關鍵字清單
+
+    支援 JSON（[{"keyword": ..., "query": ..., "count": ...}, ...]）
+    與 CSV（標題列為 keyword,query,count）兩種格式。
+
+    Args:
+        manifest_file (str): 清單檔案路徑
+
+    Returns:
+        list: [{"keyword", "query", "count"}, ...]
+    """
+    if manifest_file.lower().endswith(".csv"):
+        with open(manifest_file, "r", encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
     else:
-        print("沒有找到商品")
\ No newline at end of file
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            rows = json.load(f)
+
+    entries = []
+    for row in rows:
+        keyword = (row.get("keyword") or "").strip()
+        if not keyword:
+            continue
+        entries.append({
+            "keyword": keyword,
+            "query": (row.get("query") or keyword).strip(),
+            "count": int(row.get("count") or 50)
+        })
+    return entries
+
+
+def _open_stream(output_file, query, resume=False):
+    """
+    建立 output_file 對應的 NDJSON 串流輸出（momo_products.json -> momo_products.ndjson）
+
+    Args:
+        output_file (str): 最終輸出的 JSON 檔案路徑
+        query (str): 查詢關鍵字的英文名稱，寫入每個商品的 query 欄位
+        resume (bool): 從檢查點繼續時接在既有檔案後面
+    """
+    stream = NDJSONWriter(ndjson_path_for(output_file), extra={"query": query}, append=resume)
+    print(f"商品將即時寫入 {stream.path}")
+    return stream
+
+
+def run_batch(entries, workers=4, output_dir="batch_output", platforms=("momo", "pchome"),
+              momo_options=None, pchome_options=None, stream=False, prefetch_images=False):
+    """
+    以多執行緒同時執行所有 關鍵字 × 平台 的抓取工作
+
+    每個工作輸出到 output_dir/<query>_<platform>_products.json，
+    全部完成後把每個工作的耗時與商品數寫入 output_dir/batch_summary.json。
+    stream 為 True 時，抓取過程中同時把每頁商品寫到同名的 .ndjson 檔案。
+
+    Args:
+        entries (list): load_manifest 回傳的關鍵字清單
+        workers (int): 同時執行的工作數
+        output_dir (str): 輸出資料夾
+        platforms (tuple): 要抓取的平台
+        momo_options (dict): 傳給 fetch_products_for_momo 的額外參數
+        pchome_options (dict): 傳給 fetch_products_for_pchome 的額外參數
+        stream (bool): 是否以 NDJSON 即時輸出
+        prefetch_images (bool): 抓取後是否預先下載商品圖片縮圖
+
+    Returns:
+        list: 每個工作的摘要 {keyword, query, platform, count, requested, seconds, output, error}
+    """
+    fetchers = {
+        "momo": (fetch_products_for_momo, momo_options or {}),
+        "pchome": (fetch_products_for_pchome, pchome_options or {})
+    }
+
+    def run_job(entry, platform):
+        fetch, options = fetchers[platform]
+        output_file = os.path.join(output_dir, f"{_query_slug(entry['query'])}_{platform}_products.json")
+        started = time.perf_counter()
+        error = None
+        products = []
+        job_stream = None
+        try:
+            if stream:
+                job_stream = _open_stream(output_file, entry["query"], options.get("resume", False))
+            products = fetch(entry["keyword"], entry["count"], stream=job_stream, **options)
+            save_products(products, entry["query"], output_file)
+            if prefetch_images:
+                get_image_cache().prefetch(products)
+        except Exception as e:
+            error = str(e)
+        finally:
+            if job_stream:
+                job_stream.close()
+        return {
+            "keyword": entry["keyword"],
+            "query": entry["query"],
+            "platform": platform,
+            "count": len(products),
+            "requested": entry["count"],
+            "seconds": round(time.perf_counter() - started, 2),
+            "output": output_file,
+            "error": error
+        }
+
+    jobs = [(entry, platform) for entry in entries for platform in platforms]
+    print(f"開始批次抓取：{len(entries)} 個關鍵字 × {len(platforms)} 個平台，共 {len(jobs)} 個工作（{workers} 個同時執行）")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        summary = list(executor.map(lambda job: run_job(*job), jobs))
+    total_seconds = round(time.perf_counter() - started, 2)
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    summary_file = os.path.join(output_dir, "batch_summary.json")
+    with open(summary_file, "w", encoding="utf-8") as f:
+        json.dump({"total_seconds": total_seconds, "jobs": summary}, f, ensure_ascii=False, indent=4)
+
+    print(f"\n{'='*60}")
+    print("批次抓取摘要")
+    print(f"{'='*60}")
+    for job in summary:
+        status = f"錯誤: {job['error']}" if job["error"] else f"{job['count']}/{job['requested']} 筆"
+        print(f"  • {job['query']} [{job['platform']}] {status}，耗時 {job['seconds']} 秒")
+    print(f"總耗時 {total_seconds} 秒，摘要已寫入 {summary_file}")
+    print(f"{'='*60}\n")
+
+    return summary
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="momo / PChome 商品爬蟲（不帶參數時以互動模式執行）")
+    parser.add_argument("--manifest", help="批次抓取的關鍵字清單（JSON 或 CSV，欄位 keyword, query, count）")
+    parser.add_argument("--workers", type=int, default=4, help="同時執行的抓取工作數（預設 4）")
+    parser.add_argument("--output-dir", default="batch_output", help="批次輸出資料夾（預設 batch_output）")
+    parser.add_argument("--platforms", default="momo,pchome", help="要抓取的平台，以逗號分隔（預設 momo,pchome）")
+    parser.add_argument("--momo-engine", choices=["selenium", "http"], default="selenium", help="momo 抓取引擎")
+    parser.add_argument("--momo-workers", type=int, default=1, help="每個 momo 工作同時使用的瀏覽器數")
+    parser.add_argument("--pchome-engine", choices=["api", "selenium"], default="api", help="PChome 抓取引擎")
+    parser.add_argument("--extraction", choices=["bulk", "element", "html"], default="bulk",
+                        help="Selenium 引擎的商品擷取模式（html 為取原始碼交給解析行程池）")
+    parser.add_argument("--resume", action="store_true", help="從上次中斷的檢查點繼續抓取")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR, help=f"檢查點資料夾（預設 {CHECKPOINT_DIR}）")
+    parser.add_argument("--stream", action="store_true", help="抓取時把每頁商品即時寫入 .ndjson 檔案")
+    parser.add_argument("--prefetch-images", action="store_true",
+                        help="抓取後預先下載商品圖片並建立縮圖快取，供比對網頁使用")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量模式：只輸出新的或價格、標題、圖片有變動的商品，並記錄價格歷史")
+    parser.add_argument("--metrics-report",
+                        help=f"抓取指標（每頁耗時、重試、WebDriver 指令數等）的 JSON 執行報告路徑"
+                             f"（預設 {METRICS_REPORT_FILE}，批次模式放在輸出資料夾內）")
+    parser.add_argument("--prometheus", help="另外把累計指標寫成 Prometheus 文字格式的檔案")
+    parser.add_argument("--rate", action="append", default=[], type=parse_rate_spec, metavar="HOST=RPS[:BURST]",
+                        help="調整某個網站的請求速率，可重複指定，例如 --rate momo=1:3 --rate pchome=0.8"
+                             "（也可用環境變數 SCRAPER_HOST_RATES，以逗號分隔）")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    for host, rate, burst in configure_rates(args.rate):
+        print(f"速率設定: {host} 每秒 {rate:g} 個請求，突發上限 {burst}")
+    checkpoint_options = {"resume": args.resume, "checkpoint_dir": args.checkpoint_dir,
+                          "incremental": args.incremental}
+    momo_options = {"engine": args.momo_engine, "workers": args.momo_workers, "extraction": args.extraction,
+                    **checkpoint_options}
+    pchome_options = {"engine": args.pchome_engine, "extraction": args.extraction, **checkpoint_options}
+
+    if args.manifest:
+        # 批次模式：依清單同時抓取所有關鍵字與平台
+        platforms = tuple(p.strip() for p in args.platforms.split(",") if p.strip())
+        run_batch(load_manifest(args.manifest), args.workers, args.output_dir, platforms,
+                  momo_options, pchome_options, args.stream, args.prefetch_images)
+        metrics_report = args.metrics_report or os.path.join(args.output_dir, METRICS_REPORT_FILE)
+    else:
+        # 互動模式：測試爬蟲
+        keyword = input("輸入關鍵字: ")
+        english_keyword = input("輸入關鍵字的英文名稱: ")
+        num = int(input("輸入數量: "))
+
+        for platform, fetch, options in (("momo", fetch_products_for_momo, momo_options),
+                                         ("pchome", fetch_products_for_pchome, pchome_options)):
+            output_file = f"{platform}_products.json"
+            stream = _open_stream(output_file, english_keyword, args.resume) if args.stream else None
+            try:
+                products = fetch(keyword, num, stream=stream, **options)
+            finally:
+                if stream:
+                    stream.close()
+            # 儲存 products 至 JSON 檔案
+            save_products(products, english_keyword, output_file)
+            _print_products(products)
+            if args.prefetch_images:
+                get_image_cache().prefetch(products)
+        metrics_report = args.metrics_report or METRICS_REPORT_FILE
+
+    write_json_report(metrics_report)
+    if args.prometheus:
+        write_prometheus(args.prometheus)
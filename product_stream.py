@@ -0,0 +1,109 @@
+import threading
+import json
+import os
+
+
+class NDJSONWriter:
+    """
+    以 NDJSON（每行一個 JSON 物件）逐頁寫出商品
+
+    每頁合併完就寫入並 flush，爬蟲還在執行時其他程式（例如比對網頁）
+    就能讀到已完成的商品。
+    """
+
+    def __init__(self, path, extra=None, append=False):
+        """
+        Args:
+            path (str): 輸出的 .ndjson 檔案路徑
+            extra (dict): 每個商品額外加上的欄位，例如 {"query": "iphone"}
+            append (bool): 是否接在既有檔案後面（從檢查點繼續抓取時使用）
+        """
+        output_dir = os.path.dirname(path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir, exist_ok=True)
+        self.path = path
+        self.extra = extra or {}
+        self.count = 0
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write_page(self, products):
+        """
+        寫入一頁的商品並立即 flush
+
+        Args:
+            products (list): 這一頁新增的商品
+        """
+        if not products:
+            return
+        lines = "".join(json.dumps({**product, **self.extra}, ensure_ascii=False) + "\n" for product in products)
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+            self.count += len(products)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def ndjson_path_for(json_path):
+    """取得 JSON 輸出檔對應的 NDJSON 檔案路徑（momo_products.json -> momo_products.ndjson）"""
+    return os.path.splitext(json_path)[0] + ".ndjson"
+
+
+def read_ndjson(path):
+    """
+    讀取 NDJSON 商品檔案
+
+    爬蟲可能正在寫入，最後一行若尚未寫完（沒有換行或無法解析）就略過。
+
+    Args:
+        path (str): .ndjson 檔案路徑
+
+    Returns:
+        list: 商品列表
+    """
+    products = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                products.append(json.loads(line))
+            except ValueError:
+                continue
+    return products
+
+
+def load_products(json_path):
+    """
+    讀取爬蟲輸出的商品檔案
+
+    若對應的 .ndjson 檔案比 JSON 檔案新（爬蟲正在以串流模式執行中），
+    就讀取 NDJSON，否則讀取 JSON。
+
+    Args:
+        json_path (str): 商品 JSON 檔案路徑，例如 momo_products.json
+
+    Returns:
+        list | None: 商品列表，兩種檔案都不存在時回傳 None
+    """
+    ndjson_path = ndjson_path_for(json_path)
+    if os.path.exists(ndjson_path) and (
+            not os.path.exists(json_path) or os.path.getmtime(ndjson_path) > os.path.getmtime(json_path)):
+        return read_ndjson(ndjson_path)
+    if os.path.exists(json_path):
+        with open(json_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return None
@@ -0,0 +1,221 @@
+from urllib.parse import urlparse
+import threading
+import time
+import os
+
+# 各網站的禮貌速率（每秒請求數, 突發上限）
+DEFAULT_HOST_LIMITS = {
+    "www.momoshop.com.tw": (0.5, 2),
+    "24h.pchome.com.tw": (0.5, 2),
+    "ecshweb.pchome.com.tw": (2.0, 4)
+}
+
+# 未列在 DEFAULT_HOST_LIMITS 的網站，可用環境變數調整
+DEFAULT_RATE = float(os.environ.get('SCRAPER_RATE_LIMIT', '1.0'))
+DEFAULT_BURST = int(os.environ.get('SCRAPER_RATE_BURST', '2'))
+
+# 個別網站的速率，格式同 --rate，以逗號分隔，例如 momo=1:3,pchome=0.8:2
+HOST_RATES_ENV = 'SCRAPER_HOST_RATES'
+
+# 設定速率時可用的網站簡稱
+HOST_ALIASES = {
+    "momo": "www.momoshop.com.tw",
+    "pchome": "24h.pchome.com.tw",
+    "pchome-api": "ecshweb.pchome.com.tw"
+}
+
+
+class TokenBucket:
+    """
+    Token bucket 速率限制器，可在多執行緒間共用
+    """
+
+    def __init__(self, rate, burst):
+        """
+        Args:
+            rate (float): 每秒補充的 token 數（即每秒請求數）
+            burst (int): token 上限（允許的突發請求數）
+        """
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        取得一個 token，不足時阻塞等待
+
+        Returns:
+            float: 實際等待的秒數
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class HostRateLimiter:
+    """
+    以網站（host）區分的速率限制器，每個 host 各自有一個 TokenBucket
+    """
+
+    def __init__(self, limits=None, default_rate=DEFAULT_RATE, default_burst=DEFAULT_BURST):
+        """
+        Args:
+            limits (dict): host -> (每秒請求數, 突發上限)
+            default_rate (float): 未設定的 host 使用的每秒請求數
+            default_burst (int): 未設定的 host 使用的突發上限
+        """
+        self.limits = dict(DEFAULT_HOST_LIMITS if limits is None else limits)
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def configure(self, host, rate, burst):
+        """
+        設定某個 host 的速率
+
+        Args:
+            host (str): 網站 host，例如 www.momoshop.com.tw
+            rate (float): 每秒請求數
+            burst (int): 突發上限
+        """
+        with self._lock:
+            self.limits[host] = (rate, burst)
+            self._buckets[host] = TokenBucket(rate, burst)
+
+    def limit(self, host):
+        """
+        Returns:
+            tuple: 某個 host 目前的 (每秒請求數, 突發上限)
+        """
+        with self._lock:
+            return self.limits.get(host, (self.default_rate, self.default_burst))
+
+    def minimum_seconds(self, url, requests):
+        """
+        估計對某個網站連續發出 requests 個請求至少需要的秒數（突發上限內的請求不需等待）
+
+        Args:
+            url (str): 網址（或直接傳入 host）
+            requests (int): 請求數
+
+        Returns:
+            float: 至少需要的秒數
+        """
+        rate, burst = self.limit(urlparse(url).hostname or url)
+        return max(0, requests - burst) / rate
+
+    def _bucket(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate, burst = self.limits.get(host, (self.default_rate, self.default_burst))
+                bucket = TokenBucket(rate, burst)
+                self._buckets[host] = bucket
+            return bucket
+
+    def wait(self, url):
+        """
+        在對某個網址發出請求前呼叫，依該 host 的速率阻塞等待
+
+        Args:
+            url (str): 即將請求的網址（或直接傳入 host）
+
+        Returns:
+            float: 實際等待的秒數
+        """
+        host = urlparse(url).hostname or url
+        return self._bucket(host).acquire()
+
+
+def parse_rate_spec(spec):
+    """
+    解析單一網站的速率設定：host=每秒請求數[:突發上限]
+
+    host 可以是 HOST_ALIASES 中的簡稱，例如 momo=1:3、www.momoshop.com.tw=0.5；
+    省略突發上限時使用 DEFAULT_BURST。
+
+    Args:
+        spec (str): 速率設定
+
+    Returns:
+        tuple: (host, 每秒請求數, 突發上限)
+
+    Raises:
+        ValueError: 格式錯誤，或速率、突發上限不是正數
+    """
+    host, separator, value = spec.strip().partition("=")
+    rate, _, burst = value.partition(":")
+    try:
+        rate = float(rate)
+        burst = int(burst) if burst else DEFAULT_BURST
+    except ValueError:
+        raise ValueError(f"速率設定格式應為 host=每秒請求數[:突發上限]，收到 {spec!r}") from None
+    if not separator or not host.strip() or rate <= 0 or burst < 1:
+        raise ValueError(f"速率設定格式應為 host=每秒請求數[:突發上限]，收到 {spec!r}")
+    host = host.strip()
+    return HOST_ALIASES.get(host, host), rate, burst
+
+
+def configure_rates(specs, limiter=None):
+    """
+    套用多個網站的速率設定（命令列的 --rate 或環境變數 SCRAPER_HOST_RATES）
+
+    Args:
+        specs (list): parse_rate_spec 的字串或已解析的 (host, 每秒請求數, 突發上限)
+        limiter (HostRateLimiter): 要設定的速率限制器，預設為共用的速率限制器
+
+    Returns:
+        list: 套用的 (host, 每秒請求數, 突發上限)
+    """
+    limiter = limiter or get_rate_limiter()
+    applied = []
+    for spec in specs:
+        host, rate, burst = parse_rate_spec(spec) if isinstance(spec, str) else spec
+        limiter.configure(host, rate, burst)
+        applied.append((host, rate, burst))
+    return applied
+
+
+def _env_rate_specs():
+    """讀取環境變數 SCRAPER_HOST_RATES 中的速率設定，格式錯誤的項目略過"""
+    specs = []
+    for spec in os.environ.get(HOST_RATES_ENV, "").split(","):
+        if not spec.strip():
+            continue
+        try:
+            specs.append(parse_rate_spec(spec))
+        except ValueError as e:
+            print(f"略過環境變數 {HOST_RATES_ENV} 的設定: {e}")
+    return specs
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """
+    取得行程內共用的速率限制器，建立時套用環境變數 SCRAPER_HOST_RATES 的設定
+
+    Returns:
+        HostRateLimiter: 共用的速率限制器
+    """
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            limiter = HostRateLimiter()
+            configure_rates(_env_rate_specs(), limiter)
+            _rate_limiter = limiter
+        return _rate_limiter
@@ -0,0 +1,234 @@
+from urllib.parse import urlparse
+import threading
+import random
+import time
+import requests
+from selenium.common.exceptions import TimeoutException
+from scrape_metrics import record, add_report_section
+
+# 錯誤分類
+TRANSIENT = "transient"  # 網站或網路暫時失敗：重試，並計入斷路器
+RETRY = "retry"  # 內容尚未就緒（例如商品列表還沒出現）：重試，但不算網站失敗
+FATAL = "fatal"  # 重試也不會成功（4xx、瀏覽器已失效、解析錯誤）：直接放棄
+
+# 這些 HTTP 狀態碼代表網站暫時無法服務，值得重試
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class RetryableError(Exception):
+    """內容尚未就緒、重新載入可能就會成功的情況（例如找不到商品列表）"""
+
+
+class CircuitOpenError(Exception):
+    """斷路器開啟中：這個網站最近連續失敗，暫停送出請求"""
+
+
+def classify_error(error):
+    """
+    依例外類型判斷是否值得重試
+
+    Args:
+        error (Exception): 捕捉到的例外
+
+    Returns:
+        str: TRANSIENT、RETRY 或 FATAL
+    """
+    if isinstance(error, RetryableError):
+        return RETRY
+    if isinstance(error, requests.HTTPError):
+        status = error.response.status_code if error.response is not None else None
+        return TRANSIENT if status in RETRYABLE_STATUS_CODES else FATAL
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return TRANSIENT
+    # TimeoutException 是 WebDriverException 的子類別，必須先判斷
+    if isinstance(error, TimeoutException):
+        return TRANSIENT
+    return FATAL
+
+
+class RetryPolicy:
+    """
+    指數退避重試設定：第 n 次重試前等待 base_delay * 2^(n-1) 秒（上限 max_delay），
+    再隨機減少最多 jitter 比例，避免多個執行緒同時重試
+    """
+
+    def __init__(self, max_attempts=3, base_delay=1.0, max_delay=30.0, jitter=0.5):
+        """
+        Args:
+            max_attempts (int): 最多嘗試次數（包含第一次）
+            base_delay (float): 第一次重試前的等待秒數
+            max_delay (float): 等待秒數上限
+            jitter (float): 隨機減少等待時間的最大比例（0 ~ 1）
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delay(self, retry):
+        """第 retry 次重試前的等待秒數（retry 從 1 開始）"""
+        delay = min(self.base_delay * 2 ** (retry - 1), self.max_delay)
+        return delay * (1 - random.uniform(0, self.jitter))
+
+
+DEFAULT_POLICY = RetryPolicy()
+
+
+class CircuitBreaker:
+    """
+    每個網站一個斷路器
+
+    連續 failure_threshold 次暫時性失敗後開啟，reset_timeout 秒內直接拒絕請求；
+    之後進入半開狀態放行一次試探請求，成功則關閉，失敗則再次開啟。
+    """
+
+    def __init__(self, host, failure_threshold=5, reset_timeout=60.0):
+        """
+        Args:
+            host (str): 網站主機名稱
+            failure_threshold (int): 連續失敗幾次後開啟
+            reset_timeout (float): 開啟後多久進入半開狀態
+        """
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self.stats = {"calls": 0, "failures": 0, "retries": 0, "rejected": 0, "opened": 0, "gave_up": 0}
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        確認是否可以送出請求
+
+        Raises:
+            CircuitOpenError: 斷路器開啟中
+        """
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probing = False
+            # 開啟中，或半開狀態已有一個試探請求在進行
+            if self.state == "open" or (self.state == "half_open" and self._probing):
+                self.stats["rejected"] += 1
+                raise CircuitOpenError(f"{self.host} 連續失敗，暫停請求中")
+            if self.state == "half_open":
+                self._probing = True
+            self.stats["calls"] += 1
+
+    def is_open(self):
+        with self._lock:
+            return self.state == "open"
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def release_probe(self):
+        """請求以非網站因素結束（例如內容未就緒、瀏覽器失效），讓半開狀態可以再送出試探請求"""
+        with self._lock:
+            self._probing = False
+
+    def record_retry(self, gave_up=False):
+        """記錄一次重試；gave_up 為 True 表示重試次數已用盡"""
+        with self._lock:
+            self.stats["gave_up" if gave_up else "retries"] += 1
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.stats["failures"] += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.stats["opened"] += 1
+                    print(f"{self.host} 連續失敗 {self.failures} 次，暫停請求 {self.reset_timeout:.0f} 秒")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def report(self):
+        with self._lock:
+            return {"host": self.host, "state": self.state, "consecutive_failures": self.failures, **self.stats}
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(url_or_host):
+    """
+    取得某個網站共用的斷路器
+
+    Args:
+        url_or_host (str): 網址或主機名稱
+
+    Returns:
+        CircuitBreaker: 該網站的斷路器
+    """
+    host = urlparse(url_or_host).hostname or url_or_host
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(host)
+        return _breakers[host]
+
+
+def breaker_report():
+    """
+    Returns:
+        list: 每個網站斷路器的狀態與重試統計
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [breaker.report() for breaker in breakers]
+
+
+def call_with_retry(func, url, policy=DEFAULT_POLICY, description=None):
+    """
+    依重試設定與網站斷路器呼叫 func
+
+    暫時性失敗與內容未就緒會退避後重試，只有暫時性失敗會計入斷路器；
+    無法重試的錯誤、重試用盡或斷路器開啟時拋出最後的例外。
+
+    Args:
+        func (callable): 不帶參數的函式，每次嘗試呼叫一次
+        url (str): 請求的網址，用來選擇斷路器
+        policy (RetryPolicy): 重試設定
+        description (str): 錯誤訊息中顯示的名稱，例如「第 2 頁」
+
+    Returns:
+        func 的回傳值
+    """
+    breaker = get_circuit_breaker(url)
+    description = description or url
+    for attempt in range(1, policy.max_attempts + 1):
+        breaker.allow()
+        try:
+            result = func()
+        except Exception as e:
+            kind = classify_error(e)
+            if kind == TRANSIENT:
+                breaker.record_failure()
+            else:
+                breaker.release_probe()
+            # 這次失敗讓斷路器開啟時不必再等待重試
+            if kind == FATAL or attempt == policy.max_attempts or breaker.is_open():
+                if kind != FATAL:
+                    breaker.record_retry(gave_up=True)
+                raise
+            delay = policy.delay(attempt)
+            breaker.record_retry()
+            record("retries")
+            record("retry_wait_seconds", delay)
+            print(f"{description} 失敗（{type(e).__name__}），{delay:.1f} 秒後重試 {attempt}/{policy.max_attempts - 1}")
+            time.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
+
+
+# 斷路器狀態與重試統計寫入抓取指標的執行報告
+add_report_section("circuit_breakers", breaker_report)
@@ -0,0 +1,316 @@
+import argparse
+import json
+import time
+import threading
+import os
+import re
+from datetime import datetime
+from scrape_metrics import add_report_section
+
+# 以 Chrome DevTools 的 Network.setBlockedURLs 封鎖爬蟲用不到的資源（萬用字元為 *）
+# 爬蟲只讀取文字節點與 <img> 的 src / data-original 屬性，圖片不需要真的下載
+# setBlockedURLs 沒有「允許」清單，只要符合任何一個樣式就會被擋下，所以樣式要寫得夠精確：
+# 副檔名只比對網址結尾或查詢字串之前（避免 *.gif* 擋到 .gift 之類的網址），其他則指定第三方網域
+
+
+def _extension_patterns(*extensions):
+    """副檔名 -> 網址以該副檔名結尾、或副檔名後接查詢字串的樣式"""
+    patterns = []
+    for extension in extensions:
+        patterns += [f"*.{extension}", f"*.{extension}?*"]
+    return patterns
+
+
+RESOURCE_CATEGORIES = {
+    "images": _extension_patterns("jpg", "jpeg", "png", "gif", "webp", "avif", "svg", "ico"),
+    "media": _extension_patterns("mp4", "webm", "m3u8", "mp3", "m4a"),
+    "fonts": _extension_patterns("woff", "woff2", "ttf", "otf", "eot")
+    + ["*://fonts.googleapis.com/*", "*://fonts.gstatic.com/*"],
+    "trackers": [
+        "*.google-analytics.com/*", "*.googletagmanager.com/*", "*.doubleclick.net/*",
+        "*.googlesyndication.com/*", "*.googleadservices.com/*", "*.facebook.com/tr?*", "*.facebook.com/tr/*",
+        "*.criteo.com/*", "*.criteo.net/*", "*.scorecardresearch.com/*", "*.hotjar.com/*",
+        "*.clarity.ms/*", "*://bat.bing.com/*", "*://analytics.tiktok.com/*", "*.appier.net/*"
+    ],
+    "third_party_scripts": [
+        "*://connect.facebook.net/*", "*://platform.twitter.com/*", "*://apis.google.com/*",
+        "*.youtube.com/iframe_api*", "*.ytimg.com/*", "*://player.vimeo.com/*"
+    ],
+    "stylesheets": _extension_patterns("css")
+}
+
+# 商品爬蟲封鎖的類別：平台自己網域上的圖片、字型同樣不需要下載，因此不另設例外；
+# 樣式表保留，商品列表的懶載入與 is_displayed 判斷依賴版面
+SCRAPER_BLOCK = ["images", "media", "fonts", "trackers", "third_party_scripts"]
+
+# 各瀏覽器設定檔（browser_pool.BROWSER_PROFILES 的 block_resources）封鎖的類別。
+# PChome 搜尋 API 引擎直接以 HTTP 取得 JSON，不使用瀏覽器，所以沒有對應的設定
+BLOCKING_PROFILES = {
+    "momo": {"block": SCRAPER_BLOCK},
+    "pchome": {"block": SCRAPER_BLOCK},
+    # 商品數量檢查只讀取總數文字，不需要版面，樣式表也一併封鎖
+    "probe": {"block": SCRAPER_BLOCK + ["stylesheets"]}
+}
+
+# 設為 0 可暫時關閉封鎖（例如要確認網站改版是否與封鎖有關）
+BLOCK_RESOURCES = os.environ.get("SCRAPER_BLOCK_RESOURCES", "1") != "0"
+
+# 比較工具量得的「每個被封鎖的請求平均節省的位元組數」，用於在抓取指標中估計節省的流量
+BLOCKING_BASELINE_FILE = os.environ.get("SCRAPER_BLOCKING_BASELINE", "resource_blocking_baseline.json")
+
+
+def url_matches(url, pattern):
+    """網址是否符合封鎖樣式（與 Chrome 的比對方式相同：整個網址符合樣式，只有 * 是萬用字元）"""
+    return re.fullmatch(".*".join(map(re.escape, pattern.split("*"))), url, re.DOTALL) is not None
+
+
+def blocked_url_patterns(platform, enabled=None):
+    """
+    取得某個平台要封鎖的網址樣式
+
+    Args:
+        platform (str): BLOCKING_PROFILES 中的平台名稱
+        enabled (bool): 是否封鎖，None 表示依 BLOCK_RESOURCES（環境變數 SCRAPER_BLOCK_RESOURCES）
+
+    Returns:
+        list: 網址樣式，平台沒有設定或已關閉封鎖時為空列表
+    """
+    config = BLOCKING_PROFILES.get(platform)
+    if not (BLOCK_RESOURCES if enabled is None else enabled) or not config:
+        return []
+    patterns = []
+    for category in config["block"]:
+        for pattern in RESOURCE_CATEGORIES[category]:
+            if pattern not in patterns:
+                patterns.append(pattern)
+    return patterns
+
+
+def is_blocked(url, platform):
+    """
+    網址是否會被某個平台的封鎖樣式擋下
+
+    Args:
+        url (str): 完整網址
+        platform (str): BLOCKING_PROFILES 中的平台名稱
+
+    Returns:
+        bool: 是否會被封鎖
+    """
+    return any(url_matches(url, pattern) for pattern in blocked_url_patterns(platform))
+
+
+_baselines = {}  # 檔案路徑 -> (修改時間, 內容)
+_baselines_lock = threading.Lock()
+
+
+def load_blocking_baseline(path=None):
+    """
+    讀取比較工具寫入的量測基準（檔案更新時重新讀取）
+
+    Returns:
+        dict: 平台 -> {bytes_per_blocked_request, url, measured_at}，沒有量測過時為空字典
+    """
+    path = path or BLOCKING_BASELINE_FILE
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    with _baselines_lock:
+        cached = _baselines.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"無法讀取資源封鎖量測基準 {path}: {e}")
+            baseline = {}
+        _baselines[path] = (mtime, baseline)
+        return baseline
+
+
+def save_blocking_baseline(platform, result, path=None):
+    """
+    把 compare_page 的結果存成某個平台的量測基準
+
+    Returns:
+        dict | None: 寫入的基準，封鎖時沒有擋下任何請求（無法換算）時為 None
+    """
+    path = path or BLOCKING_BASELINE_FILE
+    blocked_requests = result["blocked"].get("blocked_requests", 0)
+    if not blocked_requests:
+        return None
+    baseline = dict(load_blocking_baseline(path))
+    baseline[platform] = {
+        "bytes_per_blocked_request": max(result["bytes_saved"], 0) // blocked_requests,
+        "url": result["url"],
+        "measured_at": datetime.now().isoformat(timespec="seconds")
+    }
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=4)
+    os.replace(temp_path, path)
+    return baseline[platform]
+
+
+def estimate_bytes_saved(platform, blocked_requests):
+    """
+    以量測基準估計被封鎖的請求節省的位元組數（被封鎖的請求不會下載，無法直接量得）
+
+    Returns:
+        int | None: 估計的位元組數，該平台沒有量測基準時為 None
+    """
+    entry = load_blocking_baseline().get(platform)
+    if not entry:
+        return None
+    return int(entry["bytes_per_blocked_request"] * blocked_requests)
+
+
+def blocking_report():
+    """
+    執行報告中的資源封鎖區段：是否啟用、各平台的樣式數與估計用的量測基準
+
+    bytes_per_blocked_request 為 None 表示該平台還沒有以比較工具量測，
+    抓取指標中也就沒有 estimated_bytes_saved。
+    """
+    baseline = load_blocking_baseline()
+    return {
+        "enabled": BLOCK_RESOURCES,
+        "patterns": {platform: len(blocked_url_patterns(platform)) for platform in BLOCKING_PROFILES},
+        "bytes_per_blocked_request": {platform: (baseline.get(platform) or {}).get("bytes_per_blocked_request")
+                                      for platform in BLOCKING_PROFILES}
+    }
+
+
+add_report_section("resource_blocking", blocking_report)
+
+
+def apply_resource_blocking(driver, platform, enabled=None):
+    """
+    在瀏覽器上設定資源封鎖（每個瀏覽器只需設定一次，之後載入的頁面都會套用）
+
+    借自常駐瀏覽器服務的 Chrome 可能還留著上一個連線的設定，關閉封鎖時也會清空樣式。
+
+    Args:
+        driver: Chrome WebDriver
+        platform (str): BLOCKING_PROFILES 中的平台名稱
+        enabled (bool): 是否封鎖，None 表示依 BLOCK_RESOURCES
+
+    Returns:
+        bool: 是否已啟用封鎖
+    """
+    patterns = blocked_url_patterns(platform, enabled)
+    if not patterns and not getattr(driver, "_daemon_lease", None):
+        return False
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        return bool(patterns)
+    except Exception as e:
+        print(f"無法設定資源封鎖，改為載入所有資源: {e}")
+        return False
+
+
+def _category_of(url):
+    """找出網址符合的封鎖類別"""
+    for category, patterns in RESOURCE_CATEGORIES.items():
+        if any(url_matches(url, pattern) for pattern in patterns):
+            return category
+    return "other"
+
+
+def collect_network_stats(driver):
+    """
+    讀取並清空瀏覽器的 performance 日誌，統計上次呼叫之後的網路流量
+
+    需要在 Chrome 選項設定 goog:loggingPrefs 的 performance 日誌（見 browser_pool 的 network_log）。
+
+    Returns:
+        dict: {requests, transferred_bytes, blocked_requests, blocked_by_category}，無法讀取日誌時為 None
+    """
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return None
+
+    urls = {}
+    stats = {"requests": 0, "transferred_bytes": 0, "blocked_requests": 0, "blocked_by_category": {}}
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        method, params = message.get("method"), message.get("params", {})
+        if method == "Network.requestWillBeSent":
+            urls[params.get("requestId")] = params.get("request", {}).get("url", "")
+            stats["requests"] += 1
+        elif method == "Network.loadingFinished":
+            stats["transferred_bytes"] += int(params.get("encodedDataLength") or 0)
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            stats["blocked_requests"] += 1
+            category = _category_of(urls.get(params.get("requestId"), ""))
+            stats["blocked_by_category"][category] = stats["blocked_by_category"].get(category, 0) + 1
+    return stats
+
+
+def compare_page(url, profile, settle=3):
+    """
+    以同一個設定檔分別在「封鎖」與「不封鎖」下載入同一頁，量測實際節省的流量與時間
+
+    封鎖的請求不會下載，所以節省的位元組數只能這樣對照量得。
+
+    Args:
+        url (str): 要量測的網址
+        profile (str): browser_pool 的設定檔名稱
+        settle (float): 載入完成後再等待的秒數（讓懶載入與追蹤腳本發出請求）
+
+    Returns:
+        dict: {"url", "blocked": {...}, "unblocked": {...}, "bytes_saved", "seconds_saved"}
+    """
+    from browser_pool import create_driver, quit_driver
+
+    results = {"url": url}
+    for label, enabled in (("unblocked", False), ("blocked", True)):
+        driver = create_driver(profile, block_resources=enabled)
+        try:
+            collect_network_stats(driver)
+            started = time.perf_counter()
+            driver.get(url)
+            seconds = time.perf_counter() - started
+            time.sleep(settle)
+            stats = collect_network_stats(driver) or {}
+            stats["load_seconds"] = round(seconds, 3)
+            results[label] = stats
+        finally:
+            quit_driver(driver)
+
+    results["bytes_saved"] = (results["unblocked"].get("transferred_bytes", 0)
+                              - results["blocked"].get("transferred_bytes", 0))
+    results["seconds_saved"] = round(results["unblocked"]["load_seconds"] - results["blocked"]["load_seconds"], 3)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="比較同一頁在封鎖與不封鎖資源時的流量與載入時間")
+    parser.add_argument("url", help="要量測的網址（例如 momo 或 PChome 的搜尋頁）")
+    parser.add_argument("--profile", choices=list(BLOCKING_PROFILES), default="momo", help="瀏覽器設定檔（預設 momo）")
+    parser.add_argument("--settle", type=float, default=3, help="載入後再等待的秒數（預設 3）")
+    parser.add_argument("--no-save", action="store_true",
+                        help=f"不更新量測基準檔 {BLOCKING_BASELINE_FILE}（抓取指標以它估計節省的流量）")
+    args = parser.parse_args()
+
+    result = compare_page(args.url, args.profile, args.settle)
+    for label in ("unblocked", "blocked"):
+        stats = result[label]
+        print(f"{'不封鎖' if label == 'unblocked' else '封鎖'}：{stats.get('requests', 0)} 個請求，"
+              f"{stats.get('transferred_bytes', 0) / 1024:.1f} KB，載入 {stats['load_seconds']} 秒，"
+              f"封鎖 {stats.get('blocked_requests', 0)} 個 {stats.get('blocked_by_category', {})}")
+    print(f"每頁節省 {result['bytes_saved'] / 1024:.1f} KB，載入時間減少 {result['seconds_saved']} 秒")
+    if not args.no_save:
+        baseline = save_blocking_baseline(args.profile, result)
+        if baseline:
+            print(f"量測基準已寫入 {BLOCKING_BASELINE_FILE}：每個被封鎖的請求約 "
+                  f"{baseline['bytes_per_blocked_request'] / 1024:.1f} KB")
+        else:
+            print("封鎖時沒有擋下任何請求，未更新量測基準")
@@ -0,0 +1,264 @@
+from contextlib import contextmanager
+from collections import Counter
+from datetime import datetime
+import threading
+import json
+import time
+import os
+
+# 各項指標的說明（同時用於 Prometheus 的 HELP）
+METRIC_DESCRIPTIONS = {
+    "page_seconds": "逐頁抓取時各頁從載入到合併花費的秒數",
+    "fetch_seconds": "平行抓取時各頁在 worker 執行緒載入與解析花費的秒數（各頁同時進行，加總會大於實際經過時間）",
+    "merge_seconds": "平行抓取時依頁數順序合併各頁商品花費的秒數",
+    "navigation_seconds": "載入頁面（driver.get / HTTP 請求）花費的秒數",
+    "wait_seconds": "等待元素出現或頁面穩定花費的秒數",
+    "throttle_seconds": "速率限制器等待的秒數",
+    "parse_seconds": "解析商品花費的秒數",
+    "selector_misses": "商品列表選擇器沒有匹配的次數",
+    "parse_failures": "找到商品元素但無法解析出商品的次數",
+    "retries": "頁面重新載入或請求重試的次數",
+    "retry_wait_seconds": "重試前退避等待的秒數",
+    "webdriver_rpcs": "WebDriver 指令次數",
+    "http_requests": "HTTP 請求次數",
+    "network_requests": "瀏覽器發出的網路請求數",
+    "transferred_bytes": "瀏覽器實際下載的位元組數",
+    "blocked_requests": "被資源封鎖擋下的請求數",
+    "estimated_bytes_saved": "以 resource_blocking.py 比較工具的量測基準估計資源封鎖節省的位元組數（沒有基準時不記錄）",
+    "products_kept": "併入結果的商品數",
+    "products_duplicate": "因 SKU 重複而略過的商品數",
+    "products_unchanged": "增量模式下沒有變動而略過的商品數",
+    "incremental_stops": "增量模式下整頁商品都沒有變動而停止翻頁的次數"
+}
+
+_local = threading.local()
+_completed_runs = []
+_completed_runs_lock = threading.Lock()
+_report_sections = {}  # 名稱 -> 產生內容的函式，寫入執行報告時一併輸出
+
+
+class ScrapeRun:
+    """
+    一次抓取（一個平台 × 一個關鍵字）的指標，分別記錄每一頁與整次的累計
+    """
+
+    def __init__(self, platform, keyword):
+        """
+        Args:
+            platform (str): 平台名稱
+            keyword (str): 搜尋關鍵字
+        """
+        self.platform = platform
+        self.keyword = keyword
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.seconds = None
+        self.totals = Counter()
+        self.pages = {}  # 頁數 -> Counter
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, name, value=1, page=None):
+        """累加一項指標；指定 page 時同時記入該頁"""
+        with self._lock:
+            self.totals[name] += value
+            if page is not None:
+                self.pages.setdefault(page, Counter())[name] += value
+
+    @contextmanager
+    def page(self, page, timer="page_seconds"):
+        """
+        在 with 區塊內（同一執行緒）記錄的指標都歸到這一頁，並記錄區塊花費的秒數
+
+        平行抓取時同一頁會在 worker 執行緒抓取、再於呼叫端合併，兩段分別以
+        fetch_seconds 與 merge_seconds 記錄，避免重疊的抓取時間與合併時間混在 page_seconds。
+
+        Args:
+            page (int): 頁數
+            timer (str): 記錄秒數的指標名稱
+        """
+        previous = (getattr(_local, "run", None), getattr(_local, "page", None))
+        _local.run, _local.page = self, page
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(timer, time.perf_counter() - started, page)
+            _local.run, _local.page = previous
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self._started
+
+    def report(self):
+        """
+        Returns:
+            dict: 可直接輸出成 JSON 的指標
+        """
+        with self._lock:
+            return {
+                "platform": self.platform,
+                "keyword": self.keyword,
+                "started_at": self.started_at,
+                "seconds": round(self.seconds or time.perf_counter() - self._started, 3),
+                "page_count": len(self.pages),
+                "totals": _rounded(self.totals),
+                "pages": [dict(_rounded(self.pages[page]), page=page) for page in sorted(self.pages)]
+            }
+
+
+def _rounded(counter):
+    return {name: round(value, 3) if isinstance(value, float) else value for name, value in counter.items()}
+
+
+def start_run(platform, keyword):
+    """
+    開始記錄一次抓取，之後在同一執行緒記錄的指標都歸到這次抓取
+
+    Returns:
+        ScrapeRun: 這次抓取的指標
+    """
+    run = ScrapeRun(platform, keyword)
+    _local.run, _local.page = run, None
+    return run
+
+
+def finish_run(run):
+    """結束記錄一次抓取，加入本行程的執行報告"""
+    run.finish()
+    if getattr(_local, "run", None) is run:
+        _local.run, _local.page = None, None
+    with _completed_runs_lock:
+        _completed_runs.append(run)
+
+
+def current_run():
+    """取得目前執行緒正在記錄的抓取（沒有時為 None），用於把指標帶到 worker 執行緒"""
+    return getattr(_local, "run", None)
+
+
+@contextmanager
+def page_scope(page, run=None, timer="page_seconds"):
+    """
+    run.page 的安全版本：沒有正在記錄的抓取時不做任何事
+
+    Args:
+        page (int): 頁數
+        run (ScrapeRun): 要記錄的抓取，預設為目前執行緒的抓取
+        timer (str): 記錄秒數的指標名稱（平行抓取時為 fetch_seconds 或 merge_seconds）
+    """
+    run = run or current_run()
+    if run is None:
+        yield
+        return
+    with run.page(page, timer):
+        yield
+
+
+def record(name, value=1):
+    """在目前執行緒正在記錄的抓取（與頁面）上累加一項指標，沒有時忽略"""
+    run = getattr(_local, "run", None)
+    if run is not None:
+        run.add(name, value, getattr(_local, "page", None))
+
+
+@contextmanager
+def timed(name):
+    """以 with 區塊計時，秒數累加到指定指標"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+
+def install_webdriver_counter():
+    """讓每個 WebDriver 指令都記入 webdriver_rpcs（只安裝一次）"""
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+    if getattr(WebDriver.execute, "_counts_rpcs", False):
+        return
+    original_execute = WebDriver.execute
+
+    def execute(self, driver_command, params=None):
+        record("webdriver_rpcs")
+        return original_execute(self, driver_command, params)
+
+    execute._counts_rpcs = True
+    WebDriver.execute = execute
+
+
+def add_report_section(name, provider):
+    """
+    在 JSON 執行報告中加入一個區段（例如斷路器狀態）
+
+    Args:
+        name (str): 區段名稱
+        provider (callable): 不帶參數、回傳可轉成 JSON 的內容的函式
+    """
+    _report_sections[name] = provider
+
+
+def completed_reports():
+    """
+    Returns:
+        list: 本行程已完成的每次抓取的指標
+    """
+    with _completed_runs_lock:
+        return [run.report() for run in _completed_runs]
+
+
+def write_json_report(path):
+    """將本行程所有抓取的指標寫成 JSON 執行報告"""
+    output_dir = os.path.dirname(path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "runs": completed_reports(),
+            **{name: provider() for name, provider in _report_sections.items()}
+        }, f, ensure_ascii=False, indent=4)
+    print(f"抓取指標已寫入 {path}")
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def write_prometheus(path):
+    """
+    將本行程所有抓取的累計指標寫成 Prometheus 文字格式（可給 node_exporter 的 textfile collector 讀取）
+
+    同一個平台 × 關鍵字抓取多次時（例如批次清單重複或重試）合併成一個時間序列，
+    Prometheus 不接受同名且標籤相同的重複樣本。
+    """
+    series = {}  # (platform, keyword) -> Counter
+    for report in completed_reports():
+        totals = series.setdefault((report["platform"], report["keyword"]), Counter())
+        totals.update(report["totals"])
+        totals["runs"] += 1
+        totals["run_seconds"] += report["seconds"]
+        totals["pages"] += report["page_count"]
+    lines = []
+
+    def metric(name, help_text, metric_type, field):
+        lines.append(f"# HELP scraper_{name} {help_text}")
+        lines.append(f"# TYPE scraper_{name} {metric_type}")
+        for (platform, keyword), totals in series.items():
+            value = totals.get(field, 0)
+            lines.append(f'scraper_{name}{{platform="{_label(platform)}",keyword="{_label(keyword)}"}} '
+                         f'{round(value, 3) if isinstance(value, float) else value}')
+
+    metric("runs_total", "抓取次數", "counter", "runs")
+    metric("run_seconds_total", "抓取花費的秒數", "counter", "run_seconds")
+    metric("pages_total", "抓取的頁數", "counter", "pages")
+    for name, help_text in METRIC_DESCRIPTIONS.items():
+        metric(f"{name}_total", help_text, "counter", name)
+
+    output_dir = os.path.dirname(path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(temp_path, path)
+    print(f"Prometheus 指標已寫入 {path}")
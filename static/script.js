@@ -93,9 +93,12 @@ function renderTable(momoIndex = "all") {
       const title = momoProduct.title
         .replace(/"/g, "&quot;")
         .replace(/'/g, "&apos;");
-      const imageUrl =
-        momoProduct.image_url ||
-        "https://via.placeholder.com/300x200?text=No+Image";
+      // 優先使用本機縮圖；預先下載時已判定為壞圖的直接顯示預設圖片
+      const imageUrl = momoProduct.image_broken
+        ? "https://via.placeholder.com/300x200?text=圖片載入失敗"
+        : momoProduct.thumbnail_url ||
+          momoProduct.image_url ||
+          "https://via.placeholder.com/300x200?text=No+Image";
       rowHtml += `
                 <td>
                     <div class="product-card" id="momo-card-${
@@ -155,6 +158,11 @@ function renderTable(momoIndex = "all") {
       if (!imageUrl || !imageUrl.startsWith("http")) {
         imageUrl = "https://via.placeholder.com/300x200?text=No+Image";
       }
+      if (pchomeProduct.image_broken) {
+        imageUrl = "https://via.placeholder.com/300x200?text=圖片載入失敗";
+      } else if (pchomeProduct.thumbnail_url) {
+        imageUrl = pchomeProduct.thumbnail_url;
+      }
       rowHtml += `
                 <td>
                     <div class="product-card" id="pchome-card-${
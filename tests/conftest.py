@@ -0,0 +1,13 @@
+from fixture_server import FIXTURE_DIR
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("scraper-benchmark", "爬蟲離線效能測試（tests/test_scraper_benchmark.py）")
+    group.addoption("--benchmark-keywords", default="",
+                    help="已錄製的搜尋關鍵字，以逗號分隔（先執行 fixture_server.py record）；"
+                         "未指定時只以產生的小型回放資料檢查效能測試本身")
+    group.addoption("--benchmark-engines", default="", help="要測試的引擎，以逗號分隔（預設全部）")
+    group.addoption("--benchmark-count", type=int, default=60, help="每次抓取的商品數量（預設 60）")
+    group.addoption("--fixture-dir", default=FIXTURE_DIR, help=f"錄製檔案的資料夾（預設 {FIXTURE_DIR}）")
+    group.addoption("--benchmark-report", default="benchmark_report.json", help="結果輸出檔案")
+    group.addoption("--benchmark-baseline", help="先前的結果檔案，每秒商品數明顯下降時測試失敗")
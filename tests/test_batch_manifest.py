@@ -0,0 +1,18 @@
+import json
+
+from product_scraper import load_manifest
+
+
+def test_load_manifest_csv_defaults_query_and_count(tmp_path):
+    path = tmp_path / "queries.csv"
+    path.write_text("keyword,query,count\n手機,phone,30\n耳機,,\n,skipped,10\n", encoding="utf-8-sig")
+    assert load_manifest(str(path)) == [
+        {"keyword": "手機", "query": "phone", "count": 30},
+        {"keyword": "耳機", "query": "耳機", "count": 50},
+    ]
+
+
+def test_load_manifest_json(tmp_path):
+    path = tmp_path / "queries.json"
+    path.write_text(json.dumps([{"keyword": " 滑鼠 ", "count": 5}]), encoding="utf-8")
+    assert load_manifest(str(path)) == [{"keyword": "滑鼠", "query": "滑鼠", "count": 5}]
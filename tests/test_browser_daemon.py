@@ -0,0 +1,208 @@
+import threading
+
+import pytest
+import requests
+from selenium.common.exceptions import WebDriverException
+
+import browser_daemon
+import browser_pool
+from browser_daemon import BrowserDaemon, _free_port, attach_driver, detach_driver
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.current = handle
+
+
+class FakeChrome:
+    """取代 webdriver.Chrome：記錄啟動選項與收到的指令，不啟動真的瀏覽器"""
+    launched = []
+
+    def __init__(self, options=None):
+        self.options = options
+        self.window_handles = ["main", "popup"]
+        self.switch_to = FakeSwitchTo(self)
+        self.commands = []
+        self.healthy = True
+        self.quit_called = False
+        FakeChrome.launched.append(self)
+
+    def __getattribute__(self, name):
+        if name == "window_handles" and not object.__getattribute__(self, "healthy"):
+            raise WebDriverException("瀏覽器已關閉")
+        return object.__getattribute__(self, name)
+
+    def close(self):
+        self.window_handles = [handle for handle in self.window_handles if handle != self.current]
+
+    def get(self, url):
+        self.commands.append(("get", url))
+
+    def execute_cdp_cmd(self, command, params):
+        self.commands.append((command, params))
+
+    def set_page_load_timeout(self, seconds):
+        self.commands.append(("page_load_timeout", seconds))
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture(autouse=True)
+def fake_chrome(monkeypatch):
+    FakeChrome.launched = []
+    monkeypatch.setattr(browser_daemon.webdriver, "Chrome", FakeChrome)
+    return FakeChrome
+
+
+@pytest.fixture
+def daemon():
+    daemon = BrowserDaemon(port=0, max_instances=2)
+    thread = threading.Thread(target=daemon.httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield daemon
+    daemon.stop()
+    daemon.close_all()
+    thread.join()
+
+
+def _close(daemon):
+    """沒有啟動 HTTP 服務的 daemon 只需關閉 socket（httpd.shutdown 會等待 serve_forever 結束）"""
+    daemon.httpd.server_close()
+    daemon.close_all()
+
+
+def _post(daemon, path, payload):
+    return requests.post(f"http://{daemon.address}{path}", json=payload, timeout=5)
+
+
+def test_attach_status_release_over_http(daemon):
+    response = _post(daemon, "/attach", {"profile": "probe"})
+    assert response.status_code == 200
+    lease = response.json()
+    assert lease["profile"] == "probe" and lease["debugger_address"].startswith("127.0.0.1:")
+    chrome = FakeChrome.launched[0]
+    assert any(argument.startswith("--remote-debugging-port=") for argument in chrome.options.arguments)
+
+    status = requests.get(f"http://{daemon.address}/status", timeout=5).json()
+    assert status["stats"]["launched"] == 1 and status["instances"][0]["leased"]
+
+    assert _post(daemon, "/release", {"lease": lease["lease"]}).json() == {"released": True}
+    # 歸還時關閉多餘分頁並清除 cookie、快取與網站資料
+    assert chrome.window_handles == ["main"]
+    assert ("Network.clearBrowserCookies", {}) in chrome.commands
+    assert ("Network.clearBrowserCache", {}) in chrome.commands
+
+    # 閒置的瀏覽器直接借給下一個連線，不重新啟動
+    assert _post(daemon, "/attach", {"profile": "probe"}).json()["debugger_address"] == lease["debugger_address"]
+    assert len(FakeChrome.launched) == 1
+
+
+def test_http_errors(daemon):
+    assert _post(daemon, "/release", {"lease": "unknown"}).status_code == 404
+    assert _post(daemon, "/attach", {"profile": "unknown"}).status_code == 503
+    assert requests.post(f"http://{daemon.address}/attach", data=b"{", timeout=5).status_code == 400
+    assert requests.get(f"http://{daemon.address}/missing", timeout=5).status_code == 404
+
+
+def test_rejects_attach_over_max_instances(daemon):
+    for _ in range(2):
+        assert _post(daemon, "/attach", {"profile": "momo"}).status_code == 200
+    response = _post(daemon, "/attach", {"profile": "momo"})
+    assert response.status_code == 503
+    assert daemon.status()["stats"]["rejected"] == 1
+
+
+def test_reaper_reclaims_expired_lease():
+    daemon = BrowserDaemon(port=0, lease_timeout=60)
+    try:
+        lease = daemon.attach("probe")["lease"]
+        daemon.reap()
+        assert daemon.status()["instances"][0]["leased"]
+
+        daemon.lease_timeout = -1
+        daemon.reap()
+        assert not daemon.status()["instances"][0]["leased"]
+        assert ("Network.clearBrowserCookies", {}) in FakeChrome.launched[0].commands
+        # 借用已被收回，原本的連線再歸還會被忽略
+        assert not daemon.release(lease)
+    finally:
+        _close(daemon)
+
+
+def test_reaper_closes_idle_browsers_but_keeps_warm():
+    daemon = BrowserDaemon(port=0, idle_timeout=-1, warm={"probe": 1})
+    try:
+        leases = [daemon.attach("probe")["lease"] for _ in range(2)] + [daemon.attach("momo")["lease"]]
+        for lease in leases:
+            daemon.release(lease)
+        daemon.reap()
+        assert [instance["profile"] for instance in daemon.status()["instances"]] == ["probe"]
+        assert daemon.status()["stats"]["reaped"] == 2
+        assert sum(chrome.quit_called for chrome in FakeChrome.launched) == 2
+    finally:
+        _close(daemon)
+
+
+def test_unhealthy_idle_browser_is_replaced():
+    daemon = BrowserDaemon(port=0)
+    try:
+        daemon.release(daemon.attach("probe")["lease"])
+        FakeChrome.launched[0].healthy = False
+        daemon.attach("probe")
+        assert len(FakeChrome.launched) == 2 and FakeChrome.launched[0].quit_called
+        assert len(daemon.status()["instances"]) == 1
+    finally:
+        _close(daemon)
+
+
+def test_failed_reset_closes_browser():
+    daemon = BrowserDaemon(port=0)
+    try:
+        lease = daemon.attach("probe")["lease"]
+        FakeChrome.launched[0].healthy = False
+        assert daemon.release(lease)
+        assert daemon.status()["instances"] == [] and FakeChrome.launched[0].quit_called
+    finally:
+        _close(daemon)
+
+
+def test_attach_and_detach_driver(daemon):
+    driver = attach_driver("pchome", daemon.address)
+    address, lease = driver._daemon_lease
+    assert address == daemon.address
+    # chromedriver 以 debugger_address 連上服務中的瀏覽器
+    assert driver.options.debugger_address == daemon.status()["instances"][0]["debugger_address"]
+    assert daemon.status()["instances"][0]["leased"]
+
+    assert detach_driver(driver)
+    assert driver.quit_called and not daemon.status()["instances"][0]["leased"]
+    assert not detach_driver(FakeChrome())
+
+
+def test_attach_driver_releases_lease_when_chromedriver_fails(daemon, monkeypatch):
+    daemon.release(daemon.attach("probe")["lease"])  # 先啟動服務中的瀏覽器
+
+    def failing_chrome(options=None):
+        raise WebDriverException("無法連上")
+
+    monkeypatch.setattr(browser_daemon.webdriver, "Chrome", failing_chrome)
+    assert attach_driver("probe", daemon.address) is None
+    assert not daemon.status()["instances"][0]["leased"]
+
+
+def test_create_driver_falls_back_to_local_chrome_when_daemon_is_unreachable(monkeypatch):
+    local = []
+    monkeypatch.setattr(browser_pool, "BROWSER_DAEMON", f"127.0.0.1:{_free_port()}")
+    monkeypatch.setattr(browser_pool.webdriver, "Chrome", lambda options: local.append(FakeChrome(options)) or local[-1])
+
+    driver = browser_pool.create_driver("probe")
+    assert driver is local[0] and not hasattr(driver, "_daemon_lease")
+    assert ("page_load_timeout", browser_pool.BROWSER_PROFILES["probe"]["page_load_timeout"]) in driver.commands
+    assert not driver.options.debugger_address
+
+    browser_pool.quit_driver(driver)
+    assert driver.quit_called
@@ -0,0 +1,104 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import check_product_count
+from check_product_count import CountCache, estimate_check_seconds, _check_product_count
+from rate_limiter import HostRateLimiter
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(check_product_count.time, "time", clock.time)
+    return clock
+
+
+def test_cache_entries_expire_after_ttl(tmp_path, clock):
+    cache = CountCache(str(tmp_path / "counts.json"), ttl=60)
+    cache.set("momo", "手機", 500, True)
+    assert cache.get("momo", "手機", 100)["count"] == 500
+
+    clock.now += 60
+    assert cache.get("momo", "手機", 100) is not None
+    clock.now += 1
+    assert cache.get("momo", "手機", 100) is None
+
+
+def test_lower_bound_only_answers_smaller_targets(tmp_path, clock):
+    cache = CountCache(str(tmp_path / "counts.json"), ttl=60)
+    cache.set("momo", "耳機", 120, False)
+    assert cache.get("momo", "耳機", 100)["exact"] is False
+    assert cache.get("momo", "耳機", 200) is None
+
+
+def test_save_drops_expired_entries_and_reloads(tmp_path, clock):
+    path = str(tmp_path / "counts.json")
+    cache = CountCache(path, ttl=60)
+    cache.set("momo", "舊", 10, True)
+    clock.now += 30
+    cache.set("pchome", "新", 20, True)
+    clock.now += 40
+    cache.save()
+
+    with open(path, encoding="utf-8") as f:
+        assert list(json.load(f)) == ["pchome:新"]
+    reloaded = CountCache(path, ttl=60)
+    assert reloaded.get("pchome", "新", 20)["count"] == 20
+    assert reloaded.get("momo", "舊", 10) is None
+
+
+def test_corrupt_cache_file_starts_empty(tmp_path):
+    path = tmp_path / "counts.json"
+    path.write_text("{not json", encoding="utf-8")
+    assert CountCache(str(path)).get("momo", "手機", 1) is None
+
+
+def test_cached_result_skips_counter(tmp_path, clock, monkeypatch):
+    cache = CountCache(str(tmp_path / "counts.json"), ttl=60)
+    cache.set("pchome", "手機", 80, True)
+    monkeypatch.setitem(check_product_count.PLATFORM_COUNTERS, "pchome",
+                        lambda keyword, target: pytest.fail("不應重新檢查"))
+    result = _check_product_count("pchome", "手機", 100, cache)
+    assert result["cached"] and not result["has_enough"] and result["actual_count"] == 80
+
+    monkeypatch.setitem(check_product_count.PLATFORM_COUNTERS, "pchome", lambda keyword, target: (150, True))
+    result = _check_product_count("pchome", "手機", 100, cache, refresh=True)
+    assert not result["cached"] and result["has_enough"]
+    assert cache.get("pchome", "手機", 100)["count"] == 150
+
+
+def test_estimate_follows_momo_rate(tmp_path, clock, monkeypatch):
+    limiter = HostRateLimiter()
+    monkeypatch.setattr(check_product_count, "get_rate_limiter", lambda: limiter)
+    cache = CountCache(str(tmp_path / "counts.json"), ttl=60)
+    cache.set("momo", "k0", 500, True)
+    jobs = [(f"k{index}", platform) for index in range(11) for platform in ("momo", "pchome")]
+
+    estimates = estimate_check_seconds(jobs, 100, cache)
+    # momo 預設每秒 0.5 個請求、突發 2 個：10 個未快取的關鍵字至少 (10 - 2) / 0.5 秒
+    assert estimates["momo"] == {"requests": 10, "rate": 0.5, "seconds": 16.0}
+    assert estimates["pchome"]["requests"] == 11
+    assert estimate_check_seconds(jobs, 100, cache, refresh=True)["momo"]["requests"] == 11
+
+    limiter.configure("www.momoshop.com.tw", 2.0, 4)
+    assert estimate_check_seconds(jobs, 100, cache)["momo"]["seconds"] == 3.0
+
+
+def test_does_not_import_the_scraper():
+    # 在新的行程中檢查：同一個 pytest 行程內其他測試已匯入 product_scraper
+    code = "import sys, check_product_count; print('product_scraper' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+    assert output.strip() == "False"
@@ -0,0 +1,83 @@
+import pytest
+import requests
+
+import product_scraper
+from product_scraper import ScrapeCheckpoint, ScrapeInterrupted, _open_checkpoint
+
+
+def test_checkpoint_round_trip(tmp_path):
+    checkpoint = ScrapeCheckpoint("momo", "藍牙 耳機", str(tmp_path))
+    products = [{"sku": "1", "title": "耳機"}]
+    checkpoint.save(3, products, {"1"})
+    assert checkpoint.load() == (3, products, {"1"})
+
+
+def test_checkpoint_for_other_keyword_is_ignored(tmp_path):
+    ScrapeCheckpoint("momo", "a/b", str(tmp_path)).save(2, [], set())
+    # 檔名相同（特殊字元都換成底線），但關鍵字不同
+    assert ScrapeCheckpoint("momo", "a b", str(tmp_path)).load() is None
+
+
+def test_finish_keeps_interrupted_checkpoint(tmp_path):
+    checkpoint = ScrapeCheckpoint("pchome", "手機", str(tmp_path))
+    checkpoint.save(2, [], set())
+    checkpoint.interrupted = True
+    checkpoint.finish()
+    assert checkpoint.load() is not None
+
+    checkpoint.interrupted = False
+    checkpoint.finish()
+    assert checkpoint.load() is None
+
+
+def test_open_checkpoint_resumes_only_when_requested(tmp_path):
+    ScrapeCheckpoint("momo", "手機", str(tmp_path)).save(4, [{"sku": "9"}], {"9"})
+    _, start_page, products, seen = _open_checkpoint("momo", "手機", str(tmp_path), resume=False)
+    assert (start_page, products, seen) == (1, [], set())
+    _, start_page, products, seen = _open_checkpoint("momo", "手機", str(tmp_path), resume=True)
+    assert (start_page, products, seen) == (4, [{"sku": "9"}], {"9"})
+    assert _open_checkpoint("momo", "手機", None, resume=True) == (None, 1, [], set())
+
+
+def test_named_checkpoints_do_not_collide(tmp_path):
+    first = ScrapeCheckpoint("momo", "手機", str(tmp_path), name="job1_momo")
+    second = ScrapeCheckpoint("momo", "手機", str(tmp_path), name="job2_momo")
+    first.save(3, [], set())
+    assert first.path != second.path and second.load() is None
+
+
+def _api_page(page):
+    prods = [{"Id": f"P{page}-{index}", "name": f"商品 {page}-{index}", "price": 100} for index in range(20)]
+    return {"totalRows": 60, "totalPage": 3, "prods": prods}
+
+
+@pytest.fixture
+def failing_second_page(monkeypatch):
+    def fetch_page(keyword, page):
+        if page == 2:
+            raise requests.ConnectionError("連線中斷")
+        return _api_page(page)
+
+    monkeypatch.setattr(product_scraper, "_fetch_pchome_api_page", fetch_page)
+
+
+def test_interrupted_scrape_returns_partial_products_by_default(tmp_path, failing_second_page):
+    products = product_scraper.fetch_products_for_pchome("手機", 60, workers=1, checkpoint_dir=str(tmp_path))
+    assert len(products) == 20
+    assert ScrapeCheckpoint("pchome", "手機", str(tmp_path)).load()[0] == 2
+
+
+def test_interrupted_scrape_raises_when_requested(tmp_path, failing_second_page):
+    with pytest.raises(ScrapeInterrupted) as info:
+        product_scraper.fetch_products_for_pchome("手機", 60, workers=1, checkpoint_dir=str(tmp_path),
+                                                  checkpoint_name="job7_pchome", raise_on_interrupt=True)
+    assert len(info.value.products) == 20
+    assert info.value.checkpoint_path == str(tmp_path / "job7_pchome.json")
+    assert ScrapeCheckpoint("pchome", "手機", str(tmp_path), name="job7_pchome").load()[0] == 2
+
+
+def test_completed_scrape_does_not_raise(tmp_path, monkeypatch):
+    monkeypatch.setattr(product_scraper, "_fetch_pchome_api_page", lambda keyword, page: _api_page(page))
+    products = product_scraper.fetch_products_for_pchome("手機", 40, workers=1, checkpoint_dir=str(tmp_path),
+                                                         raise_on_interrupt=True)
+    assert len(products) == 40 and list(tmp_path.iterdir()) == []
@@ -0,0 +1,118 @@
+import threading
+
+import pytest
+from mysql.connector import errors
+
+import db_pool
+from db_pool import MySQLPool
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.alive = True
+        self.closed = False
+        self.in_transaction = False
+        self.rollbacks = 0
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise errors.InterfaceError("連線已中斷")
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    """以假連線取代 mysql.connector.connect，回傳建立過的連線"""
+    created = []
+
+    def connect(**config):
+        if config.get("fail"):
+            raise errors.InterfaceError("無法連線")
+        created.append(FakeConnection(len(created)))
+        return created[-1]
+
+    monkeypatch.setattr(db_pool.mysql.connector, "connect", connect)
+    return created
+
+
+def test_reuses_released_connections(connections):
+    pool = MySQLPool(size=2, config={"host": "fake"})
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    report = pool.report()
+    assert len(connections) == 1
+    assert report["created"] == 1 and report["reused"] == 1 and report["in_use"] == 1 and report["idle"] == 0
+
+
+def test_waits_then_times_out_when_exhausted(connections):
+    pool = MySQLPool(size=1, timeout=0.05, config={"host": "fake"})
+    conn = pool.acquire()
+    with pytest.raises(errors.PoolError):
+        pool.acquire()
+    assert pool.report()["timeouts"] == 1
+
+    timer = threading.Timer(0.05, pool.release, (conn,))
+    timer.start()
+    pool.timeout = 5
+    assert pool.acquire() is conn
+    timer.join()
+    assert pool.report()["waits"] == 2
+
+
+def test_stale_connection_is_validated_and_replaced(connections):
+    pool = MySQLPool(size=1, validate_after=0, config={"host": "fake"})
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.alive = False
+
+    replacement = pool.acquire()
+    assert replacement is not conn and conn.closed
+    report = pool.report()
+    assert report["invalid"] == 1 and report["discarded"] == 1 and report["open"] == 1
+
+
+def test_release_rolls_back_open_transaction(connections):
+    pool = MySQLPool(size=1, config={"host": "fake"})
+    conn = pool.acquire()
+    conn.in_transaction = True
+    pool.release(conn)
+    assert conn.rollbacks == 1 and pool.report()["idle"] == 1
+
+
+def test_broken_connection_is_not_returned(connections):
+    pool = MySQLPool(size=1, config={"host": "fake"})
+    with pytest.raises(errors.OperationalError):
+        with pool.connection() as conn:
+            raise errors.OperationalError("MySQL server has gone away")
+    assert conn.closed
+    assert pool.report()["open"] == 0
+
+    with pytest.raises(errors.ProgrammingError):
+        with pool.connection() as conn:
+            raise errors.ProgrammingError("語法錯誤")
+    assert not conn.closed and pool.report()["idle"] == 1
+
+
+def test_failed_connect_releases_slot(connections):
+    pool = MySQLPool(size=1, timeout=0.05, config={"fail": True})
+    with pytest.raises(errors.InterfaceError):
+        pool.acquire()
+    pool.config = {"host": "fake"}
+    assert pool.acquire() is connections[0]
+
+
+def test_close_all_closes_idle_connections(connections):
+    pool = MySQLPool(size=2, config={"host": "fake"})
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool.close_all()
+    assert first.closed and not second.closed
+    assert pool.report()["open"] == 1
@@ -0,0 +1,86 @@
+import re
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from mysql.connector import Error
+
+import db_schema
+from db_schema import INDEXED_QUERIES, TABLES, check_query_plans, create_table_sql, get_db_pool, migrate
+
+
+def test_indexed_queries_filter_on_a_leading_key_column():
+    for description, query, params in INDEXED_QUERIES:
+        database, table, column = re.search(r"FROM (\w+)\.(\w+) WHERE (\w+) = %s", query).groups()
+        assert TABLES[table]["database"] == database
+        assert any(columns[0] == column for _, _, columns in TABLES[table]["keys"]), description
+
+
+def test_create_table_sql_contains_every_key():
+    sql = create_table_sql("pchome_products", qualified=False)
+    assert sql.startswith("CREATE TABLE IF NOT EXISTS `pchome_products`")
+    assert "PRIMARY KEY (`id`)" in sql and "UNIQUE KEY `sku` (`sku`)" in sql and "KEY `idx_query` (`query`)" in sql
+
+
+class FakeCursor:
+    """依查詢回傳事先準備的 EXPLAIN 結果"""
+    description = [("table",), ("type",), ("key",), ("rows",), ("Extra",)]
+
+    def __init__(self, plans):
+        self.plans = plans
+        self.row = None
+
+    def execute(self, query, params):
+        self.row = self.plans(query)
+
+    def fetchone(self):
+        return self.row
+
+    def fetchall(self):
+        return []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakePool:
+    def __init__(self, plans):
+        self.plans = plans
+
+    @contextmanager
+    def connection(self):
+        yield SimpleNamespace(cursor=lambda: FakeCursor(self.plans))
+
+
+def test_check_query_plans_flags_full_scans(monkeypatch):
+    def plans(query):
+        if "pchome_products WHERE sku" in query:
+            return ("pchome_products", None, None, None, "no matching row in const table")
+        if "momo_products WHERE query" in query:
+            return ("momo_products", "ALL", None, 1000, "Using where")
+        return ("t", "ref", "idx", 1, None)
+
+    monkeypatch.setattr(db_schema, "get_db_pool", lambda: FakePool(plans))
+    failed = [result["description"] for result in check_query_plans() if not result["ok"]]
+    assert failed == ["以 query 查詢 momo_products"]
+
+
+@pytest.fixture(scope="module")
+def mysql_available():
+    try:
+        with get_db_pool().connection():
+            pass
+    except Error as e:
+        pytest.skip(f"無法連線到 MySQL: {e}")
+
+
+def test_common_queries_use_indexes(mysql_available):
+    migrate()
+    results = check_query_plans()
+    full_scans = [f"{result['description']}: type={result['type']}, key={result['key']}"
+                  for result in results if not result["ok"]]
+    assert len(results) == len(INDEXED_QUERIES)
+    assert not full_scans
@@ -0,0 +1,82 @@
+from io import BytesIO
+
+import pytest
+import requests
+from PIL import Image
+
+from image_cache import ImageCache, normalize_image_url
+
+
+def _png(width, height, color=(200, 30, 30, 255)):
+    output = BytesIO()
+    Image.new("RGBA", (width, height), color).save(output, "PNG")
+    return output.getvalue()
+
+
+class FakeResponse:
+    def __init__(self, content, status=200):
+        self.content = content
+        self.status_code = status
+        self.headers = {"Content-Type": "image/png"}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("//img.momo/1.jpg", "https://img.momo/1.jpg"),
+    ("/items/1.jpg", "https://cs.ecimg.tw/items/1.jpg"),
+    ("https://cdn/1.jpg", "https://cdn/1.jpg"),
+    ("無圖片", ""),
+    (None, ""),
+])
+def test_normalize_image_url(url, expected):
+    assert normalize_image_url(url) == expected
+
+
+def test_make_thumbnail_resizes_to_jpeg(tmp_path):
+    cache = ImageCache(str(tmp_path), size=(100, 100))
+    thumbnail, extension = cache._make_thumbnail(_png(400, 200))
+    assert extension == ".jpg"
+    image = Image.open(BytesIO(thumbnail))
+    assert image.format == "JPEG"
+    assert image.size == (100, 50)
+
+
+def test_make_thumbnail_rejects_non_images(tmp_path):
+    with pytest.raises(ValueError):
+        ImageCache(str(tmp_path))._make_thumbnail(b"<html>not found</html>")
+
+
+def test_prefetch_and_annotate(tmp_path, monkeypatch):
+    responses = {
+        "https://cdn/a.png": FakeResponse(_png(600, 600)),
+        "https://cdn/same.png": FakeResponse(_png(600, 600)),
+        "https://cdn/missing.png": FakeResponse(b"", status=404),
+        "https://cdn/text.png": FakeResponse(b"not an image"),
+    }
+    requested = []
+    cache = ImageCache(str(tmp_path / "cache"))
+
+    def fake_get(url, timeout):
+        requested.append(url)
+        return responses[url]
+
+    monkeypatch.setattr(cache._session, "get", fake_get)
+    products = [{"image_url": url} for url in responses] + [{"image_url": "無圖片"}]
+    assert cache.prefetch(products, workers=2) == {"fetched": 2, "cached": 0, "broken": 2}
+    # 相同內容的圖片只存一份
+    assert len(list((tmp_path / "cache").glob("*.jpg"))) == 1
+
+    # 已處理過的網址（包含壞圖）不會重複下載
+    requested.clear()
+    assert cache.prefetch(products)["cached"] == 4
+    assert requested == []
+
+    annotated = ImageCache(str(tmp_path / "cache")).annotate([dict(product) for product in products])
+    assert annotated[0]["thumbnail_url"] == annotated[1]["thumbnail_url"]
+    assert annotated[0]["thumbnail_url"].startswith("/thumbnails/")
+    assert annotated[2] == {"image_url": "https://cdn/missing.png", "image_broken": True}
+    assert annotated[3]["image_broken"] is True
+    assert "image_broken" not in annotated[4]
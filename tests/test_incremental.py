@@ -0,0 +1,74 @@
+import pytest
+
+from product_history import ProductHistory
+from product_scraper import _merge_page_products, _should_stop_momo, MOMO_SHORT_PAGE_THRESHOLD
+from scrape_metrics import start_run, finish_run, page_scope
+
+
+def _product(sku, price=100, title=None):
+    return {"sku": sku, "title": title or f"商品 {sku}", "price": price, "image_url": "", "url": f"/goods/{sku}"}
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = ProductHistory(str(tmp_path / "history.db"))
+    yield history
+    history.close()
+
+
+def test_history_diff_and_price_history(history):
+    history.record("momo", [_product("1", 100), _product("2", 200)])
+    fresh, unchanged = history.diff("momo", [_product("1", 100), _product("2", 180), _product("3")])
+    assert [p["sku"] for p in fresh] == ["2", "3"]
+    assert [p["sku"] for p in unchanged] == ["1"]
+
+    history.record("momo", [_product("2", 180)])
+    assert [price for price, _ in history.price_history("momo", "2")] == [200, 180]
+    # 平台各自獨立
+    assert history.diff("pchome", [_product("1", 100)])[1] == []
+
+
+def test_merge_skips_duplicates_and_numbers_products():
+    products, seen = [], set()
+    assert _merge_page_products([_product("1"), _product("2")], products, seen, 10, "momo") == (2, 0)
+    assert _merge_page_products([_product("2"), _product("3")], products, seen, 10, "momo") == (1, 0)
+    assert [(p["id"], p["sku"], p["platform"]) for p in products] == [(1, "1", "momo"), (2, "2", "momo"),
+                                                                       (3, "3", "momo")]
+    assert _merge_page_products([_product("4"), _product("5")], products, seen, 4, "momo") == (1, 0)
+    assert len(products) == 4
+
+
+def test_incremental_page_without_changes_is_reported_separately(history, capsys):
+    history.record("momo", [_product(str(n)) for n in range(30)])
+    page = [_product(str(n)) for n in range(30)]
+
+    run = start_run("momo", "test")
+    try:
+        with page_scope(2):
+            added, unchanged = _merge_page_products(page, [], set(), 100, "momo", history=history)
+    finally:
+        finish_run(run)
+    assert (added, unchanged) == (0, 30)
+    assert run.totals["incremental_stops"] == 1
+    assert run.totals["products_unchanged"] == 30
+
+    capsys.readouterr()
+    assert _should_stop_momo(2, 30, added, [], 100, unchanged) is True
+    output = capsys.readouterr().out
+    assert "沒有找到有效商品" not in output
+
+
+def test_should_stop_momo_reasons(capsys):
+    full_page = MOMO_SHORT_PAGE_THRESHOLD + 10
+
+    assert _should_stop_momo(1, 0, 0, [], 100) is True
+    assert "無法找到商品元素" in capsys.readouterr().out
+
+    assert _should_stop_momo(1, MOMO_SHORT_PAGE_THRESHOLD - 1, 5, [], 100) is True
+    assert "最後一頁" in capsys.readouterr().out
+
+    assert _should_stop_momo(1, full_page, 0, [], 100) is True
+    assert "沒有找到有效商品" in capsys.readouterr().out
+
+    assert _should_stop_momo(1, full_page, 30, [{}] * 30, 100) is False
+    assert _should_stop_momo(1, full_page, 30, [{}] * 100, 100) is True
@@ -0,0 +1,69 @@
+import pytest
+from mysql.connector import errors
+
+from db_pool import insert_rows
+
+QUERY = "INSERT INTO t (sku, title) VALUES (%s, %s)"
+
+
+class FakeCursor:
+    """模擬 MySQL：每條語句失敗時只回滾該語句，sku 重複時違反 UNIQUE"""
+
+    def __init__(self, existing=(), fail_with=None):
+        self.skus = set(existing)
+        self.statements = []
+        self.fail_with = fail_with
+
+    def _insert(self, rows):
+        self.statements.append(len(rows))
+        if self.fail_with:
+            raise self.fail_with
+        skus = [row[0] for row in rows]
+        if len(set(skus)) != len(skus) or self.skus & set(skus):
+            raise errors.IntegrityError("Duplicate entry")
+        self.skus.update(skus)
+
+    def executemany(self, query, rows):
+        self._insert(rows)
+
+    def execute(self, query, row):
+        self._insert([row])
+
+
+def _rows(*skus):
+    return [(sku, f"商品 {sku}") for sku in skus]
+
+
+def test_inserts_in_chunks():
+    cursor = FakeCursor()
+    assert insert_rows(cursor, QUERY, _rows(*range(5)), chunk_size=2) == 5
+    assert cursor.statements == [2, 2, 1]
+
+
+def test_failed_chunk_falls_back_to_single_rows():
+    cursor = FakeCursor(existing={3})
+    failures = []
+    inserted = insert_rows(cursor, QUERY, _rows(1, 2, 3, 4, 5), lambda index, e: failures.append(index), 2)
+    assert inserted == 4
+    assert cursor.skus == {1, 2, 3, 4, 5}
+    # 第二批（sku 3, 4）失敗後逐列插入，只有 sku 3 失敗，回報的是整體的列索引
+    assert failures == [2]
+    assert cursor.statements == [2, 2, 1, 1, 1]
+
+
+def test_duplicates_inside_a_chunk_keep_the_first_row():
+    cursor = FakeCursor()
+    assert insert_rows(cursor, QUERY, _rows(1, 1, 2)) == 2
+    assert cursor.skus == {1, 2}
+
+
+@pytest.mark.parametrize("error", [errors.OperationalError("gone away"), errors.InterfaceError("lost")])
+def test_connection_errors_are_not_swallowed(error):
+    with pytest.raises(type(error)):
+        insert_rows(FakeCursor(fail_with=error), QUERY, _rows(1, 2))
+
+
+def test_empty_rows():
+    cursor = FakeCursor()
+    assert insert_rows(cursor, QUERY, []) == 0
+    assert cursor.statements == []
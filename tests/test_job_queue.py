@@ -0,0 +1,130 @@
+import json
+
+import pytest
+
+import job_queue
+import product_scraper
+from job_queue import JobQueue, RETRY_BASE_SECONDS, _run_job
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(job_queue.time, "time", clock.time)
+    return clock
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    yield queue
+    queue.close()
+
+
+def _enqueue(queue, max_attempts=3, platforms=("momo",)):
+    return queue.enqueue([{"keyword": "手機", "query": "phone", "count": 30}], platforms,
+                         {"momo": {"incremental": True}}, max_attempts)
+
+
+def test_enqueue_ignores_duplicates(queue):
+    assert _enqueue(queue, platforms=("momo", "pchome")) == 2
+    assert _enqueue(queue, platforms=("momo", "pchome")) == 0
+    assert queue.stats() == {"pending": 2, "leased": 0, "done": 0, "dead": 0}
+
+
+def test_lease_and_complete(queue):
+    _enqueue(queue)
+    job = queue.lease("w1", lease_seconds=60)
+    assert job["attempts"] == 1 and job["options"] == {"incremental": True}
+    assert queue.lease("w2") is None
+    assert queue.heartbeat(job["id"], "w1")
+    assert not queue.heartbeat(job["id"], "w2")
+    assert queue.complete(job["id"], "w1", {"count": 30})
+    assert queue.stats()["done"] == 1
+
+
+def test_failure_backs_off_then_dead_letters(queue, clock):
+    _enqueue(queue, max_attempts=2)
+    job = queue.lease("w1")
+    assert queue.fail(job["id"], "w1", "逾時") == "pending"
+    # 第一次失敗後等待 RETRY_BASE_SECONDS 秒才能再借出
+    assert queue.lease("w1") is None
+    clock.now += RETRY_BASE_SECONDS
+    job = queue.lease("w1")
+    assert job["attempts"] == 2
+    assert queue.fail(job["id"], "w1", "又逾時") == "dead"
+    assert queue.dead_letters() == [{"id": job["id"], "keyword": "手機", "query": "phone", "platform": "momo",
+                                     "attempts": 2, "last_error": "又逾時"}]
+
+    assert queue.retry_dead() == 1
+    assert queue.lease("w1")["attempts"] == 1
+
+
+def test_expired_lease_is_taken_over(queue, clock):
+    _enqueue(queue)
+    job = queue.lease("w1", lease_seconds=60)
+    clock.now += 61
+    taken = queue.lease("w2", lease_seconds=60)
+    assert taken["id"] == job["id"] and taken["attempts"] == 2
+    # 原本的 worker 已失去借用，回報會被忽略
+    assert not queue.complete(job["id"], "w1", {})
+    assert queue.fail(job["id"], "w1", "錯誤") is None
+
+
+def test_expired_lease_after_max_attempts_goes_dead(queue, clock):
+    _enqueue(queue, max_attempts=2, platforms=("momo", "pchome"))
+    first = queue.lease("w1", lease_seconds=60)
+    clock.now += 61
+    assert queue.lease("w2", lease_seconds=60)["id"] == first["id"]
+    clock.now += 61
+
+    # 第一個工作已嘗試 2 次仍逾時，移到 dead-letter，改借出下一個工作
+    job = queue.lease("w3", lease_seconds=60)
+    assert job["id"] != first["id"] and job["platform"] == "pchome"
+    assert queue.stats() == {"pending": 0, "leased": 1, "done": 0, "dead": 1}
+    dead = queue.dead_letters()[0]
+    assert dead["id"] == first["id"] and dead["attempts"] == 2 and "w2" in dead["last_error"]
+    assert not queue.heartbeat(first["id"], "w2")
+
+
+@pytest.fixture
+def fetch_calls(monkeypatch):
+    """以假的抓取函式取代 product_scraper.fetch_products_for_momo，記錄收到的參數"""
+    calls = []
+
+    def fetch(keyword, count, **options):
+        calls.append(dict(options, keyword=keyword))
+        if keyword == "中斷":
+            raise product_scraper.ScrapeInterrupted("連線中斷", [], options["checkpoint_dir"] + "/x.json")
+        return [{"sku": "1", "title": keyword}]
+
+    monkeypatch.setattr(product_scraper, "fetch_products_for_momo", fetch)
+    return calls
+
+
+def _job(job_id, keyword, query):
+    return {"id": job_id, "keyword": keyword, "query": query, "platform": "momo", "count": 30, "options": {}}
+
+
+def test_jobs_sharing_a_keyword_use_separate_checkpoints(tmp_path, fetch_calls):
+    first = _run_job(_job(1, "手機", "phone"), str(tmp_path))
+    _run_job(_job(2, "手機", "phone_case"), str(tmp_path))
+
+    names = [call["checkpoint_name"] for call in fetch_calls]
+    assert names == ["job1_momo", "job2_momo"]
+    assert all(call["resume"] and call["raise_on_interrupt"] for call in fetch_calls)
+    with open(first["output"], encoding="utf-8") as f:
+        assert json.load(f)[0]["query"] == "phone"
+
+
+def test_interrupted_fetch_fails_the_job(tmp_path, fetch_calls):
+    with pytest.raises(RuntimeError, match="抓取中斷"):
+        _run_job(_job(3, "中斷", "broken"), str(tmp_path))
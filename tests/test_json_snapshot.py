@@ -0,0 +1,72 @@
+import json
+import os
+from decimal import Decimal
+
+from json_snapshot import JsonSnapshot
+
+
+def _row(row_id, connect="m1", price="10.50"):
+    return {"id": row_id, "sku": f"p{row_id}", "connect": connect, "price": Decimal(price)}
+
+
+def test_changes_are_appended_and_replayed(tmp_path):
+    snapshot = JsonSnapshot(str(tmp_path), compact_after=100)
+    snapshot.record_inserts("products", [_row(1), _row(2, "m2")])
+    snapshot.record_inserts("products", [_row(3)])
+    snapshot.record_delete("products", {"connect": "m1"})
+    snapshot.record_inserts("products", [])
+
+    assert not os.path.exists(snapshot.snapshot_path("products"))
+    with open(snapshot.changes_path("products"), encoding="utf-8") as f:
+        assert len(f.readlines()) == 3
+    assert snapshot.load("products") == [{"id": 2, "sku": "p2", "connect": "m2", "price": 10.5}]
+    # 另一個行程從檔案重播得到相同內容
+    assert JsonSnapshot(str(tmp_path)).load("products") == snapshot.load("products")
+
+
+def test_compacts_after_threshold(tmp_path):
+    snapshot = JsonSnapshot(str(tmp_path), compact_after=2)
+    snapshot.record_inserts("products", [_row(1)])
+    snapshot.record_inserts("products", [_row(2)])
+
+    assert not os.path.exists(snapshot.changes_path("products"))
+    with open(snapshot.snapshot_path("products"), encoding="utf-8") as f:
+        assert [row["id"] for row in json.load(f)] == [1, 2]
+
+    snapshot.record_delete("products", {"sku": "p1"})
+    reloaded = JsonSnapshot(str(tmp_path))
+    assert [row["id"] for row in reloaded.load("products")] == [2]
+    assert reloaded.counts(("products", "momo_products")) == {"products": 1, "momo_products": 0}
+
+
+def test_replaying_after_interrupted_compaction_is_idempotent(tmp_path):
+    snapshot = JsonSnapshot(str(tmp_path), compact_after=100)
+    snapshot.record_inserts("momo_products", [_row(1), _row(2)])
+    snapshot.record_delete("momo_products", {"sku": "p2"})
+    # 模擬快照已寫入、變更記錄尚未刪除時中斷
+    with open(snapshot.changes_path("momo_products"), encoding="utf-8") as f:
+        changes = f.read()
+    snapshot.compact_all()
+    with open(snapshot.changes_path("momo_products"), "w", encoding="utf-8") as f:
+        f.write(changes)
+
+    assert [row["id"] for row in JsonSnapshot(str(tmp_path)).load("momo_products")] == [1]
+
+
+def test_delete_compares_values_as_strings(tmp_path):
+    snapshot = JsonSnapshot(str(tmp_path))
+    snapshot.record_inserts("products", [dict(_row(1), connect=123)])
+    snapshot.record_delete("products", {"connect": "123"})
+    assert snapshot.load("products") == []
+
+
+def test_replace_clears_change_log_and_keeps_rows_without_id(tmp_path):
+    snapshot = JsonSnapshot(str(tmp_path))
+    snapshot.record_inserts("pchome_products", [_row(1)])
+    snapshot.replace("pchome_products", [{"sku": "a", "price": Decimal("1")}, {"sku": "b", "price": Decimal("2")}])
+
+    assert not os.path.exists(snapshot.changes_path("pchome_products"))
+    reloaded = JsonSnapshot(str(tmp_path))
+    assert reloaded.load("pchome_products") == [{"sku": "a", "price": 1.0}, {"sku": "b", "price": 2.0}]
+    reloaded.record_delete("pchome_products", {"sku": "a"})
+    assert [row["sku"] for row in reloaded.load("pchome_products")] == ["b"]
@@ -0,0 +1,125 @@
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+import product_scraper
+from scrape_metrics import completed_reports
+
+CARD_SELECTOR = "li.c-listInfoGrid__item--gridCardGray5"
+
+PRODUCTS = [
+    ("/prod/DYAJ8Y-A900GYVZ1", "Apple AirPods Pro 2", "$7,290", "https://cs-a.ecimg.tw/1.jpg"),
+    ("/prod/DCAYBW-A900G4X4T", "SONY WF-1000XM5", "$8,490", ""),
+    ("/prod/AD0000-000000000", "", "$1", ""),  # 沒有標題的廣告卡片，解析失敗
+]
+
+
+class FakeElement:
+    def __init__(self, text="", attributes=None, children=None):
+        self.text = text
+        self._attributes = attributes or {}
+        self._children = children or {}
+
+    def get_attribute(self, name):
+        return self._attributes.get(name)
+
+    def find_element(self, by, selector):
+        if selector not in self._children:
+            raise NoSuchElementException(selector)
+        return self._children[selector]
+
+
+def _card(href, title, price, image):
+    children = {
+        "a.c-prodInfoV2__link": FakeElement(attributes={"href": href}),
+        "div.c-prodInfoV2__title": FakeElement(title),
+        "div.c-prodInfoV2__salePrice": FakeElement(price),
+    }
+    if image:
+        children["div.c-prodInfoV2__head img"] = FakeElement(attributes={"src": image})
+    return FakeElement(children=children)
+
+
+class FakeDriver:
+    """只有一頁搜尋結果的 PChome 頁面"""
+
+    def __init__(self):
+        self.cards = [_card(*product) for product in PRODUCTS]
+        self.visited = []
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def find_elements(self, by, selector):
+        return list(self.cards) if (by, selector) == (By.CSS_SELECTOR, CARD_SELECTOR) else []
+
+    def find_element(self, by, selector):
+        elements = self.find_elements(by, selector)
+        if not elements:
+            raise NoSuchElementException(selector)
+        return elements[0]
+
+    def execute_script(self, script, *args):
+        if not args:
+            return None
+        # 批次擷取：與 EXTRACT_CARDS_SCRIPT 回傳相同格式
+        return [{"titles": [title], "prices": [[price]], "href": href, "image": image}
+                for href, title, price, image in PRODUCTS]
+
+    def get_log(self, log_type):
+        raise RuntimeError("performance log disabled")
+
+    def save_screenshot(self, path):
+        return False
+
+
+class FakePool:
+    def __init__(self, driver):
+        self.driver = driver
+        self.released = []
+
+    def acquire(self, profile):
+        return self.driver
+
+    def release(self, driver):
+        self.released.append(driver)
+
+    def record_page(self, driver, pages=1):
+        pass
+
+
+def _fetch_with_fake_driver(monkeypatch, extraction):
+    driver = FakeDriver()
+    pool = FakePool(driver)
+    monkeypatch.setattr(product_scraper, "get_browser_pool", lambda: pool)
+    # 商品數量剛好等於第一頁的有效商品數，抓完第一頁就結束，不需要找下一頁按鈕
+    products = product_scraper.fetch_products_for_pchome("耳機", max_products=2, engine="selenium",
+                                                          extraction=extraction, checkpoint_dir=None)
+    return driver, pool, products
+
+
+def test_pchome_selenium_element_extraction(monkeypatch):
+    driver, pool, products = _fetch_with_fake_driver(monkeypatch, "element")
+    assert [(p["id"], p["sku"], p["price"]) for p in products] == [
+        (1, "DYAJ8Y-A900GYVZ1", 7290), (2, "DCAYBW-A900G4X4T", 8490)]
+    assert products[0]["url"] == product_scraper.PCHOME_BASE_URL + "/prod/DYAJ8Y-A900GYVZ1"
+    assert driver.visited and pool.released == [driver]
+
+    report = completed_reports()[-1]
+    assert report["platform"] == "pchome"
+    assert report["totals"]["parse_failures"] == 1
+    assert report["totals"]["products_kept"] == 2
+
+
+def test_pchome_selenium_bulk_extraction(monkeypatch):
+    _, _, products = _fetch_with_fake_driver(monkeypatch, "bulk")
+    assert [p["sku"] for p in products] == ["DYAJ8Y-A900GYVZ1", "DCAYBW-A900G4X4T"]
+    assert completed_reports()[-1]["totals"]["parse_failures"] == 1
+
+
+def test_fetch_functions_do_not_shadow_metrics_record():
+    # 函式內指派 record 會讓 record(...) 指標呼叫在整個函式中變成區域變數而拋出 UnboundLocalError
+    for name in dir(product_scraper):
+        function = getattr(product_scraper, name)
+        code = getattr(function, "__code__", None)
+        if code is not None and getattr(function, "__module__", None) == "product_scraper":
+            assert "record" not in code.co_varnames, name
@@ -0,0 +1,114 @@
+from pathlib import Path
+import json
+
+import pytest
+
+from product_parsers import (
+    parse_momo_page, parse_momo_total, parse_pchome_page, parse_pchome_api_page,
+    _extract_momo_price, _extract_momo_sku, _normalize_momo_image_url, MOMO_BASE_URL, PCHOME_BASE_URL
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _fixture(name):
+    return (FIXTURES / name).read_bytes()
+
+
+def test_parse_momo_page():
+    element_count, products, hits = parse_momo_page(_fixture("momo_search.html"))
+    assert element_count == 4
+    assert products == [
+        {
+            "title": "Apple AirPods Pro 第二代 藍牙耳機",
+            "price": 7490,
+            "image_url": "https://img1.momoshop.com.tw/goodsimg/10001.jpg",
+            "url": MOMO_BASE_URL + "/goods/GoodsDetail.jsp?i_code=10001&str_category_code=2000",
+            "sku": "10001"
+        },
+        {
+            "title": "Sony WF-1000XM5 真無線降噪耳機",
+            "price": 8990,
+            "image_url": MOMO_BASE_URL + "/ecm/img/10002.jpg",
+            "url": "https://www.momoshop.com.tw/goods/GoodsDetail.jsp?i_code=10002",
+            "sku": "10002"
+        }
+    ]
+    assert hits["list"] == {"li.listAreaLi": 1}
+    assert hits["title"] == {"h3.prdName": 2}
+    assert hits["price"] == {".money .price b": 2}
+
+
+def test_parse_momo_page_without_products():
+    element_count, products, _ = parse_momo_page("<html><body><p>查無商品</p></body></html>")
+    assert (element_count, products) == (0, [])
+
+
+def test_parse_momo_total():
+    assert parse_momo_total(_fixture("momo_search.html")) == 1234
+    # 頁面上沒有總數元素時改讀內嵌資料
+    assert parse_momo_total('<script>var data = {"totalCnt": 56};</script>') == 56
+    assert parse_momo_total("<html></html>") is None
+
+
+def test_parse_pchome_page():
+    element_count, products = parse_pchome_page(_fixture("pchome_search.html"))
+    assert element_count == 3
+    assert [(p["sku"], p["price"], p["url"]) for p in products] == [
+        ("DYAJ8Y-A900GYVZ1", 7290, PCHOME_BASE_URL + "/prod/DYAJ8Y-A900GYVZ1"),
+        ("DCAYBW-A900G4X4T", 8490, "https://24h.pchome.com.tw/prod/DCAYBW-A900G4X4T?fq=/S/DCAY")
+    ]
+    assert products[0]["title"] == "Apple AirPods Pro 2 (USB-C)"
+
+
+@pytest.mark.parametrize("page_json", [
+    _fixture("pchome_api.json"),
+    _fixture("pchome_api.json").decode("utf-8"),
+    json.loads(_fixture("pchome_api.json")),
+])
+def test_parse_pchome_api_page(page_json):
+    count, products = parse_pchome_api_page(page_json)
+    assert count == 3
+    assert products == [
+        {
+            "title": "Apple AirPods Pro 2 & MagSafe",
+            "price": 7290,
+            "image_url": "https://cs.ecimg.tw/items/DYAJ8YA900GYVZ1/000001.jpg",
+            "url": PCHOME_BASE_URL + "/prod/DYAJ8Y-A900GYVZ1",
+            "sku": "DYAJ8Y-A900GYVZ1"
+        },
+        {
+            "title": "SONY WF-1000XM5",
+            "price": 8490,
+            "image_url": "https://cs-b.ecimg.tw/items/DCAYBWA900G4X4T/000002.jpg",
+            "url": PCHOME_BASE_URL + "/prod/DCAYBW-A900G4X4T",
+            "sku": "DCAYBW-A900G4X4T"
+        }
+    ]
+
+
+@pytest.mark.parametrize("texts, expected", [
+    (["NT$1,299"], 1299),
+    (["", "$ 2,480 起"], 2480),
+    (["9折", "5"], 0),
+    (["限時 85 折 $3,990"], 3990),
+])
+def test_extract_momo_price(texts, expected):
+    assert _extract_momo_price(texts) == expected
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://www.momoshop.com.tw/goods/GoodsDetail.jsp?i_code=123456&mdiv=1", "123456"),
+    ("https://www.momoshop.com.tw/product/ABC123/", "ABC123"),
+    ("https://www.momoshop.com.tw/goods/detail.jsp?x=1", "detail"),
+    ("", ""),
+])
+def test_extract_momo_sku(url, expected):
+    assert _extract_momo_sku(url) == expected
+
+
+def test_normalize_momo_image_url():
+    assert _normalize_momo_image_url("//img.momo/1.jpg") == "https://img.momo/1.jpg"
+    assert _normalize_momo_image_url("/ecm/1.jpg") == MOMO_BASE_URL + "/ecm/1.jpg"
+    assert _normalize_momo_image_url("goodsimg/1.jpg") == "https://cdn3.momoshop.com.tw/momoshop/upload/media/goodsimg/1.jpg"
+    assert _normalize_momo_image_url("") == ""
@@ -0,0 +1,37 @@
+import json
+import os
+
+from product_stream import NDJSONWriter, ndjson_path_for, read_ndjson, load_products
+
+
+def test_writer_adds_extra_fields_and_appends(tmp_path):
+    path = str(tmp_path / "out" / "momo_products.ndjson")
+    with NDJSONWriter(path, extra={"query": "phone"}) as stream:
+        stream.write_page([{"sku": "1"}, {"sku": "2"}])
+        stream.write_page([])
+        assert stream.count == 2
+    with NDJSONWriter(path, extra={"query": "phone"}, append=True) as stream:
+        stream.write_page([{"sku": "3"}])
+    assert read_ndjson(path) == [{"sku": str(n), "query": "phone"} for n in (1, 2, 3)]
+
+
+def test_read_ndjson_skips_partial_last_line(tmp_path):
+    path = tmp_path / "products.ndjson"
+    path.write_text('{"sku": "1"}\n\nnot json\n{"sku": "2"', encoding="utf-8")
+    assert read_ndjson(str(path)) == [{"sku": "1"}]
+
+
+def test_load_products_prefers_newer_ndjson(tmp_path):
+    json_path = str(tmp_path / "momo_products.json")
+    assert ndjson_path_for(json_path) == str(tmp_path / "momo_products.ndjson")
+    assert load_products(json_path) is None
+
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump([{"sku": "old"}], f)
+    assert load_products(json_path) == [{"sku": "old"}]
+
+    with NDJSONWriter(ndjson_path_for(json_path)) as stream:
+        stream.write_page([{"sku": "new"}])
+    stat = os.stat(json_path)
+    os.utime(ndjson_path_for(json_path), (stat.st_atime, stat.st_mtime + 10))
+    assert load_products(json_path) == [{"sku": "new"}]
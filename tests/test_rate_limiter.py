@@ -0,0 +1,82 @@
+import pytest
+
+import rate_limiter
+from rate_limiter import TokenBucket, HostRateLimiter, parse_rate_spec, configure_rates
+
+
+class FakeClock:
+    """取代 time.monotonic / time.sleep，sleep 只推進時間"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limiter.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_token_bucket_allows_burst_then_waits(clock):
+    bucket = TokenBucket(rate=2.0, burst=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # token 用完後以每秒 2 個的速度補充
+    assert bucket.acquire() == pytest.approx(0.5)
+    assert bucket.acquire() == pytest.approx(0.5)
+
+
+def test_token_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(rate=1.0, burst=2)
+    bucket.acquire()
+    bucket.acquire()
+    clock.now += 60
+    assert [bucket.acquire() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.acquire() == pytest.approx(1.0)
+
+
+def test_host_rate_limiter_uses_separate_buckets(clock):
+    limiter = HostRateLimiter({"a.example": (1.0, 1)}, default_rate=1.0, default_burst=1)
+    assert limiter.wait("https://a.example/search") == 0.0
+    assert limiter.wait("https://b.example/search") == 0.0
+    assert limiter.wait("https://a.example/other") == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("momo=1:3", ("www.momoshop.com.tw", 1.0, 3)),
+    ("pchome=0.8", ("24h.pchome.com.tw", 0.8, rate_limiter.DEFAULT_BURST)),
+    ("example.com=5:10", ("example.com", 5.0, 10)),
+])
+def test_parse_rate_spec(spec, expected):
+    assert parse_rate_spec(spec) == expected
+
+
+@pytest.mark.parametrize("spec", ["momo", "momo=", "momo=fast", "momo=0", "momo=1:0", "=1:2"])
+def test_parse_rate_spec_rejects_invalid(spec):
+    with pytest.raises(ValueError):
+        parse_rate_spec(spec)
+
+
+def test_configure_rates_overrides_default_host_limits(clock):
+    limiter = HostRateLimiter()
+    applied = configure_rates(["momo=100:5"], limiter)
+    assert applied == [("www.momoshop.com.tw", 100.0, 5)]
+    assert [limiter.wait("https://www.momoshop.com.tw/search") for _ in range(5)] == [0.0] * 5
+
+
+def test_shared_limiter_reads_environment(monkeypatch):
+    monkeypatch.setenv(rate_limiter.HOST_RATES_ENV, "momo=4:8, pchome=bad")
+    monkeypatch.setattr(rate_limiter, "_rate_limiter", None)
+    limiter = rate_limiter.get_rate_limiter()
+    assert limiter.limits["www.momoshop.com.tw"] == (4.0, 8)
+    # 格式錯誤的設定略過，保留預設值
+    assert limiter.limits["24h.pchome.com.tw"] == rate_limiter.DEFAULT_HOST_LIMITS["24h.pchome.com.tw"]
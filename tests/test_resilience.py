@@ -0,0 +1,141 @@
+import pytest
+import requests
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+import resilience
+from resilience import (
+    CircuitBreaker, CircuitOpenError, RetryableError, RetryPolicy, call_with_retry, classify_error,
+    get_circuit_breaker, TRANSIENT, RETRY, FATAL
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(resilience.time, "sleep", clock.sleep)
+    monkeypatch.setattr(resilience, "_breakers", {})
+    return clock
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(response=response)
+
+
+@pytest.mark.parametrize("error, kind", [
+    (_http_error(503), TRANSIENT),
+    (_http_error(429), TRANSIENT),
+    (_http_error(404), FATAL),
+    (requests.HTTPError(), FATAL),
+    (requests.ConnectionError(), TRANSIENT),
+    (requests.Timeout(), TRANSIENT),
+    (TimeoutException(), TRANSIENT),
+    (WebDriverException(), FATAL),
+    (RetryableError(), RETRY),
+    (ValueError(), FATAL),
+])
+def test_classify_error(error, kind):
+    assert classify_error(error) == kind
+
+
+def test_retry_delay_is_exponential_and_capped(monkeypatch):
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0, jitter=0.5)
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: 0)
+    assert [policy.delay(retry) for retry in (1, 2, 3, 4)] == [1.0, 2.0, 4.0, 5.0]
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: high)
+    assert policy.delay(2) == 1.0
+
+
+def test_breaker_opens_then_half_opens_with_one_probe(clock):
+    breaker = CircuitBreaker("example.com", failure_threshold=2, reset_timeout=60)
+    for _ in range(2):
+        breaker.allow()
+        breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    clock.now += 60
+    breaker.allow()  # 半開：放行一個試探請求
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker.record_failure()  # 試探失敗立即再次開啟
+    assert breaker.is_open()
+
+    clock.now += 60
+    breaker.allow()
+    breaker.record_success()
+    breaker.allow()
+    report = breaker.report()
+    assert report["state"] == "closed" and report["opened"] == 2 and report["rejected"] == 2
+
+
+def test_release_probe_allows_another_probe(clock):
+    breaker = CircuitBreaker("example.com", failure_threshold=1, reset_timeout=10)
+    breaker.allow()
+    breaker.record_failure()
+    clock.now += 10
+    breaker.allow()
+    breaker.release_probe()
+    breaker.allow()
+    assert breaker.state == "half_open"
+
+
+def _flaky(errors, result="ok"):
+    errors = list(errors)
+
+    def func():
+        if errors:
+            raise errors.pop(0)
+        return result
+    return func
+
+
+def test_call_with_retry_recovers_from_transient_errors(clock):
+    policy = RetryPolicy(max_attempts=3, base_delay=1.0, jitter=0)
+    func = _flaky([requests.ConnectionError(), _http_error(502)])
+    assert call_with_retry(func, "https://a.example/x", policy) == "ok"
+    assert clock.sleeps == [1.0, 2.0]
+    report = get_circuit_breaker("a.example").report()
+    assert report["retries"] == 2 and report["failures"] == 2 and report["consecutive_failures"] == 0
+
+
+def test_call_with_retry_does_not_retry_fatal_errors(clock):
+    with pytest.raises(requests.HTTPError):
+        call_with_retry(_flaky([_http_error(404)]), "https://b.example/x", RetryPolicy(jitter=0))
+    assert clock.sleeps == []
+    assert get_circuit_breaker("b.example").report()["failures"] == 0
+
+
+def test_not_ready_content_is_retried_without_tripping_breaker(clock):
+    policy = RetryPolicy(max_attempts=2, base_delay=1.0, jitter=0)
+    with pytest.raises(RetryableError):
+        call_with_retry(_flaky([RetryableError(), RetryableError()]), "https://c.example/", policy)
+    report = get_circuit_breaker("c.example").report()
+    assert report["failures"] == 0 and report["retries"] == 1 and report["gave_up"] == 1
+
+
+def test_open_breaker_stops_retrying(clock, monkeypatch):
+    monkeypatch.setitem(resilience._breakers, "d.example",
+                        CircuitBreaker("d.example", failure_threshold=2, reset_timeout=60))
+    policy = RetryPolicy(max_attempts=5, base_delay=1.0, jitter=0)
+    with pytest.raises(requests.ConnectionError):
+        call_with_retry(_flaky([requests.ConnectionError()] * 5), "https://d.example/", policy)
+    # 第二次失敗讓斷路器開啟，不再等待重試
+    assert clock.sleeps == [1.0]
+    with pytest.raises(CircuitOpenError):
+        call_with_retry(lambda: "ok", "https://d.example/", policy)
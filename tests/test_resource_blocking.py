@@ -0,0 +1,166 @@
+import json
+
+import pytest
+
+import resource_blocking
+import browser_pool
+from resource_blocking import (
+    apply_resource_blocking, blocked_url_patterns, blocking_report, collect_network_stats, compare_page,
+    estimate_bytes_saved, is_blocked, save_blocking_baseline, url_matches
+)
+
+
+@pytest.mark.parametrize("url", [
+    "https://img1.momoshop.com.tw/goodsimg/0012/345/678/12345678_R.webp?t=1700000000",
+    "https://cs-a.ecimg.tw/items/DYAJ8AA900HIX2S/000001_1700000000.jpg",
+    "https://www.momoshop.com.tw/ecm/css/fonts/icon.woff2",
+    "https://fonts.gstatic.com/s/notosanstc/v1/font.otf",
+    "https://www.google-analytics.com/g/collect?v=2",
+    "https://www.facebook.com/tr?id=1&ev=PageView",
+    "https://connect.facebook.net/en_US/fbevents.js",
+])
+def test_blocks_resources_including_platform_images(url):
+    assert is_blocked(url, "momo")
+    assert is_blocked(url, "pchome")
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.momoshop.com.tw/search/searchShop.jsp?keyword=手機",
+    "https://www.momoshop.com.tw/ecm/js/gift.js",
+    "https://24h.pchome.com.tw/search/?q=手機",
+    "https://ecshweb.pchome.com.tw/search/v4.3/all/results?q=手機&page=1",
+    "https://www.facebook.com/translate.js",
+    "https://www.momoshop.com.tw/goods/GoodsDetail.jsp?i_code=123&img=a.icon",
+])
+def test_does_not_block_pages_and_scripts(url):
+    assert not is_blocked(url, "momo")
+    assert not is_blocked(url, "pchome")
+
+
+def test_only_star_is_a_wildcard():
+    assert url_matches("https://a.com/x.jpg?w=1", "*.jpg?*")
+    assert not url_matches("https://a.com/x.jpgz", "*.jpg?*")
+    assert not url_matches("https://a.com/[x].js", "*[x]*.jpg")
+
+
+def test_patterns_are_unique_and_can_be_disabled(monkeypatch):
+    patterns = blocked_url_patterns("probe")
+    assert patterns and len(patterns) == len(set(patterns))
+    assert blocked_url_patterns("unknown") == []
+
+    monkeypatch.setattr(resource_blocking, "BLOCK_RESOURCES", False)
+    assert blocked_url_patterns("momo") == []
+    assert blocked_url_patterns("momo", enabled=True)
+    assert not is_blocked("https://a.com/x.png", "momo")
+    assert blocking_report()["enabled"] is False
+
+
+def test_probe_also_blocks_stylesheets():
+    css = "https://www.momoshop.com.tw/ecm/css/search.css?v=20240101"
+    assert is_blocked(css, "probe")
+    assert not is_blocked(css, "momo") and not is_blocked(css, "pchome")
+    assert set(blocked_url_patterns("momo")) < set(blocked_url_patterns("probe"))
+
+
+class CdpDriver:
+    def __init__(self, daemon_lease=None):
+        self.commands = []
+        if daemon_lease:
+            self._daemon_lease = daemon_lease
+
+    def execute_cdp_cmd(self, command, params):
+        self.commands.append((command, params))
+
+
+def test_apply_resource_blocking_respects_enabled():
+    driver = CdpDriver()
+    assert apply_resource_blocking(driver, "momo", enabled=True)
+    assert driver.commands[-1] == ("Network.setBlockedURLs", {"urls": blocked_url_patterns("momo", True)})
+
+    driver = CdpDriver()
+    assert not apply_resource_blocking(driver, "momo", enabled=False)
+    assert driver.commands == []
+
+    # 常駐瀏覽器可能留著上一個連線的封鎖設定，關閉封鎖時要清空
+    driver = CdpDriver(daemon_lease=("127.0.0.1:9230", "lease"))
+    assert not apply_resource_blocking(driver, "momo", enabled=False)
+    assert driver.commands[-1] == ("Network.setBlockedURLs", {"urls": []})
+
+
+def test_baseline_estimates_bytes_saved(tmp_path, monkeypatch):
+    path = str(tmp_path / "baseline.json")
+    monkeypatch.setattr(resource_blocking, "BLOCKING_BASELINE_FILE", path)
+    assert estimate_bytes_saved("momo", 10) is None
+    assert blocking_report()["bytes_per_blocked_request"]["momo"] is None
+
+    result = {"url": "https://www.momoshop.com.tw/search", "bytes_saved": 40960,
+              "blocked": {"blocked_requests": 20}, "unblocked": {}}
+    assert save_blocking_baseline("momo", result)["bytes_per_blocked_request"] == 2048
+    assert save_blocking_baseline("pchome", dict(result, blocked={"blocked_requests": 0})) is None
+
+    assert estimate_bytes_saved("momo", 10) == 20480
+    assert estimate_bytes_saved("pchome", 10) is None
+    report = blocking_report()["bytes_per_blocked_request"]
+    assert report["momo"] == 2048 and report["pchome"] is None
+
+
+def test_compare_page_passes_blocking_to_each_driver(monkeypatch):
+    created, quit = [], []
+
+    class PageDriver(FakeDriver):
+        def __init__(self, blocked):
+            super().__init__([])
+            self.blocked = blocked
+
+        def get(self, url):
+            size = 1000 if self.blocked else 5000
+            self.entries = [{"message": json.dumps({"message": {
+                "method": "Network.loadingFinished", "params": {"requestId": "1", "encodedDataLength": size}}})}]
+
+    def create_driver(profile, block_resources=None):
+        created.append((profile, block_resources))
+        return PageDriver(block_resources)
+
+    monkeypatch.setattr(browser_pool, "create_driver", create_driver)
+    monkeypatch.setattr(browser_pool, "quit_driver", quit.append)
+    monkeypatch.setattr(resource_blocking.time, "sleep", lambda seconds: None)
+    original = resource_blocking.BLOCK_RESOURCES
+    result = compare_page("https://example.com", "pchome", settle=0)
+
+    assert created == [("pchome", False), ("pchome", True)]
+    assert len(quit) == 2 and result["bytes_saved"] == 4000
+    assert resource_blocking.BLOCK_RESOURCES is original
+
+
+class FakeDriver:
+    def __init__(self, events):
+        self.entries = [{"message": json.dumps({"message": event})} for event in events]
+
+    def get_log(self, log_type):
+        entries, self.entries = self.entries, []
+        return entries
+
+
+def test_collect_network_stats_counts_blocked_by_category():
+    driver = FakeDriver([
+        {"method": "Network.requestWillBeSent", "params": {"requestId": "1", "request": {"url": "https://a.com/"}}},
+        {"method": "Network.loadingFinished", "params": {"requestId": "1", "encodedDataLength": 1500}},
+        {"method": "Network.requestWillBeSent", "params": {"requestId": "2", "request": {"url": "https://a.com/p.png"}}},
+        {"method": "Network.loadingFailed", "params": {"requestId": "2", "blockedReason": "inspector"}},
+        {"method": "Network.requestWillBeSent",
+         "params": {"requestId": "3", "request": {"url": "https://www.googletagmanager.com/gtm.js"}}},
+        {"method": "Network.loadingFailed", "params": {"requestId": "3", "blockedReason": "inspector"}},
+        {"method": "Network.loadingFailed", "params": {"requestId": "4", "errorText": "net::ERR_ABORTED"}},
+    ])
+    stats = collect_network_stats(driver)
+    assert stats == {"requests": 3, "transferred_bytes": 1500, "blocked_requests": 2,
+                     "blocked_by_category": {"images": 1, "trackers": 1}}
+    assert collect_network_stats(driver)["requests"] == 0
+
+
+def test_collect_network_stats_without_log():
+    class NoLogDriver:
+        def get_log(self, log_type):
+            raise RuntimeError("performance log not enabled")
+
+    assert collect_network_stats(NoLogDriver()) is None
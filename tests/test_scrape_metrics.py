@@ -0,0 +1,118 @@
+import json
+import threading
+
+import pytest
+from selenium.webdriver.remote.webdriver import WebDriver
+
+import scrape_metrics
+from scrape_metrics import (
+    add_report_section, completed_reports, finish_run, install_webdriver_counter, page_scope, record, start_run,
+    write_json_report, write_prometheus
+)
+
+
+@pytest.fixture(autouse=True)
+def isolated_runs(monkeypatch):
+    monkeypatch.setattr(scrape_metrics, "_completed_runs", [])
+    monkeypatch.setattr(scrape_metrics, "_report_sections", {})
+    yield
+    scrape_metrics._local.__dict__.clear()
+
+
+def test_records_go_to_current_page_and_totals():
+    record("retries")  # 沒有正在記錄的抓取時忽略
+    run = start_run("momo", "手機")
+    record("http_requests")
+    with page_scope(1):
+        record("http_requests", 2)
+        with page_scope(2):
+            record("retries")
+        record("parse_failures")
+    finish_run(run)
+    record("retries")
+
+    report = completed_reports()[0]
+    assert report["totals"]["http_requests"] == 3 and report["totals"]["retries"] == 1
+    pages = {page["page"]: page for page in report["pages"]}
+    assert pages[1]["http_requests"] == 2 and pages[1]["parse_failures"] == 1 and "retries" not in pages[1]
+    assert pages[2]["retries"] == 1
+    assert report["page_count"] == 2 and "page_seconds" in pages[1]
+
+
+def test_worker_threads_record_phase_timers_on_the_callers_run():
+    run = start_run("pchome", "耳機")
+
+    def fetch(page):
+        with page_scope(page, run, "fetch_seconds"):
+            record("http_requests")
+
+    threads = [threading.Thread(target=fetch, args=(page,)) for page in (1, 2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for page in (1, 2):
+        with page_scope(page, timer="merge_seconds"):
+            record("products_kept", 20)
+    finish_run(run)
+
+    report = completed_reports()[0]
+    assert report["totals"]["http_requests"] == 2 and report["totals"]["products_kept"] == 40
+    for page in report["pages"]:
+        assert {"fetch_seconds", "merge_seconds"} <= set(page) and "page_seconds" not in page
+
+
+def test_page_scope_without_run_is_a_no_op():
+    with page_scope(1):
+        record("retries")
+    assert completed_reports() == []
+
+
+def _run(platform, keyword, **totals):
+    run = start_run(platform, keyword)
+    with page_scope(1):
+        for name, value in totals.items():
+            record(name, value)
+    finish_run(run)
+
+
+def test_prometheus_merges_repeated_runs_into_one_series(tmp_path):
+    _run("momo", "手機", http_requests=3)
+    _run("momo", "手機", http_requests=4)
+    _run("pchome", 'say "hi"', http_requests=1)
+    path = tmp_path / "scraper.prom"
+    write_prometheus(str(path))
+
+    samples = [line for line in path.read_text(encoding="utf-8").splitlines() if not line.startswith("#")]
+    series = [line.rsplit(" ", 1)[0] for line in samples]
+    assert len(series) == len(set(series))
+    assert 'scraper_http_requests_total{platform="momo",keyword="手機"} 7' in samples
+    assert 'scraper_runs_total{platform="momo",keyword="手機"} 2' in samples
+    assert 'scraper_pages_total{platform="momo",keyword="手機"} 2' in samples
+    assert 'scraper_http_requests_total{platform="pchome",keyword="say \\"hi\\""} 1' in samples
+
+
+def test_json_report_includes_sections(tmp_path):
+    _run("momo", "手機", retries=1)
+    add_report_section("extra", lambda: {"value": 1})
+    path = tmp_path / "out" / "scrape_report.json"
+    write_json_report(str(path))
+    report = json.loads(path.read_text(encoding="utf-8"))
+    assert report["runs"][0]["totals"]["retries"] == 1 and report["extra"] == {"value": 1}
+
+
+def test_webdriver_counter_installs_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(WebDriver, "execute", lambda self, command, params=None: calls.append(command) or {})
+    install_webdriver_counter()
+    wrapped = WebDriver.execute
+    install_webdriver_counter()
+    assert WebDriver.execute is wrapped
+
+    driver = object.__new__(WebDriver)
+    run = start_run("momo", "手機")
+    driver.execute("get", {"url": "https://example.com"})
+    driver.execute("findElements")
+    finish_run(run)
+    assert calls == ["get", "findElements"]
+    assert completed_reports()[0]["totals"]["webdriver_rpcs"] == 2
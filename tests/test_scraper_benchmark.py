@@ -0,0 +1,304 @@
+"""
+爬蟲離線效能測試：以 fixture_server.py 的回放伺服器取代正式網站，逐一以子行程執行各引擎
+
+    uv run .\\fixture_server.py record 手機 --pages 2
+    uv run pytest tests/test_scraper_benchmark.py --benchmark-keywords 手機 --benchmark-baseline benchmark_report.json
+
+每個 引擎 × 關鍵字 是一個測試：抓不到商品、解析結果與錄製當下差太多，或每秒商品數
+低於基準的 REGRESSION_THRESHOLD 時失敗；結果寫入 --benchmark-report。未指定關鍵字時
+只以產生的小型回放資料跑不需要瀏覽器的引擎，確認效能測試本身可以執行。
+"""
+from urllib.parse import urlencode, urlparse
+import subprocess
+import threading
+import argparse
+import json
+import time
+import sys
+import os
+
+import pytest
+
+from fixture_server import FixtureServer, FixtureStore, MOMO_SEARCH_PATH, PCHOME_API_PATH
+
+# 每個引擎對應的爬蟲函式與參數
+ENGINES = {
+    "momo-http": ("momo", {"engine": "http"}),
+    "momo-selenium": ("momo", {"engine": "selenium", "extraction": "bulk"}),
+    "momo-selenium-element": ("momo", {"engine": "selenium", "extraction": "element"}),
+    "momo-selenium-html": ("momo", {"engine": "selenium", "extraction": "html"}),
+    "pchome-api": ("pchome", {"engine": "api"})
+}
+# 不需要瀏覽器的引擎
+HTTP_ENGINES = ["momo-http", "pchome-api"]
+
+RESULT_PREFIX = "BENCHMARK_RESULT "
+REGRESSION_THRESHOLD = 0.8  # 每秒商品數低於基準的 80% 視為退步
+PARSE_MATCH_THRESHOLD = 0.9  # 錄製當下解析出的商品至少要找回 90%
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class PeakRss:
+    """
+    在背景執行緒定期取樣記憶體用量（RSS），分別記錄 Python 行程與其所有子行程
+    （chromedriver、Chrome 與解析行程池）加總的峰值；瀏覽器由 browser_daemon.py 常駐服務提供時
+    不是子行程，不會計入
+    """
+
+    def __init__(self, interval=0.2):
+        import psutil
+
+        self._psutil = psutil
+        self._process = psutil.Process()
+        self.interval = interval
+        self.python_mb = 0.0
+        self.children_mb = 0.0
+        self.total_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def sample(self):
+        psutil = self._psutil
+        python_rss = self._process.memory_info().rss
+        children_rss = 0
+        for child in self._process.children(recursive=True):
+            try:
+                children_rss += child.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        self.python_mb = max(self.python_mb, python_rss / 1024 / 1024)
+        self.children_mb = max(self.children_mb, children_rss / 1024 / 1024)
+        self.total_mb = max(self.total_mb, (python_rss + children_rss) / 1024 / 1024)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        self.sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+
+def _run_engine(engine, keyword, count, fixture_dir):
+    """
+    在子行程中執行單一引擎（爬蟲已透過環境變數指向回放伺服器，並解除速率限制）
+
+    Returns:
+        dict: 耗時、商品數、WebDriver 指令數、記憶體峰值、抓取指標與解析比對結果
+    """
+    import product_scraper as scraper
+    from scrape_metrics import completed_reports
+
+    platform, options = ENGINES[engine]
+    fetch = scraper.fetch_products_for_momo if platform == "momo" else scraper.fetch_products_for_pchome
+
+    with PeakRss() as memory:
+        started = time.perf_counter()
+        products = fetch(keyword, count, checkpoint_dir=None, **options)
+        seconds = time.perf_counter() - started
+        # 關閉瀏覽器前先取樣一次，確保瀏覽器的用量已記錄
+        memory.sample()
+        scraper.get_browser_pool().close_all()
+
+    # 與錄製時解析出的商品比對 SKU
+    parse_match = None
+    expected = FixtureStore(fixture_dir).load_expected(platform, keyword)
+    if expected:
+        expected_skus = [product["sku"] for product in expected if product.get("sku")][:count]
+        found_skus = {product["sku"] for product in products}
+        if expected_skus:
+            parse_match = round(sum(sku in found_skus for sku in expected_skus) / len(expected_skus), 3)
+
+    # WebDriver 指令數由 scrape_metrics.install_webdriver_counter 記入這次抓取的指標
+    totals = completed_reports()[-1]["totals"] if completed_reports() else {}
+    return {
+        "engine": engine,
+        "keyword": keyword,
+        "products": len(products),
+        "seconds": round(seconds, 3),
+        "webdriver_rpcs": totals.get("webdriver_rpcs", 0),
+        "peak_rss_mb": round(memory.total_mb, 1),
+        "python_peak_rss_mb": round(memory.python_mb, 1),
+        "children_peak_rss_mb": round(memory.children_mb, 1),
+        "metrics": totals,
+        "parse_match": parse_match
+    }
+
+
+def run_engine_in_subprocess(server, engine, keyword, count, fixture_dir, cwd):
+    """
+    以子行程執行單一引擎（記憶體峰值與瀏覽器才不會互相影響）
+
+    Args:
+        server (FixtureServer): 已啟動的回放伺服器
+        cwd (str): 子行程的工作目錄（選擇器快取等檔案寫在這裡，不影響專案資料夾）
+
+    Returns:
+        dict: _run_engine 的結果加上頁數與每秒頁數 / 商品數，失敗時包含 error 與 output
+    """
+    env = {
+        **os.environ,
+        **server.scraper_env(),
+        # 回放伺服器不需要禮貌速率（momo、PChome 都改連到同一個 host）
+        "SCRAPER_HOST_RATES": f"{urlparse(server.base_url).hostname}=1000:1000",
+        "PYTHONPATH": os.pathsep.join(filter(None, [REPO_DIR, os.environ.get("PYTHONPATH")])),
+        "PYTHONIOENCODING": "utf-8"
+    }
+    served_before = server.stats["served"]
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-engine", engine,
+         "--count", str(count), "--fixture-dir", os.path.abspath(fixture_dir), keyword],
+        env=env, cwd=cwd, capture_output=True, text=True, encoding="utf-8"
+    )
+    lines = [line for line in completed.stdout.splitlines() if line.startswith(RESULT_PREFIX)]
+    if not lines:
+        return {"engine": engine, "keyword": keyword, "error": completed.returncode,
+                "output": (completed.stdout + completed.stderr).strip()[-2000:]}
+    result = json.loads(lines[-1][len(RESULT_PREFIX):])
+    result["pages"] = server.stats["served"] - served_before
+    seconds = result["seconds"] or 1e-9
+    result["pages_per_second"] = round(result["pages"] / seconds, 2)
+    result["products_per_second"] = round(result["products"] / seconds, 2)
+    return result
+
+
+def format_result(result):
+    """一個結果的摘要文字"""
+    if "error" in result:
+        return f"{result['engine']}「{result['keyword']}」執行失敗"
+    return (f"{result['engine']}「{result['keyword']}」 {result['products']} 筆 / {result['pages']} 頁，"
+            f"耗時 {result['seconds']} 秒，{result['pages_per_second']} 頁/秒，"
+            f"{result['products_per_second']} 商品/秒，WebDriver 指令 {result['webdriver_rpcs']} 次，"
+            f"記憶體峰值 {result['peak_rss_mb']} MB（子行程 {result['children_peak_rss_mb']} MB），"
+            f"解析比對 {result['parse_match']}")
+
+
+def _option_list(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def pytest_generate_tests(metafunc):
+    """依 --benchmark-keywords 與 --benchmark-engines 產生 引擎 × 關鍵字 的測試"""
+    if "recorded_case" not in metafunc.fixturenames:
+        return
+    config = metafunc.config
+    keywords = _option_list(config.getoption("--benchmark-keywords"))
+    engines = _option_list(config.getoption("--benchmark-engines")) or list(ENGINES)
+    cases = [pytest.param((engine, keyword), id=f"{engine}-{keyword}") for keyword in keywords for engine in engines]
+    if not cases:
+        cases = [pytest.param(None, marks=pytest.mark.skip(reason="未指定 --benchmark-keywords"))]
+    metafunc.parametrize("recorded_case", cases)
+
+
+@pytest.fixture(scope="session")
+def benchmark_results(request):
+    """收集所有結果，測試結束時列出摘要並寫入 --benchmark-report"""
+    results = []
+    yield results
+    if not results:
+        return
+    reporter = request.config.pluginmanager.get_plugin("terminalreporter")
+    if reporter:
+        reporter.write_sep("=", "爬蟲效能測試結果")
+        for result in results:
+            reporter.write_line(f"  • {format_result(result)}")
+    with open(request.config.getoption("--benchmark-report"), "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=4)
+
+
+@pytest.fixture(scope="session")
+def baseline_rates(request):
+    """--benchmark-baseline 中每個 (引擎, 關鍵字) 的每秒商品數"""
+    path = request.config.getoption("--benchmark-baseline")
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return {(result["engine"], result["keyword"]): result["products_per_second"]
+                for result in json.load(f) if "products_per_second" in result}
+
+
+@pytest.fixture(scope="session")
+def recorded_server(request):
+    fixture_dir = request.config.getoption("--fixture-dir")
+    if not FixtureStore(fixture_dir).index:
+        pytest.skip(f"{fixture_dir} 中沒有錄製檔案，請先執行 fixture_server.py record")
+    server = FixtureServer(fixture_dir).start()
+    yield server
+    server.stop()
+
+
+def test_engine_benchmark(recorded_case, recorded_server, benchmark_results, baseline_rates, request, tmp_path):
+    engine, keyword = recorded_case
+    config = request.config
+    result = run_engine_in_subprocess(recorded_server, engine, keyword, config.getoption("--benchmark-count"),
+                                      config.getoption("--fixture-dir"), str(tmp_path))
+    benchmark_results.append(result)
+
+    assert "error" not in result, result["output"]
+    assert result["products"] > 0, format_result(result)
+    if result["parse_match"] is not None:
+        assert result["parse_match"] >= PARSE_MATCH_THRESHOLD, format_result(result)
+    previous = baseline_rates.get((engine, keyword))
+    if previous:
+        assert result["products_per_second"] >= previous * REGRESSION_THRESHOLD, \
+            f"退步：基準為 {previous} 商品/秒，{format_result(result)}"
+
+
+def _momo_card(sku, title, price):
+    return (f'<li class="listAreaLi"><a class="goods-img-url" href="/goods/GoodsDetail.jsp?i_code={sku}">'
+            f'<img class="prdImg" src="//img.momoshop.com.tw/{sku}.jpg"></a>'
+            f'<h3 class="prdName">{title}</h3><span class="price"><b>{price:,}</b></span></li>')
+
+
+def _write_generated_fixtures(store, keyword, count):
+    """產生一頁 momo 搜尋結果與一頁 PChome API 回應（都是最後一頁）"""
+    momo_html = "<html><body><ul class='listAreaUl'>" + "".join(
+        _momo_card(1000 + n, f"測試商品 momo {n} 號", 100 + n) for n in range(count)) + "</ul></body></html>"
+    momo_query = urlencode({"keyword": keyword, "searchType": 1, "cateLevel": 0, "ent": "k",
+                            "sortType": 1, "curPage": 1})
+    store.save(f"{MOMO_SEARCH_PATH}?{momo_query}", momo_html.encode("utf-8"), "text/html; charset=utf-8")
+    store.save_expected("momo", keyword, [{"sku": str(1000 + n)} for n in range(count)])
+
+    prods = [{"Id": f"DXAB00-{n:04d}", "name": f"測試商品 PChome {n} 號", "price": 200 + n, "picB": f"/p/{n}.jpg"}
+             for n in range(count)]
+    api_query = urlencode({"q": keyword, "page": 1, "sort": "rnk/dc"})
+    body = json.dumps({"totalRows": count, "totalPage": 1, "prods": prods}).encode("utf-8")
+    store.save(f"{PCHOME_API_PATH}?{api_query}", body, "application/json; charset=utf-8")
+    store.save_expected("pchome", keyword, [{"sku": prod["Id"]} for prod in prods])
+
+
+@pytest.mark.parametrize("engine", HTTP_ENGINES)
+def test_benchmark_with_generated_fixtures(engine, tmp_path):
+    fixture_dir = str(tmp_path / "fixtures")
+    _write_generated_fixtures(FixtureStore(fixture_dir), "藍牙耳機", 12)
+    server = FixtureServer(fixture_dir).start()
+    try:
+        result = run_engine_in_subprocess(server, engine, "藍牙耳機", 60, fixture_dir, str(tmp_path))
+    finally:
+        server.stop()
+
+    assert "error" not in result, result["output"]
+    assert result["products"] == 12
+    assert result["pages"] == 1
+    assert result["parse_match"] == 1.0
+    assert result["peak_rss_mb"] >= result["python_peak_rss_mb"] > 0
+    # 速率限制已解除，不應等待禮貌速率
+    assert result["metrics"].get("throttle_seconds", 0) < 1
+
+
+if __name__ == "__main__":
+    # 子行程：執行單一引擎並輸出結果
+    parser = argparse.ArgumentParser()
+    parser.add_argument("keyword")
+    parser.add_argument("--run-engine", required=True, choices=list(ENGINES))
+    parser.add_argument("--count", type=int, default=60)
+    parser.add_argument("--fixture-dir", required=True)
+    args = parser.parse_args()
+    result = _run_engine(args.run_engine, args.keyword, args.count, args.fixture_dir)
+    print(RESULT_PREFIX + json.dumps(result, ensure_ascii=False))
@@ -0,0 +1,46 @@
+from collections import Counter
+import json
+
+from product_scraper import SelectorCache
+
+
+def test_ordered_keeps_default_order_without_winner(tmp_path):
+    cache = SelectorCache(str(tmp_path / "selector_cache.json"))
+    assert cache.ordered("momo", "list", ["a", "b", "c"]) == ["a", "b", "c"]
+
+
+def test_record_moves_winner_first_and_persists(tmp_path):
+    path = tmp_path / "selector_cache.json"
+    cache = SelectorCache(str(path))
+    cache.record("momo", "list", "b")
+    assert cache.ordered("momo", "list", ["a", "b", "c"]) == ["b", "a", "c"]
+
+    cache.save()
+    assert json.loads(path.read_text(encoding="utf-8")) == {"momo": {"list": "b"}}
+    assert SelectorCache(str(path)).ordered("momo", "list", ["a", "b", "c"]) == ["b", "a", "c"]
+
+
+def test_unknown_winner_is_ignored(tmp_path):
+    path = tmp_path / "selector_cache.json"
+    path.write_text(json.dumps({"momo": {"list": "removed"}}), encoding="utf-8")
+    cache = SelectorCache(str(path))
+    assert cache.ordered("momo", "list", ["a", "b"]) == ["a", "b"]
+
+
+def test_learn_records_most_common_selector(tmp_path):
+    cache = SelectorCache(str(tmp_path / "selector_cache.json"))
+    cache.learn("momo", {"title": Counter({"a": 2, "b": 5}), "price": Counter()})
+    assert cache.ordered("momo", "title", ["a", "b"]) == ["b", "a"]
+    assert cache.ordered("momo", "price", ["a", "b"]) == ["a", "b"]
+
+
+def test_save_without_changes_does_not_write(tmp_path):
+    path = tmp_path / "selector_cache.json"
+    SelectorCache(str(path)).save()
+    assert not path.exists()
+
+
+def test_corrupt_cache_file_starts_empty(tmp_path):
+    path = tmp_path / "selector_cache.json"
+    path.write_text("{not json", encoding="utf-8")
+    assert SelectorCache(str(path)).ordered("momo", "list", ["a", "b"]) == ["a", "b"]